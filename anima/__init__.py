@@ -26,15 +26,38 @@ Place the following variables in to the config.py file::
 
 __version__ = "0.1.13.dev"
 
-from stalker import defaults
-
 import os
 import stat
-import datetime
 import tempfile
-import platform
 import logging
 
+
+class LogFileHandler(logging.FileHandler):
+    """A logging.FileHandler which creates the log file when the first record
+    is emitted and makes it writable for all users, so importing anima doesn't
+    touch the disk
+    """
+
+    def __init__(self, filename, mode='a', encoding=None):
+        logging.FileHandler.__init__(
+            self, filename, mode=mode, encoding=encoding, delay=True
+        )
+
+    def _open(self):
+        stream = logging.FileHandler._open(self)
+        try:
+            # fix file mod for log file
+            os.chmod(
+                self.baseFilename,
+                stat.S_IRWXU + stat.S_IRWXG + stat.S_IRWXO -
+                stat.S_IXUSR - stat.S_IXGRP - stat.S_IXOTH
+            )
+        except OSError:
+            # the file is created by another user
+            pass
+        return stream
+
+
 # create logger
 #logging.basicConfig()
 logger = logging.getLogger(__name__)
@@ -50,7 +73,7 @@ log_file_path = os.path.join(
     tempfile.gettempdir(),
     'anima.log'
 )
-log_file_handler = logging.FileHandler(log_file_path)
+log_file_handler = LogFileHandler(log_file_path)
 log_file_handler.setFormatter(logging_formatter)
 
 # add file handler
@@ -63,26 +86,41 @@ logger.addHandler(log_file_handler)
 #logger.debug('started new anima instance on %s' % datetime.datetime.now())
 #logger.debug('***************************************************************')
 
-# fix file mod for log file
-os.chmod(
-    log_file_path,
-    stat.S_IRWXU + stat.S_IRWXG + stat.S_IRWXO -
-    stat.S_IXUSR - stat.S_IXGRP - stat.S_IXOTH
-)
+# the Stalker server addresses are read from the Stalker config on first use,
+# use get_stalker_server_address() instead of reading them directly
+stalker_server_internal_address = None
+stalker_server_external_address = None
+
+
+def get_stalker_server_address(external=False):
+    """Returns the address of the Stalker server. The addresses are read from
+    the Stalker config on the first call, so importing anima doesn't import
+    stalker.
+
+    :param bool external: Return the external address instead of the internal
+      one.
+    :return str:
+    """
+    name = 'stalker_server_%s_address' % \
+        ('external' if external else 'internal')
+    address = globals()[name]
+    if address is None:
+        from stalker import defaults
+        try:
+            address = getattr(defaults, name)
+        except (KeyError, AttributeError):
+            address = ''
+        globals()[name] = address
+    return address
 
-stalker_server_internal_address = ''
-stalker_server_external_address = ''
-try:
-    stalker_server_internal_address = defaults.stalker_server_internal_address
-    stalker_server_external_address = defaults.stalker_server_external_address
-except KeyError:
-    pass
 
 stalker_dummy_user_login = 'anima'
 stalker_dummy_user_pass = 'anima'
 local_cache_folder = '~/.cache/anima/'
 recent_file_name = 'recent_files'
 avid_media_file_path_storage = 'avid_media_file_path'
+thumbnail_cache_folder_name = 'thumbnails'
+thumbnail_memory_cache_size = 100
 
 normal_users_group_names = ['Normal Users']
 power_users_group_names = ['Power Users', 'admins']
@@ -92,6 +130,8 @@ repo_env_template = 'REPO%(id)s'
 
 anima_env_var = 'ANIMAPATH'
 env_var_file_name = 'env.json'
+env_profile_cache_file_name = 'env_profiles.json'
+version_mover_journal_folder_name = 'version_mover'
 
 # some media
 ffmpeg_command_path = 'ffmpeg'
@@ -99,6 +139,22 @@ ffprobe_command_path = 'ffprobe'
 
 max_recent_files = 50
 
+# database connection pool used by anima.utils.do_db_setup()
+#   "queue": keeps the connections open and reuses them (the default)
+#   "null": opens a new connection per checkout, use it in forked batch jobs
+db_pool = os.environ.get('ANIMA_DB_POOL', 'queue')
+db_pool_size = 2
+db_pool_max_overflow = 3
+db_pool_recycle = 3600  # in seconds
+# set to True to skip the table creation and version check of Stalker at
+# startup and connect to the database on first query
+db_lazy_setup = False
+
+# local backups of the saved files
+local_backup_max_copies = 3  # per file
+local_backup_max_bytes = 50 * 1024 ** 3  # 0 means no limit
+local_backup_bytes_per_second = 0  # 0 means no limit
+
 status_colors = {
     'wfd': [171, 186, 195],
     'rts': [209, 91, 71],
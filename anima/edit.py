@@ -5,12 +5,15 @@
 # License: http://www.opensource.org/licenses/BSD-2-Clause
 
 import os
+import re
 
 
 class EditBase(object):
     """The base for other Edit classes
     """
 
+    __slots__ = ()
+
     def from_xml(self, xml_node):
         """Fills attributes with the given XML node
 
@@ -23,6 +26,19 @@ class EditBase(object):
         """
         raise NotImplementedError
 
+    def from_dict(self, data):
+        """Fills attributes with the given dictionary
+
+        :param dict data: A dictionary generated by :meth:`.to_dict`
+        """
+        raise NotImplementedError
+
+    def to_dict(self):
+        """returns a dictionary version of this PrevisBase object, which only
+        contains JSON serializable values
+        """
+        raise NotImplementedError
+
     def from_edl(self, edl_list):
         """Fills attributes with the given edl.List instance
 
@@ -38,8 +54,14 @@ class EditBase(object):
 
 class NameMixin(object):
     """A mixin for name attribute
+
+    It has empty ``__slots__``, so it does not add a ``__dict__`` to the
+    slotted classes. The classes using it should have a ``_name`` slot or a
+    ``__dict__``.
     """
 
+    __slots__ = ()
+
     def __init__(self, name=''):
         self._name = self._validate_name(name)
 
@@ -71,8 +93,14 @@ class NameMixin(object):
 
 class DurationMixin(object):
     """A mixin for duration attribute
+
+    It has empty ``__slots__``, so it does not add a ``__dict__`` to the
+    slotted classes. The classes using it should have a ``_duration`` slot or a
+    ``__dict__``.
     """
 
+    __slots__ = ()
+
     def __init__(self, duration=0.0):
         self._duration = self._validate_duration(duration)
 
@@ -114,6 +142,55 @@ class DurationMixin(object):
         self._duration = self._validate_duration(duration)
 
 
+edl_channel_regex = re.compile(r'^(?P<type>[AV])(?P<number>[0-9]*)$')
+
+
+def parse_edl_channel(channel):
+    """Parses the given EDL channel (the "track" field of an EDL event) and
+    returns a list of (type, track number) tuples.
+
+    The type is either 'Video' or 'Audio' and the track numbers start from 1.
+    The following channels are supported:
+
+      * V, V2, V3 ... : a video track
+      * A, A2, A3 ... : an audio track
+      * AA : audio tracks 1 and 2
+      * B : video track 1 and audio track 1
+      * combinations with "/" like A/V, AA/V or A2/V
+
+    Unknown channels will result an empty list.
+
+    :param str channel: The EDL channel
+    :return: list
+    """
+    result = []
+    for part in channel.strip().upper().split('/'):
+        if part == 'AA':
+            result.extend([('Audio', 1), ('Audio', 2)])
+        elif part == 'B':
+            result.extend([('Video', 1), ('Audio', 1)])
+        else:
+            match = edl_channel_regex.match(part)
+            if match:
+                type_ = 'Video' if match.group('type') == 'V' else 'Audio'
+                result.append((type_, int(match.group('number') or 1)))
+    return result
+
+
+def edl_channel(type_, track_number):
+    """Returns the EDL channel for the given type and track number. It is the
+    reverse of :func:`.parse_edl_channel` for single tracks.
+
+    :param str type_: Either 'Video' or 'Audio'
+    :param int track_number: The track number starting from 1
+    :return: str
+    """
+    channel = 'V' if type_ == 'Video' else 'A'
+    if track_number > 1:
+        channel = '%s%s' % (channel, track_number)
+    return channel
+
+
 class Sequence(EditBase, NameMixin, DurationMixin):
     """XML compatibility class for Sequence
 
@@ -220,31 +297,21 @@ class Sequence(EditBase, NameMixin, DurationMixin):
         v = Video()
         self.media.video = v
 
-        video_track = Track()
-        v.tracks.append(video_track)
-        # no audio tracks fow now
+        # tracks are indexed by (type, track number) so an event can find its
+        # track without scanning the already created ones
+        tracks = {}
 
         # read Events in to Clips
         sequence_start = 1e20
         sequence_end = -1
         for e in edl_list.events:
             assert isinstance(e, edl.Event)
-            clip = Clip()
-
-            clip.name = e.reel
-            clip.id = e.clip_name
-            clip.type = 'Video' if e.track == 'V' else 'Audio'
 
-            clip.in_ = e.src_start_tc.frame_number
-            clip.out = e.src_end_tc.frame_number
-
-            clip.duration = clip.out - clip.in_
-
-            clip.start = e.rec_start_tc.frame_number
-            clip.end = e.rec_end_tc.frame_number
+            start = e.rec_start_tc.frame_number
+            end = e.rec_end_tc.frame_number
 
             # check in and out points relative to each other
-            if clip.start > clip.end:
+            if start > end:
                 # a possible negative number
                 from timecode import Timecode
                 # get the last timecode like 23:59:59:xx
@@ -252,15 +319,15 @@ class Sequence(EditBase, NameMixin, DurationMixin):
                     edl_list.fps,
                     '23:59:59:%s' % edl_list.fps
                 )
-                clip.start -= tc_24_hours.frame_number  # + 1
+                start -= tc_24_hours.frame_number  # + 1
 
-            if clip.start < sequence_start:
-                sequence_start = clip.start
-            if clip.end > sequence_end:
-                sequence_end = clip.end
+            if start < sequence_start:
+                sequence_start = start
+            if end > sequence_end:
+                sequence_end = end
 
             f = File()
-            f.name = clip.name
+            f.name = e.reel
 
             # include the handle at start,
             # but we can not have any idea about the
@@ -272,10 +339,55 @@ class Sequence(EditBase, NameMixin, DurationMixin):
 
             f.pathurl = 'file://%s' % e.source_file
 
-            clip.file = f
+            # an event may span more than one channel (like "B" or "AA/V"),
+            # create one clip per channel, all sharing the same file
+            for type_, track_number in parse_edl_channel(e.track):
+                clip = Clip()
+
+                clip.name = e.reel
+                clip.id = e.clip_name
+                clip.type = type_
+
+                clip.in_ = e.src_start_tc.frame_number
+                clip.out = e.src_end_tc.frame_number
 
-            if clip.type == 'Video':
-                video_track.clips.append(clip)
+                clip.duration = clip.out - clip.in_
+
+                clip.start = start
+                clip.end = end
+
+                clip.file = f
+
+                key = (type_, track_number)
+                try:
+                    track = tracks[key]
+                except KeyError:
+                    track = Track()
+                    tracks[key] = track
+
+                track.clips.append(clip)
+
+        # store the tracks in order, fill the gaps with empty tracks so the
+        # track numbers in the EDL are preserved
+        for type_, media_type_class, attr_name in [('Video', Video, 'video'),
+                                                   ('Audio', Audio, 'audio')]:
+            track_numbers = [number for t, number in tracks if t == type_]
+            if not track_numbers:
+                continue
+
+            media_type = getattr(self.media, attr_name)
+            if media_type is None:
+                media_type = media_type_class()
+                setattr(self.media, attr_name, media_type)
+
+            for track_number in range(1, max(track_numbers) + 1):
+                media_type.tracks.append(
+                    tracks.get((type_, track_number)) or Track()
+                )
+
+        # there should always be at least one video track
+        if not v.tracks:
+            v.tracks.append(Track())
 
         self.duration = sequence_end - sequence_start
         # TODO: fix this later, timecode always 00:00:00:00 for now
@@ -300,17 +412,21 @@ class Sequence(EditBase, NameMixin, DurationMixin):
                 }
             )
 
-        video = self.media.video
-        if video is not None:
-            i = 0
-            for track in video.tracks:
+        i = 0
+        for type_, media_type in [('Video', self.media.video),
+                                  ('Audio', self.media.audio)]:
+            if media_type is None:
+                continue
+
+            for track_number, track in enumerate(media_type.tracks):
+                channel = edl_channel(type_, track_number + 1)
                 for clip in track.clips:
                     i += 1
                     e = Event({})
                     e.num = '%06i' % i
                     e.clip_name = clip.id
                     e.reel = clip.name
-                    e.track = 'V' if clip.type == 'Video' else 'A'
+                    e.track = channel
                     e.tr_code = 'C'  # TODO: for now use C (Cut) later on
                     # expand it to add other transition codes
 
@@ -348,18 +464,15 @@ class Sequence(EditBase, NameMixin, DurationMixin):
                     l.append(e)
         return l
 
-    def to_metafuze_xml(self):
-        """Generates a MetaFuze compatible XML content per clip.
-
-        :returns: list of strings
-        """
-        metafuze_xml_template = """<?xml version='1.0' encoding='UTF-8'?>
+    metafuze_xml_header = """<?xml version='1.0' encoding='UTF-8'?>
 <MetaFuze_BatchTranscode xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance" xsi:noNamespaceSchemaLocation="MetaFuzeBatchTranscode.xsd">
    <Configuration>
       <Local>8</Local>
       <Remote>8</Remote>
    </Configuration>
-   <Group>
+"""
+
+    metafuze_xml_group_template = """   <Group>
       <FileList>
          <File>%(file_pathurl)s</File>
       </FileList>
@@ -401,39 +514,151 @@ class Sequence(EditBase, NameMixin, DurationMixin):
          <Comment></Comment>
       </Transcode>
    </Group>
-</MetaFuze_BatchTranscode>"""
-        rendered_xmls = []
+"""
+
+    metafuze_xml_footer = """</MetaFuze_BatchTranscode>"""
+
+    @classmethod
+    def is_mxf_up_to_date(cls, file_path, mxf_path):
+        """Checks if the MXF file at the given path is newer than the given
+        source file.
+
+        :param str file_path: The source media file path
+        :param str mxf_path: The MXF file path
+        :return: bool
+        """
+        try:
+            return os.path.getmtime(mxf_path) >= os.path.getmtime(file_path)
+        except OSError:
+            return False
+
+    def _metafuze_groups(self, skip_up_to_date=False):
+        """Renders the MetaFuze <Group> element of each video clip.
+
+        :param bool skip_up_to_date: Skip the clips that already have an
+          up to date MXF file.
+        :returns: list of (file path, mxf path, rendered group) tuples
+        """
+        groups = []
         video = self.media.video
-        if video is not None:
-            for track in video.tracks:
-                for clip in track.clips:
-                    raw_file_path = \
-                        clip.file.pathurl.replace('file://localhost', '')
-                    raw_mxf_path = '%s%s' % (
-                        os.path.splitext(raw_file_path)[0],
-                        '.mxf'
-                    )
-
-                    kwargs = {
-                        'file_pathurl': os.path.normpath(
-                            os.path.expandvars(raw_file_path)
-                        ),
-                        'mxf_pathurl': os.path.normpath(
-                            os.path.expandvars(raw_mxf_path)
-                        ),
-                        'sequence_name': self.name,
-                        'sequence_timecode': self.timecode,
-                        'clip_id': clip.id,
-                        'clip_name': clip.name,
-                        # metafuze likes frame number
-                        'clip_duration': clip.duration - 1,
-                        'width': video.width,
-                        'height': video.height
-                    }
-
-                    rendered_xmls.append(metafuze_xml_template % kwargs)
-
-        return rendered_xmls
+        if video is None:
+            return groups
+
+        group_template = self.metafuze_xml_group_template
+        for track in video.tracks:
+            for clip in track.clips:
+                raw_file_path = \
+                    clip.file.pathurl.replace('file://localhost', '')
+                raw_mxf_path = '%s%s' % (
+                    os.path.splitext(raw_file_path)[0],
+                    '.mxf'
+                )
+
+                file_path = os.path.normpath(os.path.expandvars(raw_file_path))
+                mxf_path = os.path.normpath(os.path.expandvars(raw_mxf_path))
+
+                if skip_up_to_date and \
+                   self.is_mxf_up_to_date(file_path, mxf_path):
+                    continue
+
+                kwargs = {
+                    'file_pathurl': file_path,
+                    'mxf_pathurl': mxf_path,
+                    'sequence_name': self.name,
+                    'sequence_timecode': self.timecode,
+                    'clip_id': clip.id,
+                    'clip_name': clip.name,
+                    # metafuze likes frame number
+                    'clip_duration': clip.duration - 1,
+                    'width': video.width,
+                    'height': video.height
+                }
+
+                groups.append((file_path, mxf_path, group_template % kwargs))
+
+        return groups
+
+    def from_dict(self, data):
+        """Fills attributes with the given dictionary
+
+        :param dict data: A dictionary generated by :meth:`.to_dict`
+        """
+        self.name = data['name']
+        self.duration = data['duration']
+        self.timecode = str(data['timecode'])
+
+        if data['rate'] is not None:
+            rate = Rate()
+            rate.from_dict(data['rate'])
+            self.rate = rate
+
+        # create the shared files first
+        files = {}
+        for file_id, file_data in data['files'].items():
+            f = File()
+            f.from_dict(file_data)
+            files[file_id] = f
+
+        self.media = None
+        if data['media'] is not None:
+            media = Media()
+            media.from_dict(data['media'], files=files)
+            self.media = media
+
+    def to_dict(self):
+        """returns a dictionary version of this Sequence object, the files of
+        the clips are stored once in the "files" table
+        """
+        files = {}
+        return {
+            'name': self.name,
+            'duration': self.duration,
+            'timecode': self.timecode,
+            'rate': self.rate.to_dict() if self.rate else None,
+            'media': self.media.to_dict(files=files) if self.media else None,
+            'files': files
+        }
+
+    def to_metafuze_xml(self):
+        """Generates a MetaFuze compatible XML content per clip.
+
+        :returns: list of strings
+        """
+        return [
+            ''.join([self.metafuze_xml_header, group, self.metafuze_xml_footer])
+            for file_path, mxf_path, group in self._metafuze_groups()
+        ]
+
+    def write_metafuze_xmls(self, output_path, skip_up_to_date=True):
+        """Writes a MetaFuze compatible XML file per clip directly to the given
+        output path. The XML files are named after the MXF files.
+
+        :param str output_path: The folder that the XML files will be written
+          to.
+        :param bool skip_up_to_date: Skip the clips that already have an
+          up to date MXF file. Default is True.
+        :returns: list of XML file paths
+        """
+        try:
+            os.makedirs(output_path)
+        except OSError:
+            # path exists
+            pass
+
+        xml_paths = []
+        for file_path, mxf_path, group in \
+                self._metafuze_groups(skip_up_to_date=skip_up_to_date):
+            xml_path = os.path.join(
+                output_path,
+                '%s.xml' % os.path.splitext(os.path.basename(mxf_path))[0]
+            )
+            with open(xml_path, 'w') as f:
+                f.write(self.metafuze_xml_header)
+                f.write(group)
+                f.write(self.metafuze_xml_footer)
+            xml_paths.append(xml_path)
+
+        return xml_paths
 
 
 class Media(EditBase):
@@ -454,11 +679,17 @@ class Media(EditBase):
         video.from_xml(xml_video_tag)
         self.video = video
 
+        xml_audio_tag = xml_node.find('audio')
+        if xml_audio_tag is not None:
+            audio = Audio()
+            audio.from_xml(xml_audio_tag)
+            self.audio = audio
+
     def to_xml(self, indentation=2, pre_indent=0):
         """returns an xml version of this Media object
         """
         template = """%(pre_indent)s<media>
-%(video)s
+%(video)s%(audio)s
 %(pre_indent)s</media>"""
 
         video_data = self.video.to_xml(
@@ -466,12 +697,52 @@ class Media(EditBase):
             pre_indent=indentation + pre_indent
         )
 
+        audio_data = ''
+        if self.audio is not None:
+            audio_data = '\n%s' % self.audio.to_xml(
+                indentation=indentation,
+                pre_indent=indentation + pre_indent
+            )
+
         return template % {
             'video': video_data,
+            'audio': audio_data,
             'pre_indent': ' ' * pre_indent,
             'indentation': ' ' * indentation
         }
 
+    def from_dict(self, data, files=None):
+        """Fills attributes with the given dictionary
+
+        :param dict data: A dictionary generated by :meth:`.to_dict`
+        :param dict files: A dictionary of :class:`.File` instances keyed by
+          the file ids in the given data, which is used to share the same File
+          instances between the clips.
+        """
+        self.video = None
+        if data['video'] is not None:
+            video = Video()
+            video.from_dict(data['video'], files=files)
+            self.video = video
+
+        self.audio = None
+        if data['audio'] is not None:
+            audio = Audio()
+            audio.from_dict(data['audio'], files=files)
+            self.audio = audio
+
+    def to_dict(self, files=None):
+        """returns a dictionary version of this Media object
+
+        :param dict files: A dictionary that the data of the clip files are
+          stored in, keyed by the file ids. The clips then only store the file
+          ids, so the files shared between clips are stored once.
+        """
+        return {
+            'video': self.video.to_dict(files=files) if self.video else None,
+            'audio': self.audio.to_dict(files=files) if self.audio else None
+        }
+
 
 class Video(EditBase):
     """XML compatibility class for Sequencer
@@ -531,6 +802,102 @@ class Video(EditBase):
             'indentation': ' ' * indentation
         }
 
+    def from_dict(self, data, files=None):
+        """Fills attributes with the given dictionary
+
+        :param dict data: A dictionary generated by :meth:`.to_dict`
+        :param dict files: A dictionary of :class:`.File` instances keyed by
+          the file ids in the given data, which is used to share the same File
+          instances between the clips.
+        """
+        self.width = data['width']
+        self.height = data['height']
+
+        self.tracks = []
+        for track_data in data['tracks']:
+            track = Track()
+            track.from_dict(track_data, files=files)
+            self.tracks.append(track)
+
+    def to_dict(self, files=None):
+        """returns a dictionary version of this Video object
+
+        :param dict files: A dictionary that the data of the clip files are
+          stored in, keyed by the file ids. The clips then only store the file
+          ids, so the files shared between clips are stored once.
+        """
+        return {
+            'width': self.width,
+            'height': self.height,
+            'tracks': [track.to_dict(files=files) for track in self.tracks]
+        }
+
+
+class Audio(EditBase):
+    """XML compatibility class for Sequencer
+    """
+
+    def __init__(self):
+        self.tracks = []
+
+    def from_xml(self, xml_node):
+        """Fills attributes with the given XML node
+
+        :param xml_node: an xml.etree.ElementTree.Element instance
+        """
+        # create tracks
+        for track_tag in xml_node.findall('track'):
+            track = Track()
+            track.from_xml(track_tag)
+
+            self.tracks.append(track)
+
+    def to_xml(self, indentation=2, pre_indent=0):
+        """returns an xml version of this Audio object
+        """
+        template = """%(pre_indent)s<audio>
+%(tracks)s
+%(pre_indent)s</audio>"""
+
+        track_data = []
+        for track in self.tracks:
+            track_data.append(
+                track.to_xml(indentation=indentation,
+                             pre_indent=indentation + pre_indent)
+            )
+        track_data_as_str = '\n'.join(track_data)
+
+        return template % {
+            'tracks': track_data_as_str,
+            'pre_indent': ' ' * pre_indent,
+            'indentation': ' ' * indentation
+        }
+
+    def from_dict(self, data, files=None):
+        """Fills attributes with the given dictionary
+
+        :param dict data: A dictionary generated by :meth:`.to_dict`
+        :param dict files: A dictionary of :class:`.File` instances keyed by
+          the file ids in the given data, which is used to share the same File
+          instances between the clips.
+        """
+        self.tracks = []
+        for track_data in data['tracks']:
+            track = Track()
+            track.from_dict(track_data, files=files)
+            self.tracks.append(track)
+
+    def to_dict(self, files=None):
+        """returns a dictionary version of this Audio object
+
+        :param dict files: A dictionary that the data of the clip files are
+          stored in, keyed by the file ids. The clips then only store the file
+          ids, so the files shared between clips are stored once.
+        """
+        return {
+            'tracks': [track.to_dict(files=files) for track in self.tracks]
+        }
+
 
 class Track(EditBase):
     """XML compatibility class for Sequencer
@@ -608,11 +975,48 @@ class Track(EditBase):
             'indentation': ' ' * indentation
         }
 
+    def from_dict(self, data, files=None):
+        """Fills attributes with the given dictionary
+
+        :param dict data: A dictionary generated by :meth:`.to_dict`
+        :param dict files: A dictionary of :class:`.File` instances keyed by
+          the file ids in the given data, which is used to share the same File
+          instances between the clips.
+        """
+        self.locked = data['locked']
+        self.enabled = data['enabled']
+
+        self.clips = []
+        for clip_data in data['clips']:
+            clip = Clip()
+            clip.from_dict(clip_data, files=files)
+            self.clips.append(clip)
+
+    def to_dict(self, files=None):
+        """returns a dictionary version of this Track object
+
+        :param dict files: A dictionary that the data of the clip files are
+          stored in, keyed by the file ids. The clips then only store the file
+          ids, so the files shared between clips are stored once.
+        """
+        return {
+            'locked': self.locked,
+            'enabled': self.enabled,
+            'clips': [clip.to_dict(files=files) for clip in self.clips]
+        }
+
 
 class Clip(EditBase, NameMixin, DurationMixin):
     """XML compatibility class for Clip
+
+    A long edit may contain tens of thousands of clips, so the attributes
+    (including the ones of the mixins) are stored in ``__slots__``, the per
+    instance ``__dict__`` is never created.
     """
 
+    __slots__ = ('_name', '_duration', '_id', 'start', 'end', 'enabled',
+                 'in_', 'out', 'file', 'type', '_rate')
+
     def __init__(self, id=None, name='', start=0.0, end=0.0, duration=0.0,
                  enabled=True, in_=0, out=0, type_='Video', rate=None):
         NameMixin.__init__(self, name=name)
@@ -690,6 +1094,13 @@ class Clip(EditBase, NameMixin, DurationMixin):
         self.in_ = int(xml_node.find('in').text)
         self.out = int(xml_node.find('out').text)
 
+        rate_tag = xml_node.find('rate')
+        if rate_tag is not None:
+            self.rate = Rate.get(
+                timebase=rate_tag.find('timebase').text,
+                ntsc=rate_tag.find('ntsc').text.title() == 'True'
+            )
+
         file_tag = xml_node.find('file')
         if file_tag:
             f = File()
@@ -734,11 +1145,80 @@ class Clip(EditBase, NameMixin, DurationMixin):
             'rate': rate_xml
         }
 
+    def from_dict(self, data, files=None):
+        """Fills attributes with the given dictionary
+
+        :param dict data: A dictionary generated by :meth:`.to_dict`
+        :param dict files: A dictionary of :class:`.File` instances keyed by
+          the file ids in the given data, which is used to share the same File
+          instances between the clips.
+        """
+        self.id = data['id']
+        self.name = data['name']
+        self.type = str(data['type'])
+        self.start = data['start']
+        self.end = data['end']
+        self.duration = data['duration']
+        self.enabled = data['enabled']
+        self.in_ = data['in']
+        self.out = data['out']
+
+        self.rate = None
+        if data['rate'] is not None:
+            self.rate = Rate.get(
+                timebase=str(data['rate']['timebase']),
+                ntsc=data['rate']['ntsc']
+            )
+
+        self.file = None
+        file_data = data['file']
+        if isinstance(file_data, dict):
+            f = File()
+            f.from_dict(file_data)
+            self.file = f
+        elif file_data is not None:
+            # the id of a shared file
+            self.file = files[file_data]
+
+    def to_dict(self, files=None):
+        """returns a dictionary version of this Clip object
+
+        :param dict files: A dictionary that the data of the clip files are
+          stored in, keyed by the file ids. The clips then only store the file
+          ids, so the files shared between clips are stored once.
+        """
+        file_data = None
+        if self.file:
+            file_data = self.file.to_dict()
+            if files is not None:
+                file_id = self.file.id
+                if file_id not in files:
+                    files[file_id] = file_data
+                if files[file_id] == file_data:
+                    file_data = file_id
+                # else a different file with the same id, store it inline
+
+        return {
+            'id': self.id,
+            'name': self.name,
+            'type': self.type,
+            'start': self.start,
+            'end': self.end,
+            'duration': self.duration,
+            'enabled': self.enabled,
+            'in': self.in_,
+            'out': self.out,
+            'rate': self.rate.to_dict() if self.rate else None,
+            'file': file_data
+        }
+
 
 class File(EditBase, NameMixin, DurationMixin):
     """XML compatibility class for Sequencer
     """
 
+    __slots__ = ('_name', '_duration', '_pathurl', '_id', 'exported_once')
+
     def __init__(self, duration=0, name='', pathurl=''):
         NameMixin.__init__(self, name=name)
         DurationMixin.__init__(self, duration=duration)
@@ -850,6 +1330,24 @@ class File(EditBase, NameMixin, DurationMixin):
             'indentation': ' ' * indentation
         }
 
+    def from_dict(self, data):
+        """Fills attributes with the given dictionary
+
+        :param dict data: A dictionary generated by :meth:`.to_dict`
+        """
+        self.duration = data['duration']
+        self.name = data['name']
+        self.pathurl = str(data['pathurl'])
+
+    def to_dict(self):
+        """returns a dictionary version of this File object
+        """
+        return {
+            'duration': self.duration,
+            'name': self.name,
+            'pathurl': self.pathurl
+        }
+
 
 class Rate(EditBase):
     """XML compatibility class for Rate
@@ -861,15 +1359,59 @@ class Rate(EditBase):
 
     :param bool ntsc: A bool value showing if this is a dropframe rate. Default
       value is False.
+
+    Use :meth:`.get` to get a shared instance for a (timebase, ntsc) pair
+    instead of creating a new one for each clip.
     """
+
+    __slots__ = ('_timebase', '_ntsc', '_shared')
+
     __timebase_default_value = '25'
 
+    # the flyweight cache of the shared instances
+    _shared_instances = {}
+
     def __init__(self, timebase=None, ntsc=False):
+        self._shared = False
         self._timebase = None
         self._ntsc = None
         self.timebase = self._validate_timebase(timebase)
         self.ntsc = self._validate_ntsc(ntsc)
 
+    @classmethod
+    def get(cls, timebase=None, ntsc=False):
+        """Returns the shared Rate instance for the given timebase and ntsc
+        values, creates it if it doesn't exist yet.
+
+        The shared instances can not be changed.
+
+        :param str timebase: The frame rate.
+        :param bool ntsc: Is it a dropframe rate.
+        :return: :class:`.Rate`
+        """
+        timebase = cls._validate_timebase(timebase)
+        ntsc = cls._validate_ntsc(ntsc)
+        key = (timebase, ntsc)
+        try:
+            return cls._shared_instances[key]
+        except KeyError:
+            rate = cls(timebase=timebase, ntsc=ntsc)
+            rate._shared = True
+            cls._shared_instances[key] = rate
+            return rate
+
+    def _check_shared(self, attr_name):
+        """raises an AttributeError if this is a shared instance
+        """
+        if self._shared:
+            raise AttributeError(
+                '%(class)s.%(attr)s of a shared %(class)s instance can not be '
+                'changed, please create a new %(class)s instance' % {
+                    'class': self.__class__.__name__,
+                    'attr': attr_name
+                }
+            )
+
     @classmethod
     def _validate_timebase(cls, timebase):
         """validates the given timebase value
@@ -896,6 +1438,7 @@ class Rate(EditBase):
 
     @timebase.setter
     def timebase(self, timebase):
+        self._check_shared('timebase')
         self._timebase = self._validate_timebase(timebase)
 
     @classmethod
@@ -924,6 +1467,7 @@ class Rate(EditBase):
 
     @ntsc.setter
     def ntsc(self, ntsc):
+        self._check_shared('ntsc')
         self._ntsc = self._validate_ntsc(ntsc)
 
     def from_xml(self, xml_node):
@@ -949,3 +1493,112 @@ class Rate(EditBase):
             'pre_indent': ' ' * pre_indent,
             'indentation': ' ' * indentation
         }
+
+    def from_dict(self, data):
+        """Fills attributes with the given dictionary
+
+        :param dict data: A dictionary generated by :meth:`.to_dict`
+        """
+        self.timebase = str(data['timebase'])
+        self.ntsc = data['ntsc']
+
+    def to_dict(self):
+        """returns a dictionary version of this Rate object
+        """
+        return {
+            'timebase': self.timebase,
+            'ntsc': self.ntsc
+        }
+
+
+edit_cache_version = 2
+edit_cache_extension = '.anima_edit'
+
+
+def get_file_hash(path):
+    """returns the md5 hex digest of the content of the file at the given path
+
+    :param str path: The file path
+    :return: str
+    """
+    import hashlib
+
+    m = hashlib.md5()
+    with open(path, 'rb') as f:
+        chunk = f.read(1024 * 1024)
+        while chunk:
+            m.update(chunk)
+            chunk = f.read(1024 * 1024)
+    return m.hexdigest()
+
+
+def get_edit_cache_path(path):
+    """returns the path of the cache file of the given XML or EDL file, which
+    is stored beside the source file
+
+    :param str path: The XML or EDL file path
+    :return: str
+    """
+    return '%s%s' % (path, edit_cache_extension)
+
+
+def save_edit_cache(path, sequence, key=''):
+    """Stores the given Sequence in a cache file beside the given source file,
+    the cache is only valid as long as the source file content is the same.
+
+    :param str path: The XML or EDL file that the given Sequence is read from.
+    :param sequence: A :class:`.Sequence` instance.
+    :param str key: An additional key that the content of the Sequence depends
+      on, like the frame rate used while parsing an EDL.
+    :return: bool, False if the cache file could not be written
+    """
+    import json
+    from anima.utils import atomic_write
+
+    data = {
+        'version': edit_cache_version,
+        'hash': get_file_hash(path),
+        'key': key,
+        'sequence': sequence.to_dict()
+    }
+
+    try:
+        # write it atomically, so the other readers of the same source never
+        # read a half written cache
+        atomic_write(
+            get_edit_cache_path(path),
+            json.dumps(data, separators=(',', ':'))
+        )
+    except (IOError, OSError):
+        # the source may be in a read only location
+        return False
+    return True
+
+
+def load_edit_cache(path, key=''):
+    """Loads the Sequence from the cache file beside the given source file if
+    the source file has not changed since the cache is saved.
+
+    :param str path: The XML or EDL file path.
+    :param str key: The additional key used while saving the cache.
+    :return: A :class:`.Sequence` instance or None if there is no valid cache
+    """
+    import json
+
+    try:
+        with open(get_edit_cache_path(path)) as f:
+            data = json.loads(f.read())
+    except (IOError, OSError, ValueError):
+        return None
+
+    try:
+        if data['version'] != edit_cache_version or data['key'] != key \
+           or data['hash'] != get_file_hash(path):
+            return None
+
+        sequence = Sequence()
+        sequence.from_dict(data['sequence'])
+    except (IOError, OSError, KeyError, TypeError, ValueError):
+        return None
+
+    return sequence
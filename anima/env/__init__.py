@@ -126,33 +126,177 @@ def discover_env_vars(env_name=''):
     None of the definitions will overwrite system variables. So if you defined
     PYTHONPATH in your system environment then the variables defined in
     env.json will be appended to them.
+
+    The parsed content of the ``env.json`` file is compiled in to profiles
+    (one per environment name and os) which are cached in the local cache
+    folder, and the cache is only updated when the modification time or the
+    size of the ``env.json`` file is changed. So the (generally on a network
+    share) ``env.json`` file is not read again and again on every start of an
+    application. Run ``python -m anima.env`` to build the cache beforehand.
     """
     env_path = os.environ[anima_env_var]
 
     env_json_path = os.path.join(env_path, env_var_file_name)
 
-    # parse the file as a json file
-    with open(env_json_path) as f:
-        data = json.load(f)
+    profile = get_env_profile(env_json_path, env_name, get_os_name())
+
+    # set all the variables in one go
+    new_env = {}
+    for env_var, values in profile:
+        current_value = os.environ.get(env_var)
+        if current_value:
+            current_values = current_value.split(os.pathsep)
+            values = [
+                value for value in values if value not in current_values
+            ]
+            if not values:
+                continue
+            values.insert(0, current_value)
+        new_env[env_var] = os.pathsep.join(values)
+
+    os.environ.update(new_env)
 
-    # get the current os
+
+def get_os_name():
+    """returns the name of the current operating system as it is used in the
+    ``env.json`` file, one of "windows", "linux" or "osx"
+    """
     os_name = platform.system().lower()
 
     # replace darwin with osx
     if os_name == 'darwin':
         os_name = 'osx'
 
-    # get the keys
-    # first get *
-    def append_data_from(env_name_i):
-        if env_name_i in data:
-            if os_name in data[env_name_i]:
-                for env_var in data[env_name_i][os_name]:
-                    values = data[env_name_i][os_name][env_var]
-                    if env_var in os.environ:
-                        values.insert(0, os.environ[env_var])
+    return os_name
+
+
+def compile_env_profiles(data, os_name):
+    """Compiles the environment variables of all the environment names in the
+    given ``env.json`` data for the given os.
+
+    The variables defined in "*" comes first and then the ones in the
+    environment. The duplicate values are removed.
+
+    :param dict data: The parsed ``env.json`` data.
+    :param str os_name: The os name, "windows", "linux" or "osx".
+    :return: A dictionary where the keys are the environment names and the
+      values are a list of (variable name, values) tuples.
+    """
+    def get_variables(env_name_i):
+        return data.get(env_name_i, {}).get(os_name, {})
+
+    common_variables = get_variables('*')
+
+    profiles = {}
+    for env_name in set(list(data.keys()) + ['']):
+        variables = get_variables(env_name) if env_name != '*' else {}
+
+        profile = []
+        env_vars = list(common_variables.keys()) + [
+            env_var for env_var in variables
+            if env_var not in common_variables
+        ]
+        for env_var in env_vars:
+            values = []
+            for value in common_variables.get(env_var, []) + \
+                    variables.get(env_var, []):
+                if value not in values:
+                    values.append(value)
+            profile.append((env_var, values))
+        profiles[env_name] = profile
+
+    return profiles
+
+
+def get_env_profile_cache_path():
+    """returns the path of the environment profile cache file
+    """
+    from anima import local_cache_folder, env_profile_cache_file_name
+    return os.path.normpath(
+        os.path.expanduser(
+            os.path.join(local_cache_folder, env_profile_cache_file_name)
+        )
+    )
+
+
+def _read_env_profile_cache():
+    """returns the content of the environment profile cache file
+    """
+    try:
+        with open(get_env_profile_cache_path()) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def _env_json_stat(env_json_path):
+    """returns the modification time and size of the env.json file, raises
+    IOError if the file doesn't exist
+    """
+    try:
+        stat = os.stat(env_json_path)
+    except OSError as e:
+        raise IOError(e.errno, e.strerror, env_json_path)
+    return [stat.st_mtime, stat.st_size]
+
+
+def build_env_profile_cache(env_json_path, os_names=None):
+    """Parses the given ``env.json`` file and stores the compiled profiles of
+    all the environment names for the given os names in the cache.
+
+    :param str env_json_path: The path of the ``env.json`` file.
+    :param os_names: A list of os names, the default is the current os.
+    :return: The compiled profiles in a dictionary where the keys are the os
+      names.
+    """
+    if os_names is None:
+        os_names = [get_os_name()]
+
+    stat = _env_json_stat(env_json_path)
+
+    # parse the file as a json file
+    with open(env_json_path) as f:
+        data = json.load(f)
+
+    cache = _read_env_profile_cache()
+    entry = cache.get(env_json_path)
+    if not entry or entry.get('stat') != stat:
+        entry = {'stat': stat, 'profiles': {}}
+
+    for os_name in os_names:
+        entry['profiles'][os_name] = compile_env_profiles(data, os_name)
+    cache[env_json_path] = entry
+
+    try:
+        from anima.utils import atomic_write
+        atomic_write(get_env_profile_cache_path(), json.dumps(cache))
+    except (IOError, OSError):
+        # not being able to cache is not a problem
+        pass
+
+    return entry['profiles']
+
+
+def get_env_profile(env_json_path, env_name, os_name):
+    """Returns the compiled environment profile from the cache, the cache is
+    updated if the ``env.json`` file is changed.
+
+    :param str env_json_path: The path of the ``env.json`` file.
+    :param str env_name: The environment name.
+    :param str os_name: The os name.
+    :return: A list of (variable name, values) tuples.
+    """
+    stat = _env_json_stat(env_json_path)
 
-                    os.environ[env_var] = os.pathsep.join(values)
+    entry = _read_env_profile_cache().get(env_json_path)
+    if entry and entry.get('stat') == stat \
+       and os_name in entry.get('profiles', {}):
+        profiles = entry['profiles'][os_name]
+    else:
+        profiles = build_env_profile_cache(env_json_path, [os_name])[os_name]
 
-    append_data_from('*')
-    append_data_from(env_name)
+    profile = profiles.get(env_name)
+    if profile is None:
+        # the env_name is not in the env.json file, just use "*"
+        profile = profiles.get('', [])
+    return profile
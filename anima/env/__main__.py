@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012-2015, Anima Istanbul
+#
+# This module is part of anima-tools and is released under the BSD 2
+# License: http://www.opensource.org/licenses/BSD-2-Clause
+"""Builds the environment profile cache of the ``env.json`` file in $ANIMAPATH
+for all the environment names, so the applications do not need to read the
+``env.json`` file on their first start.
+
+Usage::
+
+  python -m anima.env [os_name ...]
+
+The os names can be "windows", "linux" and "osx", the default is the current
+os.
+"""
+import os
+import sys
+
+from anima import anima_env_var, env_var_file_name
+from anima.env import build_env_profile_cache, get_env_profile_cache_path
+
+
+if __name__ == '__main__':
+    os_names = sys.argv[1:] or None
+
+    env_json_path = os.path.join(os.environ[anima_env_var], env_var_file_name)
+    profiles = build_env_profile_cache(env_json_path, os_names)
+
+    for os_name in sorted(profiles):
+        print('%s: %s' % (os_name, ', '.join(sorted(profiles[os_name]))))
+    print('cached to: %s' % get_env_profile_cache_path())
@@ -3,12 +3,653 @@
 #
 # This module is part of anima-tools and is released under the BSD 2
 # License: http://www.opensource.org/licenses/BSD-2-Clause
+import collections
 import os
+import re
+import threading
+import time
 
 from anima import logger, log_file_handler
 from anima.recent import RecentFileManager
 
 
+class RepositoryIndex(object):
+    """A process wide prefix index of the Stalker Repositories.
+
+    The index holds the ``path``, ``windows_path``, ``linux_path`` and
+    ``osx_path`` values of all the Repositories in a dictionary, keyed by the
+    prefix and grouped by the prefix length. So finding the repository of a
+    path is a couple of dictionary lookups (one per distinct prefix length,
+    longest first) instead of a database query per path.
+
+    The index is rebuilt when:
+
+      * it is older than :attr:`.ttl` seconds,
+      * the database session is bound to another engine,
+      * a Repository is created, inserted, updated or deleted in this process,
+      * :meth:`.invalidate` is called explicitly.
+    """
+
+    ttl = 300
+
+    # incremented every time the index is rebuilt
+    generation = 0
+
+    _lock = threading.RLock()
+    _prefixes = None
+    _lengths = []
+    _built_at = 0
+    _bind = None
+    _listeners_registered = False
+
+    @classmethod
+    def invalidate(cls, *args, **kwargs):
+        """Invalidates the index, so it is rebuilt on next lookup. Accepts any
+        arguments, so it can directly be used as an SQLAlchemy event listener.
+        """
+        with cls._lock:
+            cls._prefixes = None
+
+    @classmethod
+    def _register_listeners(cls):
+        """registers the SQLAlchemy event listeners which invalidates the index
+        when a Repository is changed in this process
+        """
+        if cls._listeners_registered:
+            return
+
+        from sqlalchemy import event
+        from stalker import Repository
+        event.listen(Repository, 'init', cls.invalidate)
+        for event_name in ['after_insert', 'after_update', 'after_delete']:
+            event.listen(Repository, event_name, cls.invalidate)
+        cls._listeners_registered = True
+
+    @classmethod
+    def _current_bind(cls):
+        """returns the engine that the DBSession is bound to
+        """
+        from stalker.db import DBSession
+        return getattr(DBSession, 'bind', None)
+
+    @classmethod
+    def _is_valid(cls):
+        """returns True if the index can still be used
+        """
+        return cls._prefixes is not None \
+            and time.time() - cls._built_at < cls.ttl \
+            and cls._bind is cls._current_bind()
+
+    @classmethod
+    def build(cls):
+        """(re)builds the index from the database
+        """
+        with cls._lock:
+            cls._register_listeners()
+
+            from stalker import Repository
+            repos = Repository.query.all()
+
+            prefixes = {}
+            for repo in repos:
+                for prefix in [repo.path, repo.windows_path, repo.linux_path,
+                               repo.osx_path]:
+                    if prefix and prefix not in prefixes:
+                        prefixes[prefix] = repo.id
+
+            cls._lengths = sorted(
+                set(map(len, prefixes.keys())),
+                reverse=True
+            )
+            cls._bind = cls._current_bind()
+            cls._built_at = time.time()
+            cls._prefixes = prefixes
+            cls.generation += 1
+
+    @classmethod
+    def get_prefixes(cls):
+        """returns the repository prefixes and the generation of the index
+
+        :return: (dict, int), the dictionary keys are the prefixes and values
+          are the repository ids.
+        """
+        with cls._lock:
+            if not cls._is_valid():
+                cls.build()
+            return cls._prefixes, cls.generation
+
+    @classmethod
+    def lookup(cls, path):
+        """returns the id of the repository and the longest repository prefix
+        that the given path starts with
+
+        :param str path: path in a repository
+        :return: (int, str) or (None, None) if the path is not in any
+          repository.
+        """
+        with cls._lock:
+            if not cls._is_valid():
+                cls.build()
+            prefixes = cls._prefixes
+            lengths = cls._lengths
+
+        if path:
+            for length in lengths:
+                prefix = path[:length]
+                repo_id = prefixes.get(prefix)
+                if repo_id is not None:
+                    return repo_id, prefix
+        return None, None
+
+
+class PathNormalizer(object):
+    """Normalizes and converts paths to os independent paths in batches.
+
+    All the environments normalize the paths they find in the scenes with
+    ``os.path.normpath(os.path.expandvars(path)).replace('\\\\', '/')`` and
+    then convert them to os independent paths (``$REPO{id}/...``). This class
+    does the same for a list of paths in one pass:
+
+      * the results are cached in an LRU cache, keyed by the raw path, the
+        environment variables (only for paths using them) and the generation
+        of the :class:`.RepositoryIndex`,
+      * the repository prefixes are compiled in to one regular expression
+        once per :class:`.RepositoryIndex` generation, so converting a path
+        doesn't need a database query.
+
+    Use the process wide instance::
+
+        normalizer = PathNormalizer.instance()
+        os_independent_paths = normalizer.to_os_independent_paths(paths)
+
+    :param int max_cache_size: The maximum number of cached paths.
+    """
+
+    max_cache_size = 100000
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_cache_size=None):
+        if max_cache_size is not None:
+            self.max_cache_size = max_cache_size
+        self._cache = collections.OrderedDict()
+        self._lock = threading.RLock()
+        self._regex = None
+        self._env_vars = {}
+        self._generation = None
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def instance(cls):
+        """returns the process wide PathNormalizer instance
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def clear(self):
+        """clears the cache
+        """
+        with self._lock:
+            self._cache.clear()
+
+    @classmethod
+    def env_snapshot(cls):
+        """returns a hashable snapshot of the environment variables
+        """
+        return hash(frozenset(os.environ.items()))
+
+    @classmethod
+    def normalize(cls, path):
+        """Normalizes the given path, by expanding the environment variables,
+        and converting the backslashes to forward slashes
+
+        :param str path: The path to be normalized.
+        :return: str
+        """
+        return os.path.normpath(os.path.expandvars(path)).replace('\\', '/')
+
+    def _update_regex(self):
+        """compiles the repository prefixes to a regular expression if the
+        RepositoryIndex is changed
+        """
+        prefixes, generation = RepositoryIndex.get_prefixes()
+        if generation != self._generation:
+            # longest prefixes first
+            sorted_prefixes = sorted(prefixes, key=len, reverse=True)
+            self._regex = None
+            self._env_vars = {}
+            if sorted_prefixes:
+                self._regex = re.compile(
+                    '^(%s)' % '|'.join(map(re.escape, sorted_prefixes))
+                )
+
+                # use the env vars of the repositories
+                from stalker import Repository
+                repos = Repository.query\
+                    .filter(Repository.id.in_(set(prefixes.values())))\
+                    .all()
+                env_vars = dict((repo.id, repo.env_var) for repo in repos)
+                self._env_vars = dict(
+                    (prefix, env_vars[repo_id])
+                    for prefix, repo_id in prefixes.items()
+                    if repo_id in env_vars
+                )
+            self._generation = generation
+            # the cached results are not valid anymore
+            self._cache.clear()
+        return generation
+
+    def _convert(self, path):
+        """converts the given normalized path to an os independent path
+        """
+        if self._regex is None:
+            return path
+
+        match = self._regex.match(path)
+        if not match:
+            return path
+
+        prefix = match.group(1)
+        env_var = self._env_vars.get(prefix)
+        if env_var is None:
+            return path
+
+        # the same with Repository.to_os_independent_path(), the path is
+        # made relative to the matched prefix instead of the native path of
+        # the repository, which is the same path in another os
+        return '$%s/%s' % (
+            env_var,
+            os.path.relpath(path, prefix).replace('\\', '/')
+        )
+
+    def _process(self, paths, os_independent):
+        """normalizes the given paths and converts them to os independent paths
+        if os_independent is True
+        """
+        results = []
+        env_snapshot = None
+        with self._lock:
+            generation = self._update_regex() if os_independent else None
+
+            for path in paths:
+                if not path:
+                    results.append(path)
+                    continue
+
+                # only the paths with environment variables depend on the
+                # environment
+                env_key = None
+                if '$' in path or '%' in path:
+                    if env_snapshot is None:
+                        env_snapshot = self.env_snapshot()
+                    env_key = env_snapshot
+
+                key = (path, env_key, os_independent, generation)
+                try:
+                    result = self._cache.pop(key)
+                    self.hits += 1
+                except KeyError:
+                    self.misses += 1
+                    result = self.normalize(path)
+                    if os_independent:
+                        result = self._convert(result)
+
+                # move it to the end (most recently used)
+                self._cache[key] = result
+                results.append(result)
+
+            while len(self._cache) > self.max_cache_size:
+                self._cache.popitem(last=False)
+
+        return results
+
+    def normalize_paths(self, paths):
+        """Normalizes the given paths, see :meth:`.normalize`.
+
+        :param paths: A list of paths.
+        :return: list
+        """
+        return self._process(paths, False)
+
+    def to_os_independent_paths(self, paths):
+        """Normalizes the given paths and converts them to os independent
+        paths, the paths which are not in any repository are only normalized.
+
+        :param paths: A list of paths.
+        :return: list
+        """
+        return self._process(paths, True)
+
+    def to_os_independent_path(self, path):
+        """Normalizes the given path and converts it to an os independent path
+
+        :param str path: The path.
+        :return: str
+        """
+        return self._process([path], True)[0]
+
+
+class LookupCache(object):
+    """An opt-in, operation scoped cache for the Stalker Version and
+    Repository lookups.
+
+    Use it as a context manager around an operation (open, save, publish
+    etc.) which looks up the same entities over and over again::
+
+        with LookupCache() as cache:
+            env.save_as(version)
+            ...
+
+        print(cache.hits)  # the number of database queries saved
+
+    While the cache is active (in the current thread),
+    :meth:`.EnvironmentBase.get_version_from_full_path`,
+    :meth:`.EnvironmentBase.get_versions_from_full_paths` and
+    :meth:`.EnvironmentBase.find_repo` are served from the cache. Versions are
+    loaded together with their ``task``, ``task.project`` and
+    ``task.project.repositories`` with eager loading. Only the found entities
+    are cached, and the cache is cleared at the end of the operation.
+    """
+
+    _local = threading.local()
+
+    def __init__(self):
+        self.versions_by_full_path = {}
+        self.repositories = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def __enter__(self):
+        self._stack().append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stack().remove(self)
+        logger.debug(
+            'LookupCache saved %i of %i queries' %
+            (self.hits, self.hits + self.misses)
+        )
+        self.clear()
+
+    @classmethod
+    def _stack(cls):
+        """returns the stack of active caches of the current thread
+        """
+        try:
+            return cls._local.stack
+        except AttributeError:
+            cls._local.stack = []
+            return cls._local.stack
+
+    @classmethod
+    def current(cls):
+        """returns the active LookupCache of the current thread or None
+        """
+        stack = cls._stack()
+        if stack:
+            return stack[-1]
+
+    def clear(self):
+        """clears the cached entities
+        """
+        self.versions_by_full_path.clear()
+        self.repositories.clear()
+
+    @classmethod
+    def version_query(cls):
+        """returns a Version query which eagerly loads the task, project and
+        repositories of the versions
+        """
+        from sqlalchemy.orm import joinedload
+        from stalker import Version, Task, Project
+        from stalker.models.project import ProjectRepository
+        # Project.repositories is an association proxy, load the relationship
+        # behind it
+        return Version.query.options(
+            joinedload(Version.task)
+            .joinedload(Task.project)
+            .joinedload(Project.repositories_proxy)
+            .joinedload(ProjectRepository.repository)
+        )
+
+    def add_version(self, version):
+        """adds the given version to the cache
+        """
+        self.versions_by_full_path[version.full_path] = version
+        return version
+
+    def get_versions_by_full_paths(self, full_paths):
+        """returns the Versions with the given os independent full paths, only
+        the missing ones are queried from the database (in one query)
+
+        :param full_paths: A list of os independent paths.
+        :return: list of Versions
+        """
+        versions = []
+        missing_paths = []
+        for full_path in full_paths:
+            version = self.versions_by_full_path.get(full_path)
+            if version is not None:
+                versions.append(version)
+            else:
+                missing_paths.append(full_path)
+
+        # the hits and misses are counted per query
+        if not missing_paths:
+            self.hits += 1
+        else:
+            self.misses += 1
+            from stalker import Version
+            for version in self.version_query()\
+                    .filter(Version.full_path.in_(missing_paths)).all():
+                versions.append(self.add_version(version))
+
+        return versions
+
+    def get_version_by_full_path(self, full_path):
+        """returns the Version with the given os independent full path
+
+        :param str full_path: An os independent path.
+        """
+        versions = self.get_versions_by_full_paths([full_path])
+        if versions:
+            return versions[0]
+
+    def get_repository(self, id_):
+        """returns the Repository with the given id
+
+        :param int id_: The id of the Repository.
+        """
+        repo = self.repositories.get(id_)
+        if repo is not None:
+            self.hits += 1
+            return repo
+
+        self.misses += 1
+        from stalker import Repository
+        repo = Repository.query.get(id_)
+        if repo is not None:
+            self.repositories[id_] = repo
+        return repo
+
+
+class ReferenceResolver(object):
+    """Resolves the references of a Version.
+
+    Walks the inputs of the given :class:`~stalker.models.version.Version`
+    and decides for each of them (from the deepest to the shallowest
+    reference) if it should be left as it is, updated to its latest published
+    version or a new published version should be created for it, because its
+    references are updated.
+
+    The latest published versions of all the versions in the hierarchy are
+    retrieved with one query, so the resolution is done in Python without
+    querying the database for each version, and it doesn't depend on any
+    host application.
+
+    :param version: The :class:`~stalker.models.version.Version` instance
+      which the references will be resolved of.
+    :param root: The versions directly referenced to the scene, it is stored
+      in the ``root`` key of the result.
+    """
+
+    def __init__(self, version, root=None):
+        self.version = version
+        self.root = root
+        self.latest_published_versions = {}
+        self._dfs_version_references = None
+
+    def get_dfs_version_references(self):
+        """returns the inputs of the version (excluding the version itself)
+        in depth first order
+        """
+        if self._dfs_version_references is None:
+            dfs_version_references = []
+            if self.version:
+                dfs_version_references = list(self.version.walk_inputs())
+                # pop the first element which is the current scene
+                dfs_version_references.pop(0)
+            self._dfs_version_references = dfs_version_references
+        return self._dfs_version_references
+
+    @classmethod
+    def get_latest_published_versions(cls, versions, chunk_size=500):
+        """returns the latest published versions of the given versions
+
+        :param versions: A list of :class:`~stalker.models.version.Version`
+          instances.
+        :param int chunk_size: The maximum number of tasks in one query.
+        :return: A dictionary with keys are (task_id, take_name) tuples and the
+          values are the latest published version or None.
+        """
+        from stalker import Version
+
+        latest_published_versions = {}
+        for v in versions:
+            latest_published_versions[(v.task_id, v.take_name)] = None
+
+        task_ids = sorted(set(key[0] for key in latest_published_versions))
+        for i in range(0, len(task_ids), chunk_size):
+            chunk = task_ids[i:i + chunk_size]
+            published_versions = Version.query\
+                .filter(Version.task_id.in_(chunk))\
+                .filter(Version.is_published == True)\
+                .all()
+
+            for v in published_versions:
+                key = (v.task_id, v.take_name)
+                if key not in latest_published_versions:
+                    continue
+                latest_published_version = latest_published_versions[key]
+                if latest_published_version is None \
+                   or v.version_number > \
+                        latest_published_version.version_number:
+                    latest_published_versions[key] = v
+
+        return latest_published_versions
+
+    def latest_published_version(self, version):
+        """returns the latest published version of the given version from the
+        prefetched data
+        """
+        key = (version.task_id, version.take_name)
+        try:
+            return self.latest_published_versions[key]
+        except KeyError:
+            latest_published_version = version.latest_published_version
+            self.latest_published_versions[key] = latest_published_version
+            return latest_published_version
+
+    def is_latest_published_version(self, version):
+        """returns True if the given version is the latest published version
+        """
+        return self.latest_published_version(version) == version
+
+    def resolve(self, callback=None):
+        """Resolves the references and returns a reference resolution
+        dictionary, see :func:`anima.env.empty_reference_resolution` for
+        details.
+
+        :param callback: A callable which is called with each resolved version,
+          it can be used to show the progress.
+        :return: dict
+        """
+        from anima.env import empty_reference_resolution
+        reference_resolution = empty_reference_resolution(root=self.root)
+
+        if not self.version:
+            return reference_resolution
+
+        # reverse walk in DFS
+        dfs_version_references = self.get_dfs_version_references()
+
+        self.latest_published_versions = \
+            self.get_latest_published_versions(dfs_version_references)
+
+        # the ids of the versions in 'update' and 'create'
+        changed_version_ids = set()
+
+        # iterate back in the list
+        for v in reversed(dfs_version_references):
+            # check inputs first
+            to_be_updated_list = [
+                ref_v for ref_v in v.inputs
+                if not self.is_latest_published_version(ref_v)
+            ]
+
+            if to_be_updated_list:
+                action = 'create'
+                # check if there is a new published version of this version
+                # that is using all the updated versions of the references
+                latest_published_version = self.latest_published_version(v)
+                if latest_published_version and \
+                   latest_published_version != v:
+                    # so there is a new published version
+                    # check if its children needs any update
+                    # and the updated child versions are already
+                    # referenced to the this published version
+                    latest_inputs = latest_published_version.inputs
+                    if all([self.latest_published_version(ref_v)
+                            in latest_inputs
+                            for ref_v in to_be_updated_list]):
+                        # so all new versions are referenced to this published
+                        # version, just update to this latest published version
+                        action = 'update'
+            else:
+                # nothing needs to be updated,
+                # so check if this version has a new version,
+                # also there could be no reference under this referenced
+                # version
+                if self.is_latest_published_version(v):
+                    # do nothing
+                    action = 'leave'
+                else:
+                    # update to latest published version
+                    action = 'update'
+
+                # before setting the action check all the inputs in
+                # reference_resolution, if any of them are update, or create
+                # then set this one to 'create'
+                if any(rev_v.id in changed_version_ids for rev_v in v.inputs):
+                    action = 'create'
+
+            # so append this v to the related action list
+            reference_resolution[action].append(v)
+            if action != 'leave':
+                changed_version_ids.add(v.id)
+
+            if callback is not None:
+                callback(v)
+
+        return reference_resolution
+
+
 class EnvironmentBase(object):
     """Connects the environment (the host program) to Stalker.
 
@@ -135,22 +776,12 @@ class EnvironmentBase(object):
         :param path: The path that wanted to be trimmed
         :return: str
         """
-        # get the repo first
-        repo = self.find_repo(path)
+        repo_id, prefix = RepositoryIndex.lookup(path)
 
-        if not repo:
+        if repo_id is None:
             return path
 
-        # then try to trim the path
-        if path.startswith(repo.path):
-            return path[len(repo.path):]
-        elif path.startswith(repo.windows_path):
-            return path[len(repo.windows_path):]
-        elif path.startswith(repo.linux_path):
-            return path[len(repo.linux_path):]
-        elif path.startswith(repo.osx_path):
-            return path[len(repo.osx_path):]
-        return path
+        return path[len(prefix):]
 
     @classmethod
     def find_repo(cls, path):
@@ -162,19 +793,18 @@ class EnvironmentBase(object):
         # path could be using environment variables so expand them
         # path = os.path.expandvars(path)
 
-        # first find the repository
-        from stalker import Repository
+        repo_id, prefix = RepositoryIndex.lookup(path)
+        if repo_id is None:
+            return None
 
-        repos = Repository.query.all()
-        found_repo = None
-        for repo in repos:
-            if path.startswith(repo.path) \
-               or path.startswith(repo.windows_path) \
-               or path.startswith(repo.linux_path) \
-               or path.startswith(repo.osx_path):
-                found_repo = repo
-                break
-        return found_repo
+        cache = LookupCache.current()
+        if cache is not None:
+            return cache.get_repository(repo_id)
+
+        # the repository is generally already in the identity map of the
+        # session, so this will not hit the database
+        from stalker import Repository
+        return Repository.query.get(repo_id)
 
     def get_versions_from_path(self, path):
         """Finds Version instances from the given path value.
@@ -228,23 +858,75 @@ class EnvironmentBase(object):
         :return: :class:`~stalker.models.version.Version`
         """
         logger.debug('full_path: %s' % full_path)
-        # convert '\\' to '/'
-        full_path = os.path.normpath(
-            os.path.expandvars(full_path)
-        ).replace('\\', '/')
-
-        # trim repo path
-        from stalker import Repository, Version
-        os_independent_path = Repository.to_os_independent_path(full_path)
+        # convert '\\' to '/' and trim repo path
+        from stalker import Version
+        os_independent_path = \
+            PathNormalizer.instance().to_os_independent_path(full_path)
 
         # try to get a version with that info
         logger.debug('getting a version with path: %s' % full_path)
 
-        version = Version.query\
-            .filter(Version.full_path == os_independent_path).first()
+        cache = LookupCache.current()
+        if cache is not None:
+            version = cache.get_version_by_full_path(os_independent_path)
+        else:
+            version = Version.query\
+                .filter(Version.full_path == os_independent_path).first()
         logger.debug('version: %s' % version)
         return version
 
+    @classmethod
+    def get_versions_from_full_paths(cls, full_paths, chunk_size=500):
+        """Finds the Version instances of the given full_paths in bulk.
+
+        This is the bulk version of
+        :meth:`~anima.env.base.EnvironmentBase.get_version_from_full_path`.
+        The paths are converted to os independent paths and all the Versions
+        are retrieved with one query per ``chunk_size`` paths.
+
+        :param full_paths: A list of full paths.
+        :param int chunk_size: The maximum number of paths in one query.
+
+        :return: A dictionary with keys are the given full paths and values
+          are the :class:`~stalker.models.version.Version` instances. Paths
+          that doesn't have a matching Version are not in the dictionary.
+        """
+        from stalker import Version
+
+        # os independent path to the given full paths
+        unique_full_paths = [
+            full_path for full_path in set(full_paths) if full_path
+        ]
+        os_independent_paths = {}
+        for full_path, os_independent_path in zip(
+                unique_full_paths,
+                PathNormalizer.instance().to_os_independent_paths(
+                    unique_full_paths
+                )):
+            os_independent_paths.setdefault(os_independent_path, [])\
+                .append(full_path)
+
+        unique_paths = sorted(os_independent_paths.keys())
+        logger.debug(
+            'getting versions of %i unique paths' % len(unique_paths)
+        )
+
+        cache = LookupCache.current()
+        versions = {}
+        for i in range(0, len(unique_paths), chunk_size):
+            chunk = unique_paths[i:i + chunk_size]
+            if cache is not None:
+                found_versions = cache.get_versions_by_full_paths(chunk)
+            else:
+                found_versions = Version.query\
+                    .filter(Version.full_path.in_(chunk)).all()
+            for version in found_versions:
+                for full_path in \
+                        os_independent_paths.get(version.full_path, []):
+                    versions[full_path] = version
+
+        return versions
+
     def get_current_version(self):
         """Returns the current Version instance from the environment.
 
@@ -282,8 +964,9 @@ class EnvironmentBase(object):
             recent_files = None
 
         if recent_files is not None:
+            versions = self.get_versions_from_full_paths(recent_files)
             for recent_file in recent_files:
-                version = self.get_version_from_full_path(recent_file)
+                version = versions.get(recent_file)
                 if version is not None:
                     break
 
@@ -325,11 +1008,17 @@ class EnvironmentBase(object):
         raise NotImplementedError
 
     def check_referenced_versions(self):
-        """Checks the referenced versions
+        """Deeply checks the references of the current version with a
+        :class:`.ReferenceResolver` and returns a reference resolution
+        dictionary with 'root', 'leave', 'update' and 'create' keys.
 
-        :returns: list of Versions
+        :returns: dict
         """
-        raise NotImplementedError
+        resolver = ReferenceResolver(
+            self.get_current_version(),
+            root=self.get_referenced_versions()
+        )
+        return resolver.resolve()
 
     def get_referenced_versions(self):
         """Returns the :class:`~stalker.models.version.Version` instances which
@@ -463,41 +1152,321 @@ class EnvironmentBase(object):
         ).replace('\\', '/')
 
     @classmethod
-    def create_local_copy(cls, version):
-        """Creates a local copy of the given version
+    def local_backup_full_path(cls, version):
+        """returns the full path of the local copy of the given version
 
-        :param version:
-        :return:
+        :param version: A :class:`~stalker.models.version.Version` instance.
+        :return: str
         """
-        output_path = os.path.join(
+        return os.path.join(
             cls.local_backup_path(),
-            version.absolute_path.replace(':', '')
+            version.absolute_full_path.replace(':', '').lstrip('/')
         ).replace('\\', '/')
 
-        output_full_path = os.path.join(
-            cls.local_backup_path(),
-            version.absolute_full_path.replace(':', '')
-        ).replace('\\', '/')
+    @classmethod
+    def create_local_copy(cls, version, block=False):
+        """Creates a local copy of the given version.
+
+        The copy is done in the background by the :class:`.LocalBackupWorker`,
+        so it doesn't slow down the save.
+
+        :param version: A :class:`~stalker.models.version.Version` instance.
+        :param bool block: If True, waits until the copy is done.
+        :return:
+        """
+        output_full_path = cls.local_backup_full_path(version)
+
+        worker = LocalBackupWorker.instance()
+        worker.add(version.absolute_full_path, output_full_path)
+        logger.debug('queued a copy to: %s' % output_full_path)
+
+        if block:
+            worker.wait()
+
+
+class LocalBackupWorker(object):
+    """Creates the local backup copies in a background thread.
+
+    The files are copied in the order they are added. A copy is skipped if
+    the last copy has the same content (same size and same MD5 hash), the
+    last ``max_copies`` copies of a file are kept by renaming the previous
+    copies to ``<path>.1``, ``<path>.2`` etc., and the least recently used
+    files are deleted when the total size of the backup folder exceeds
+    ``max_bytes``. The copy speed can be limited with ``bytes_per_second`` so
+    the backup doesn't compete with the application for the disk.
+
+    :param str backup_path: The root of the backup folder, the default is
+      :meth:`.EnvironmentBase.local_backup_path`.
+    :param int max_copies: The number of copies kept per file. The default is
+      ``anima.local_backup_max_copies``.
+    :param int max_bytes: The maximum total size of the backup folder in
+      bytes, 0 means no limit. The default is ``anima.local_backup_max_bytes``.
+    :param int bytes_per_second: The maximum copy speed, 0 means no limit.
+      The default is ``anima.local_backup_bytes_per_second``.
+    """
+
+    buffer_size = 4 * 1024 * 1024
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, backup_path=None, max_copies=None, max_bytes=None,
+                 bytes_per_second=None):
+        import anima
+        if backup_path is None:
+            backup_path = EnvironmentBase.local_backup_path()
+        if max_copies is None:
+            max_copies = anima.local_backup_max_copies
+        if max_bytes is None:
+            max_bytes = anima.local_backup_max_bytes
+        if bytes_per_second is None:
+            bytes_per_second = anima.local_backup_bytes_per_second
+
+        self.backup_path = backup_path
+        self.max_copies = max(1, max_copies)
+        self.max_bytes = max_bytes
+        self.bytes_per_second = bytes_per_second
+
+        self.copied_files = []
+        self.skipped_files = []
+        self.errors = []
+
+        self._queue = []
+        self._condition = threading.Condition()
+        self._busy = False
+        self._thread = None
+
+        # the hashes of the backup files, to not to hash them again
+        self._hashes = {}
+        # path: (last use time, size) of the files in the backup folder
+        self._files = None
+
+    @classmethod
+    def instance(cls):
+        """returns the process wide LocalBackupWorker instance
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def add(self, source, target):
+        """queues a copy of the given source to the target path
 
-        # create intermediate folders
+        :param str source: The path of the file to be backed up.
+        :param str target: The path of the backup file.
+        """
+        with self._condition:
+            # the latest save wins
+            self._queue = [
+                item for item in self._queue if item[1] != target
+            ]
+            self._queue.append((source, target))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify_all()
+
+    def wait(self):
+        """blocks until all the queued copies are done
+        """
+        with self._condition:
+            while self._queue or self._busy:
+                self._condition.wait()
+
+    def _run(self):
+        """the worker loop
+        """
+        while True:
+            with self._condition:
+                if not self._queue:
+                    self._thread = None
+                    self._condition.notify_all()
+                    return
+                source, target = self._queue.pop(0)
+                self._busy = True
+
+            try:
+                self.backup(source, target)
+            except (IOError, OSError) as e:
+                # no space left etc.
+                logger.debug('could not backup %s: %s' % (source, e))
+                self.errors.append((source, e))
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+    @classmethod
+    def file_hash(cls, path):
+        """returns the MD5 hash of the file at the given path
+        """
+        import hashlib
+        md5 = hashlib.md5()
+        with open(path, 'rb') as f:
+            while True:
+                data = f.read(cls.buffer_size)
+                if not data:
+                    break
+                md5.update(data)
+        return md5.hexdigest()
+
+    def backup(self, source, target):
+        """Copies the given source to the target, returns False if the copy is
+        skipped because the target has the same content.
+
+        :param str source: The path of the file to be backed up.
+        :param str target: The path of the backup file.
+        :return: bool
+        """
+        source_size = os.path.getsize(source)
+
+        if os.path.exists(target) \
+           and os.path.getsize(target) == source_size:
+            source_hash = self.file_hash(source)
+            target_hash = self._hashes.get(target)
+            if target_hash is None:
+                target_hash = self.file_hash(target)
+            if source_hash == target_hash:
+                logger.debug('skipping identical copy: %s' % target)
+                self._hashes[target] = target_hash
+                self._touch(target)
+                self.skipped_files.append(source)
+                return False
+
+        target_dir = os.path.dirname(target)
+        if not os.path.exists(target_dir):
+            try:
+                os.makedirs(target_dir)
+            except OSError:
+                # already exists
+                pass
+
+        # copy to a temp file first, so the previous copies are intact if
+        # the copy fails
+        temp_path = '%s.part' % target
+        source_hash = self._copy(source, temp_path)
+
+        self._rotate(target)
+        os.rename(temp_path, target)
+        self._hashes[target] = source_hash
+        self._touch(target)
+        self._evict(keep=target)
+
+        logger.debug('created copy to: %s' % target)
+        self.copied_files.append(source)
+        return True
+
+    def _copy(self, source, target):
+        """copies the source to target by limiting the copy speed and returns
+        the MD5 hash of the copied data
+        """
+        import hashlib
+        import time
+        md5 = hashlib.md5()
+        start = time.time()
+        copied_bytes = 0
+        with open(source, 'rb') as src:
+            with open(target, 'wb') as dst:
+                while True:
+                    data = src.read(self.buffer_size)
+                    if not data:
+                        break
+                    dst.write(data)
+                    md5.update(data)
+                    copied_bytes += len(data)
+
+                    if self.bytes_per_second:
+                        expected_duration = \
+                            copied_bytes / float(self.bytes_per_second)
+                        delay = expected_duration - (time.time() - start)
+                        if delay > 0:
+                            time.sleep(delay)
+        return md5.hexdigest()
+
+    def _rotate(self, target):
+        """renames the previous copies of the target, and deletes the ones
+        exceeding the max_copies
+        """
+        if not os.path.exists(target):
+            return
+
+        paths = [target] + \
+            ['%s.%s' % (target, i) for i in range(1, self.max_copies)]
+        last_path = paths[-1]
+        if os.path.exists(last_path):
+            self._remove(last_path)
+
+        for i in range(len(paths) - 2, -1, -1):
+            path = paths[i]
+            if os.path.exists(path):
+                next_path = paths[i + 1]
+                os.rename(path, next_path)
+                if path in self._hashes:
+                    self._hashes[next_path] = self._hashes.pop(path)
+                if self._files is not None and path in self._files:
+                    self._files[next_path] = self._files.pop(path)
+
+    def _remove(self, path):
+        """removes the given backup file
+        """
+        os.remove(path)
+        self._hashes.pop(path, None)
+        if self._files is not None:
+            self._files.pop(path, None)
+
+    def _touch(self, path):
+        """marks the given path as used
+        """
+        import time
+        now = time.time()
         try:
-            os.makedirs(output_path)
+            os.utime(path, (now, now))
         except OSError:
-            # already exists
             pass
+        if self._files is not None:
+            self._files[path] = (now, os.path.getsize(path))
 
-        import shutil
+    def _scan(self):
+        """scans the backup folder once to get the files and their sizes
+        """
+        self._files = {}
+        for root, dirs, files in os.walk(self.backup_path):
+            for file_name in files:
+                path = os.path.join(root, file_name).replace('\\', '/')
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                self._files[path] = (stat.st_mtime, stat.st_size)
+
+    def _evict(self, keep=None):
+        """deletes the least recently used backup files until the total size
+        is smaller than max_bytes
+        """
+        if not self.max_bytes:
+            return
 
-        try:
-            shutil.copy(
-                version.absolute_full_path,
-                output_full_path
-            )
-        except IOError:
-            # no space left
-            pass
+        if self._files is None:
+            self._scan()
 
-        logger.debug('created copy to: %s' % output_full_path)
+        total_size = sum(size for _, size in self._files.values())
+        if total_size <= self.max_bytes:
+            return
+
+        for path in sorted(self._files, key=lambda x: self._files[x][0]):
+            if total_size <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            size = self._files[path][1]
+            try:
+                self._remove(path)
+            except OSError:
+                continue
+            logger.debug('evicted old backup: %s' % path)
+            total_size -= size
 
 
 class Filter(object):
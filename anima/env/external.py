@@ -208,13 +208,9 @@ class ExternalEnv(EnvironmentBase):
             raise TypeError('version argument should be a '
                             'stalker.version.Version instance, not %s' %
                             version.__class__.__name__)
-        version.update_paths()
-        version.extension = self.extensions[0]
-        version.created_with = self.name
+        self.conform_versions([version])
         logger.debug('version.absolute_full_path : %s' %
                      version.absolute_full_path)
-        logger.debug('finished conforming version extension to: %s' %
-                     self.extensions[0])
 
     def initialize_structure(self, version):
         """Initializes the environment folder structure
@@ -232,12 +228,95 @@ class ExternalEnv(EnvironmentBase):
                 )
             )
 
-        # create the folder in version.absolute_path
-        extension = version.extension
-        version.update_paths()
-        version.extension = extension
-        for folder in self.structure:
-            folder_path = os.path.join(version.absolute_path, folder)
+        # create the folders in version.absolute_path
+        self.initialize_structures([version])
+
+    def _validate_versions(self, versions, method_name):
+        """validates the given list of versions
+
+        :param versions: A list of :class:`~stalker.models.version.Version`
+          instances.
+        :param str method_name: The name of the calling method, used in the
+          error message.
+        :return: list
+        """
+        from stalker import Version
+        versions = list(versions)
+        for version in versions:
+            if not isinstance(version, Version):
+                raise TypeError(
+                    'All elements in "versions" argument in %s.%s should be '
+                    'a stalker.version.Version instance, not %s' % (
+                        self.__class__.__name__,
+                        method_name,
+                        version.__class__.__name__
+                    )
+                )
+        return versions
+
+    def conform_versions(self, versions):
+        """Conforms many versions to this environment at once.
+
+        :param versions: A list of :class:`~stalker.models.version.Version`
+          instances.
+        :return: None
+        """
+        versions = self._validate_versions(versions, 'conform_versions')
+        extension = self.extensions[0]
+        for version in versions:
+            version.update_paths()
+            version.extension = extension
+            version.created_with = self.name
+        logger.debug('conformed %s versions to: %s' %
+                     (len(versions), extension))
+
+    def initialize_structures(self, versions):
+        """Initializes the environment folder structure of many versions at
+        once.
+
+        The folder paths of all the versions are collected first, so each
+        folder is created only once even if the versions are sharing the
+        same path.
+
+        :param versions: A list of :class:`~stalker.models.version.Version`
+          instances.
+        :return: None
+        """
+        versions = self._validate_versions(versions, 'initialize_structures')
+
+        folder_paths = set()
+        for version in versions:
+            extension = version.extension
+            version.update_paths()
+            version.extension = extension
+            for folder in self.structure:
+                folder_paths.add(
+                    os.path.normpath(
+                        os.path.join(version.absolute_path, folder)
+                    )
+                )
+
+        self.create_folders(folder_paths)
+
+    @classmethod
+    def create_folders(cls, folder_paths):
+        """Creates the given folders in one pass.
+
+        The paths are de-duplicated and the paths which are parents of an
+        other path in the list are skipped, as ``os.makedirs`` will create
+        them anyway.
+
+        :param folder_paths: A list of folder paths.
+        :return: list of folder paths that ``os.makedirs`` is called for
+        """
+        leaf_paths = []
+        for folder_path in sorted(set(folder_paths), reverse=True):
+            if leaf_paths \
+               and leaf_paths[-1].startswith(folder_path + os.path.sep):
+                continue
+            leaf_paths.append(folder_path)
+
+        for folder_path in leaf_paths:
             logger.debug('creating: %s' % folder_path)
             try:
                 os.makedirs(folder_path)
@@ -245,6 +324,8 @@ class ExternalEnv(EnvironmentBase):
                 # dir exists
                 pass
 
+        return leaf_paths
+
     def save_as(self, version):
         """A compatibility method which will allow this environment to be used
         in place of stalker.model.env.EnvironmentBase derivatives.
@@ -257,6 +338,20 @@ class ExternalEnv(EnvironmentBase):
         self.initialize_structure(version)
         self.append_to_recent_files(version)
 
+    def save_versions_as(self, versions):
+        """Saves many versions at once, by conforming them and initializing
+        their folder structure in batch.
+
+        :param versions: A list of :class:`~stalker.models.version.Version`
+          instances.
+        :return:
+        """
+        versions = self._validate_versions(versions, 'save_versions_as')
+        self.conform_versions(versions)
+        self.initialize_structures(versions)
+        if versions:
+            self.append_to_recent_files(versions[-1])
+
     @classmethod
     def get_settings_file_path(cls):
         """returns the settings file path
@@ -308,8 +403,111 @@ class ExternalEnvFactory(object):
 
     A Factory object for environments. Generates :class:`ExternalEnv`
     instances.
+
+    The formatted environment names and the compiled name parsing patterns
+    are cached per ``name_format``. The cached names are cleared
+    automatically when the ``external_environments`` dictionary is changed.
     """
 
+    _name_index = {}
+    _name_patterns = {}
+    _environments_key = None
+
+    @classmethod
+    def clear_cache(cls):
+        """clears the cached environment name index and name patterns
+        """
+        cls._name_index = {}
+        cls._name_patterns = {}
+        cls._environments_key = None
+
+    @classmethod
+    def _get_environments_key(cls):
+        """returns a key for the current names and extensions in the
+        ``external_environments`` dictionary, so the cached names can be
+        cleared when an environment is added, removed or changed.
+
+        :return: tuple
+        """
+        return tuple(
+            (env_name,
+             external_environments[env_name]['name'],
+             tuple(external_environments[env_name]['extensions']))
+            for env_name in sorted(external_environments.keys())
+        )
+
+    @classmethod
+    def _format_name(cls, env_data, name_format):
+        """formats the name of the given environment data
+
+        :param dict env_data: An environment data from the
+          ``external_environments`` dictionary.
+        :param str name_format: The name format.
+        :return: str
+        """
+        return name_format \
+            .replace('%n', env_data['name']) \
+            .replace('%e', env_data['extensions'][0])
+
+    @classmethod
+    def _get_name_index(cls, name_format):
+        """returns the cached (names, index) pair for the given name_format,
+        where names is the list of formatted environment names and index is
+        a dictionary of formatted name to environment name.
+
+        :param str name_format: The name format.
+        :return: tuple
+        """
+        environments_key = cls._get_environments_key()
+        if environments_key != cls._environments_key:
+            cls._name_index = {}
+            cls._environments_key = environments_key
+
+        try:
+            return cls._name_index[name_format]
+        except KeyError:
+            pass
+
+        env_names = []
+        index = {}
+        for env_name in external_environments.keys():
+            formatted_name = cls._format_name(
+                external_environments[env_name], name_format
+            )
+            env_names.append(formatted_name)
+            index[formatted_name] = env_name
+
+        cls._name_index[name_format] = (env_names, index)
+        return env_names, index
+
+    @classmethod
+    def _get_name_pattern(cls, name_format):
+        """returns the compiled regular expression to parse names in the
+        given name_format
+
+        :param str name_format: The name format.
+        :return: compiled regular expression
+        """
+        try:
+            return cls._name_patterns[name_format]
+        except KeyError:
+            pass
+
+        import re
+        # replace anything that doesn't start with '%' with [\s\(\)\-]+
+        pattern = re.sub(
+            r'[^%\w]+', lambda m: r'[\s\(\)\-]+', name_format
+        )
+
+        pattern = pattern\
+            .replace('%n', '(?P<name>[\w\s]+)')\
+            .replace('%e', '(?P<extension>\.\w+)')
+        logger.debug('pattern : %s' % pattern)
+
+        compiled_pattern = re.compile(pattern)
+        cls._name_patterns[name_format] = compiled_pattern
+        return compiled_pattern
+
     @classmethod
     def get_env_names(cls, name_format="%n"):
         """returns a list of environment names which it is possible to create
@@ -322,15 +520,26 @@ class ExternalEnvFactory(object):
 
         :return list: list
         """
-        env_names = []
-        for env_name in external_environments.keys():
-            env_data = external_environments[env_name]
-            env_names.append(
-                name_format
-                .replace('%n', env_data['name'])
-                .replace('%e', env_data['extensions'][0])
-            )
-        return env_names
+        env_names, index = cls._get_name_index(name_format)
+        return list(env_names)
+
+    @classmethod
+    def get_env_name(cls, name, name_format="%n"):
+        """returns the environment name from the given formatted name
+
+        :param str name: The formatted name of the environment.
+        :param str name_format: The name format.
+        :return: str or None
+        """
+        env_names, index = cls._get_name_index(name_format)
+        try:
+            return index[name]
+        except KeyError:
+            pass
+
+        match = cls._get_name_pattern(name_format).search(name)
+        if match:
+            return match.group('name').strip()
 
     @classmethod
     def get_env(cls, name, name_format="%n"):
@@ -346,21 +555,7 @@ class ExternalEnvFactory(object):
                             'instance of basestring, not %s' %
                             (cls.__name__, name.__class__.__name__))
 
-        # filter the name
-        import re
-
-        # replace anything that doesn't start with '%' with [\s\(\)\-]+
-        pattern = re.sub(r'[^%\w]+', '[\s\(\)\-]+', name_format)
-
-        pattern = pattern\
-            .replace('%n', '(?P<name>[\w\s]+)')\
-            .replace('%e', '(?P<extension>\.\w+)')
-        logger.debug('pattern : %s' % pattern)
-
-        match = re.search(pattern, name)
-        env_name = None
-        if match:
-            env_name = match.group('name').strip()
+        env_name = cls.get_env_name(name, name_format)
 
         env_names = external_environments.keys()
         if env_name not in env_names:
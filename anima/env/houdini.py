@@ -139,6 +139,15 @@ class Houdini(EnvironmentBase):
             version = self.get_version_from_full_path(full_path)
         return version
 
+    def get_referenced_versions(self):
+        """Returns the inputs of the current Version. The references are not
+        tracked in the Houdini scene, so the inputs stored in Stalker are used.
+        """
+        version = self.get_current_version()
+        if version is None:
+            return []
+        return version.inputs
+
 ##     def get_version_from_recent_files(self):
 ##        """returns the version from the recent files
 ##        """
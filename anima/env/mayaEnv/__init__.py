@@ -14,7 +14,8 @@ import time
 
 from anima import logger
 from anima.env import empty_reference_resolution
-from anima.env.base import EnvironmentBase
+from anima.env.base import (EnvironmentBase, PathNormalizer,
+                             ReferenceResolver, RepositoryIndex)
 from anima.env.mayaEnv import extension  # register extensions
 from anima.exc import PublishError
 from anima.repr import Representation
@@ -883,8 +884,9 @@ workspace -fr "translatorData" ".mayaFiles/data/";
         """
         assert isinstance(path, (str, unicode))
         path = os.path.expandvars(path)
-        repo = cls.find_repo(path)
-        return repo is not None
+        # no need to get the Repository instance itself
+        repo_id, prefix = RepositoryIndex.lookup(path)
+        return repo_id is not None
 
     @classmethod
     def move_to_local(cls, version, file_path, type_name):
@@ -1064,6 +1066,10 @@ workspace -fr "translatorData" ".mayaFiles/data/";
                 'in total' % (parent_ref, ref_count)
             )
 
+        # get all the versions with one query
+        versions_by_path = \
+            self.get_versions_from_full_paths([ref.path for ref in refs])
+
         prev_path = ''
         versions = []
         logger.debug('loop through %i references' % ref_count)
@@ -1072,7 +1078,7 @@ workspace -fr "translatorData" ".mayaFiles/data/";
             path = ref.path
             if path != prev_path:
                 # try to get a version with the given path
-                version = self.get_version_from_full_path(path)
+                version = versions_by_path.get(path)
                 if version:
                     # check if this is a representation
                     if Representation.repr_separator in version.take_name:
@@ -1153,12 +1159,16 @@ workspace -fr "translatorData" ".mayaFiles/data/";
 
         from stalker import Repository
 
+        versions_by_path = self.get_versions_from_full_paths(
+            [reference.path for reference in references]
+        )
+
         for reference in references:
             path = reference.path
             if path == previous_ref_path:
                 full_path = previous_full_path
             else:
-                version = self.get_version_from_full_path(path)
+                version = versions_by_path.get(path)
                 if version in reference_resolution['update']:
                     latest_published_version = version.latest_published_version
                     full_path = latest_published_version.absolute_full_path
@@ -1294,10 +1304,11 @@ workspace -fr "translatorData" ".mayaFiles/data/";
         # *********************************************************************
         # References
         # replace reference paths with os independent absolute path
-        from stalker import Repository
+        normalizer = PathNormalizer.instance()
+        refs = []
+        unresolved_paths = []
         for ref in pm.listReferences():
-            unresolved_path = \
-                os.path.normpath(ref.unresolvedPath()).replace("\\", "/")
+            unresolved_path = ref.unresolvedPath()
 
             # check if it is already containing some environment variables
             if '$' in unresolved_path:  # just skip this one
@@ -1305,7 +1316,15 @@ workspace -fr "translatorData" ".mayaFiles/data/";
                              'independent!: %s' % unresolved_path)
                 continue
 
-            new_ref_path = Repository.to_os_independent_path(unresolved_path)
+            refs.append(ref)
+            unresolved_paths.append(unresolved_path)
+
+        # convert all the paths in one go
+        unresolved_paths = normalizer.normalize_paths(unresolved_paths)
+        new_ref_paths = normalizer.to_os_independent_paths(unresolved_paths)
+
+        for ref, unresolved_path, new_ref_path in \
+                zip(refs, unresolved_paths, new_ref_paths):
             if new_ref_path != unresolved_path:
                 logger.info("replacing reference: %s" % ref.path)
                 logger.info("replacing with: %s" % new_ref_path)
@@ -1327,6 +1346,8 @@ workspace -fr "translatorData" ".mayaFiles/data/";
             'gpuCache': 'cacheFileName',
         }
 
+        nodes_and_attrs = []
+        orig_paths = []
         for node_type in types_and_attrs.keys():
             attr_name = types_and_attrs[node_type]
             for node in pm.ls(type=node_type):
@@ -1339,53 +1360,54 @@ workspace -fr "translatorData" ".mayaFiles/data/";
                     # do nothing it is already using an environment variable
                     continue
 
-                logger.info("replacing file texture: %s" % orig_path)
+                nodes_and_attrs.append((node, attr_name))
+                orig_paths.append(orig_path)
 
-                path = os.path.normpath(
-                    os.path.expandvars(
-                        orig_path
-                    )
-                ).replace("\\", "/")
+        paths = normalizer.normalize_paths(orig_paths)
+        for i, path in enumerate(paths):
+            # be sure that it is not a Windows path
+            if ':' not in path:
+                # convert to absolute
+                if not os.path.isabs(path):  # be sure it
+                    paths[i] = os.path.join(
+                        workspace_path,
+                        path
+                    ).replace("\\", "/")
 
-                # be sure that it is not a Windows path
-                if ':' not in path:
-                    # convert to absolute
-                    if not os.path.isabs(path):  # be sure it
-                        path = os.path.join(
-                            workspace_path,
-                            path
-                        ).replace("\\", "/")
+        # convert to os independent absolute
+        new_paths = normalizer.to_os_independent_paths(paths)
 
-                # convert to os independent absolute
-                new_path = Repository.to_os_independent_path(path)
+        for (node, attr_name), orig_path, new_path in \
+                zip(nodes_and_attrs, orig_paths, new_paths):
+            logger.info("replacing file texture: %s" % orig_path)
 
-                if new_path != orig_path:
-                    logger.info("with: %s" % new_path)
+            if new_path != orig_path:
+                logger.info("with: %s" % new_path)
 
-                    # check if it has any incoming connections
+                # check if it has any incoming connections
+                try:
+                    inputs = node.attr(attr_name).inputs(p=1)
+                except TypeError as e:
+                    inputs = []
+                    print('ignoring this error: %s' % e)
+                    print('node     : %s' % node.name())
+                    print('attr_name: %s' % attr_name)
+
+                if len(inputs):
+                    # it has incoming connections
+                    # so set the other side
                     try:
-                        inputs = node.attr(attr_name).inputs(p=1)
-                    except TypeError as e:
-                        inputs = []
-                        print('ignoring this error: %s' % e)
-                        print('node     : %s' % node.name())
-                        print('attr_name: %s' % attr_name)
-
-                    if len(inputs):
-                        # it has incoming connections
-                        # so set the other side
-                        try:
-                            inputs[0].set(new_path)
-                        except RuntimeError:
-                            pass
-                    else:
-                        try:
-                            # do it normally
-                            node.setAttr(attr_name, new_path)
-                        except RuntimeError:
-                            # it is locked or something
-                            # skip it
-                            pass
+                        inputs[0].set(new_path)
+                    except RuntimeError:
+                        pass
+                else:
+                    try:
+                        # do it normally
+                        node.setAttr(attr_name, new_path)
+                    except RuntimeError:
+                        # it is locked or something
+                        # skip it
+                        pass
         end = time.time()
         logger.debug('replace_external_paths took '
                      '%f seconds' % (end - start))
@@ -1504,88 +1526,32 @@ workspace -fr "translatorData" ".mayaFiles/data/";
         self.deep_version_inputs_update()
         caller.step()
 
-        reference_resolution = \
-            empty_reference_resolution(root=self.get_referenced_versions())
+        version = self.get_current_version()
+        resolver = ReferenceResolver(
+            version,
+            root=self.get_referenced_versions()
+        )
         caller.step()
 
-        # reverse walk in DFS
-        dfs_version_references = []
-
-        version = self.get_current_version()
         if not version:
-            return reference_resolution
+            caller.end_progress()
+            return resolver.resolve()
 
-        for v in version.walk_inputs():
-            dfs_version_references.append(v)
+        # reverse walk in DFS
+        version_count = len(resolver.get_dfs_version_references())
         caller.step()
 
-        # pop the first element which is the current scene
-        dfs_version_references.pop(0)
-
         caller.end_progress()
 
         # register a new caller
         caller = pdm.register(
-            len(dfs_version_references),
+            version_count,
             'Maya.check_referenced_versions()'
         )
 
-        # iterate back in the list
-        for v in reversed(dfs_version_references):
-            # check inputs first
-            to_be_updated_list = []
-            for ref_v in v.inputs:
-                if not ref_v.is_latest_published_version():
-                    to_be_updated_list.append(ref_v)
-
-            if to_be_updated_list:
-                action = 'create'
-                # check if there is a new published version of this version
-                # that is using all the updated versions of the references
-                latest_published_version = v.latest_published_version
-                if latest_published_version and \
-                   not v.is_latest_published_version():
-                    # so there is a new published version
-                    # check if its children needs any update
-                    # and the updated child versions are already
-                    # referenced to the this published version
-                    if all([ref_v.latest_published_version
-                            in latest_published_version.inputs
-                            for ref_v in to_be_updated_list]):
-                        # so all new versions are referenced to this published
-                        # version, just update to this latest published version
-                        action = 'update'
-                    else:
-                        # not all references are in the inputs
-                        # so we need to create a new version as usual
-                        # and update the references to the latest versions
-                        action = 'create'
-            else:
-                # nothing needs to be updated,
-                # so check if this version has a new version,
-                # also there could be no reference under this referenced
-                # version
-                if v.is_latest_published_version():
-                    # do nothing
-                    action = 'leave'
-                else:
-                    # update to latest published version
-                    action = 'update'
-
-                # before setting the action check all the inputs in
-                # resolution_dictionary, if any of them are update, or create
-                # then set this one to 'create'
-                if any(rev_v in reference_resolution['update'] or
-                       rev_v in reference_resolution['create']
-                       for rev_v in v.inputs):
-                    action = 'create'
-
-            # so append this v to the related action list
-            reference_resolution[action].append(v)
-
-            # from stalker import Version
-            # assert isinstance(v, Version)
-            caller.step(message=v.nice_name)
+        reference_resolution = resolver.resolve(
+            callback=lambda v: caller.step(message=v.nice_name)
+        )
 
         caller.end_progress()
 
@@ -1889,8 +1855,10 @@ workspace -fr "translatorData" ".mayaFiles/data/";
                                  'Maya.fix_reference_namespaces()')
 
             from stalker import Version
+            versions_by_path = \
+                self.get_versions_from_full_paths(to_update_paths)
             for path in to_update_paths:
-                vers = self.get_version_from_full_path(path)
+                vers = versions_by_path.get(path)
 
                 logger.debug('vers: %s' % vers)
                 if not vers:
@@ -15,7 +15,8 @@ from pymel.core.uitypes import CheckBox, TextField
 from pymel.core.general import Attribute
 from pymel.core.system import FileReference
 
-from anima.edit import Sequence, Media, Video, Track, Clip, File, Rate
+from anima.edit import (Sequence, Media, Video, Track, Clip, File, Rate,
+                        load_edit_cache, save_edit_cache)
 from anima.extension import extends
 from anima.repr import Representation
 
@@ -23,6 +24,20 @@ from anima.repr import Representation
 default_handle_count = 15
 
 
+def call_metafuze(xml_path):
+    """Calls "Avid Metafuze" with the given MetaFuze XML file path.
+
+    :param str xml_path: The path of the MetaFuze XML file
+    :return: returns the return code of the MetaFuze process
+    """
+    return subprocess.call(
+        ['metafuze',
+         '-debug',
+         xml_path],
+        shell=True
+    )
+
+
 class MayaExtension(object):
     """Extension to PyMel classes
     """
@@ -432,18 +447,22 @@ class SequenceManagerExtension(object):
                 (self.__class__.__name__, path.__class__.__name__)
             )
 
-        from xml.etree import ElementTree
+        # use the cached version if the XML has not changed
+        seq = load_edit_cache(path)
+        if seq is None:
+            from xml.etree import ElementTree
 
-        try:
-            tree = ElementTree.parse(path)
-        except IOError:
-            raise IOError('Please supply a valid path to an XML file!')
+            try:
+                tree = ElementTree.parse(path)
+            except IOError:
+                raise IOError('Please supply a valid path to an XML file!')
 
-        root = tree.getroot()
-        seq = Sequence()
-        xml_seq = root.getchildren()[0]
+            root = tree.getroot()
+            seq = Sequence()
+            xml_seq = root.getchildren()[0]
 
-        seq.from_xml(xml_seq)
+            seq.from_xml(xml_seq)
+            save_edit_cache(path, seq)
 
         self.from_seq(seq)
 
@@ -465,13 +484,19 @@ class SequenceManagerExtension(object):
         m = Maya()
         fps = m.get_fps()
 
-        import edl
-        p = edl.Parser(str(fps))
-        with open(path) as f:
-            l = p.parse(f)
+        # use the cached version if the EDL has not changed, the frame rate is
+        # also a part of the cache key as it changes the parsed timecodes
+        cache_key = 'fps:%s' % fps
+        seq = load_edit_cache(path, key=cache_key)
+        if seq is None:
+            import edl
+            p = edl.Parser(str(fps))
+            with open(path) as f:
+                l = p.parse(f)
 
-        seq = Sequence()
-        seq.from_edl(l)
+            seq = Sequence()
+            seq.from_edl(l)
+            save_edit_cache(path, seq, key=cache_key)
 
         self.from_seq(seq)
 
@@ -739,39 +764,55 @@ class SequencerExtension(object):
         return seq.to_edl()
 
     @extends(pm.nodetypes.Sequencer)
-    def metafuze(self):
-        """Calls "Avid Metafuze" with the given xml content to convert media
-        files to MXF format.
+    def metafuze(self, max_workers=None, skip_up_to_date=True):
+        """Calls "Avid Metafuze" to convert the shot media files to MXF format.
+
+        The MetaFuze XML files are written directly to a temp folder and the
+        conversions are run in a bounded pool of threads, so all the CPUs are
+        used.
+
+        It is a generator which yields once per clip, to let the caller update
+        a progress bar. A RuntimeError listing the failed conversions is
+        raised after all the clips are processed.
 
-        :return: list of file path
+        :param int max_workers: The maximum number of MetaFuze processes
+          running at the same time. Default is the number of CPUs.
+        :param bool skip_up_to_date: Skip the clips that already have an MXF
+          file newer than the source media file. Default is True.
         """
+        from anima.utils import run_in_threads
 
         sm = pm.PyNode('sequenceManager1')
         seq = sm.generate_sequence_structure()
-        xmls = seq.to_metafuze_xml()
 
-        # write the given content to tmp
-        for i, xml in enumerate(xmls):
-            temp_file_path = tempfile.mktemp(suffix='.xml')
+        clip_count = sum(len(track.clips) for track in seq.media.video.tracks)
+        xml_paths = seq.write_metafuze_xmls(
+            tempfile.mkdtemp(),
+            skip_up_to_date=skip_up_to_date
+        )
+
+        # the skipped clips are already done
+        skipped_clip_count = clip_count - len(xml_paths)
+        for i in range(skipped_clip_count):
             yield i
-            with open(temp_file_path, 'w') as f:
-                f.write(xml)
-
-            subprocess.call(
-                ['metafuze',
-                 '-debug',
-                 temp_file_path],
-                #stderr=subprocess.PIPE,
-                shell=True
-            )
 
-            # remove the temp file
-            #os.remove(temp_file_path)
-            #print 'xml path: %s' % temp_file_path
+        failures = []
+        results = run_in_threads(call_metafuze, xml_paths, max_workers)
+        for i, (xml_path, return_code, exception) in enumerate(results):
+            if exception is not None:
+                failures.append('%s: %s' % (xml_path, exception))
+            elif return_code != 0:
+                failures.append(
+                    '%s: MetaFuze returned %s' % (xml_path, return_code)
+                )
+            yield skipped_clip_count + i
 
-        #if return_code:
-        #    # there is an error
-        #    raise RuntimeError("Something went wrong in MXF conversion")
+        if failures:
+            raise RuntimeError(
+                '%s of %s clips could not be converted to MXF:\n%s' % (
+                    len(failures), len(xml_paths), '\n'.join(failures)
+                )
+            )
 
     @extends(pm.nodetypes.Sequencer)
     def convert_to_mxf(self, path):
@@ -981,9 +1022,13 @@ class ShotExtension(object):
     def convert_to_mxf(self, metafuze_xml):
         """converts a video with the given Metafuze XML to Avid MXF format.
 
-        :return: returns the generated mxf file location
+        :return: returns the return code of the MetaFuze process
         """
-        pass
+        temp_file_path = tempfile.mktemp(suffix='.xml')
+        with open(temp_file_path, 'w') as f:
+            f.write(metafuze_xml)
+
+        return call_metafuze(temp_file_path)
 
     @extends(pm.nodetypes.Shot)
     def set_handle(self, handle=default_handle_count):
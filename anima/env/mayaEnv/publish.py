@@ -11,7 +11,7 @@ import pymel.core as pm
 import maya.cmds as mc
 import tempfile
 
-from anima import stalker_server_internal_address
+from anima import get_stalker_server_address
 from anima.publish import (clear_publishers, publisher, staging,
                            POST_PUBLISHER_TYPE)
 from anima.exc import PublishError
@@ -116,7 +116,7 @@ def check_time_logs():
                         '<p>Please create a TimeLog before publishing this '
                         'asset:<br><br>'
                         '<a href="%s/tasks/%s/view">Open In WebBrowser</a>'
-                        '</p>' % (stalker_server_internal_address, task.id)
+                        '</p>' % (get_stalker_server_address(), task.id)
                     )
 
 
@@ -1562,8 +1562,11 @@ def export_edl_and_xml():
     shot = shots[0]
     shot.output.set(playblast_file.full_path)
 
-    for i in seq1.metafuze():
-        caller.step()
+    try:
+        for i in seq1.metafuze():
+            caller.step()
+    finally:
+        caller.end_progress()
 
     # create EDL and XML files
     from stalker import db
@@ -2145,8 +2145,9 @@ class Reference(object):
                     refs_with_wrong_prefix.append(parent)
 
         ref_paths = [ref.path for ref in refs_with_wrong_prefix]
+        versions_by_path = m_env.get_versions_from_full_paths(ref_paths)
         for ref_path in ref_paths:
-            version = m_env.get_version_from_full_path(ref_path)
+            version = versions_by_path.get(ref_path)
             if version:
                 m_env.open(version, force=True, skip_update_check=True)
                 pm.saveFile()
@@ -2195,11 +2196,11 @@ class Reference(object):
             stalker_link_file_path = os.path.join(project_path,
                                                   'scenes/stalker_links.txt')
             version_upload_link = '%s/tasks/%s/versions/list' % (
-                anima.stalker_server_external_address,
+                anima.get_stalker_server_address(external=True),
                 task.id
             )
             request_review_link = '%s/tasks/%s/view' % (
-                anima.stalker_server_external_address,
+                anima.get_stalker_server_address(external=True),
                 task.id
             )
             with open(stalker_link_file_path, 'w+') as f:
@@ -4624,7 +4625,9 @@ class Render(object):
             pattern = re.subn(r'[#]+', '*', ass_path)[0].replace('.ass.gz', '.ass*')
             all_cache_files = glob.glob(pattern)
 
-            inner_caller = pdm.register(len(all_cache_files))
+            inner_caller = pdm.register(
+                len(all_cache_files), parent=caller
+            )
             for source_f in all_cache_files:
                 target_f = source_f.replace(source_driver, target_driver)
                 # move files to new location
@@ -218,9 +218,11 @@ class PrevisUI(object):
                 status='',
                 isInterruptable=True
             )
-            for i in seq1.metafuze():
-                core.progressWindow(e=1, step=step)
-            core.progressWindow(endProgress=1)
+            try:
+                for i in seq1.metafuze():
+                    core.progressWindow(e=1, step=step)
+            finally:
+                core.progressWindow(endProgress=1)
 
         if self.edl_checkBox.value():
             # create EDL file
@@ -194,8 +194,9 @@ class Photoshop(EnvironmentBase):
             recent_files = None
 
         if recent_files is not None:
+            versions = self.get_versions_from_full_paths(recent_files)
             for i in range(len(recent_files)):
-                version = self.get_version_from_full_path(recent_files[i])
+                version = versions.get(recent_files[i])
                 if version is not None:
                     break
 
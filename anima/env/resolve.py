@@ -20,11 +20,14 @@ class Avid2Resolve(object):
         self.avid_edl_path = ''
         self.events = []
         self.fps = ''
+        self.paths_converted = False
 
     def read_avid_edl(self, avid_eld_path, fps='24'):
         """
         """
+        self.avid_edl_path = avid_eld_path
         self.fps = fps
+        self.paths_converted = False
         p = Parser(fps)
         with open(avid_eld_path) as f:
             self.events = p.parse(f)
@@ -115,6 +118,7 @@ class Avid2Resolve(object):
         """converts event paths with proper ones
         """
         from stalker import Shot
+        self.paths_converted = True
         # do a db connection
         for e in self.events:
             # get the reel which shows the shot name
@@ -149,12 +153,30 @@ class Avid2Resolve(object):
     def to_xml(self):
         """return an eml version of this edl
         """
-        from anima.edit import Sequence, Rate
-        s = Sequence(rate=Rate(timebase='24'))
-        s.from_edl(self.events)
+        from anima.edit import (Sequence, Rate, load_edit_cache,
+                                save_edit_cache)
+
+        # the converted paths depend on the database, so the cache can only
+        # be used for the events as they are read from the EDL
+        use_cache = self.avid_edl_path and not self.paths_converted
+        cache_key = 'avid2resolve:fps:%s' % self.fps
+
+        s = None
+        if use_cache:
+            s = load_edit_cache(self.avid_edl_path, key=cache_key)
+
+        if s is None:
+            s = Sequence(rate=Rate(timebase='24'))
+            s.from_edl(self.events)
+            if use_cache:
+                save_edit_cache(self.avid_edl_path, s, key=cache_key)
 
         # optimize clips
-        for track in s.media.video.tracks:
+        tracks = s.media.video.tracks
+        if s.media.audio is not None:
+            tracks = tracks + s.media.audio.tracks
+
+        for track in tracks:
             track.optimize_clips()
 
         xml_data = s.to_xml()
@@ -4,8 +4,7 @@
 # This module is part of anima-tools and is released under the BSD 2
 # License: http://www.opensource.org/licenses/BSD-2-Clause
 
-from anima.env import empty_reference_resolution
-from anima.env.base import EnvironmentBase
+from anima.env.base import EnvironmentBase, ReferenceResolver
 from anima.testing import count_calls
 
 
@@ -73,75 +72,11 @@ class TestEnvironment(EnvironmentBase):
 
         :return: list
         """
-        # reverse walk in DFS
-        dfs_version_references = []
-        version = self.get_current_version()
-        resolution_dictionary = empty_reference_resolution(
+        resolver = ReferenceResolver(
+            self.get_current_version(),
             root=self.get_referenced_versions()
         )
-
-        # TODO: with Stalker v0.2.5 replace this with Version.walk_inputs()
-
-        for v in version.walk_hierarchy():
-            dfs_version_references.append(v)
-
-        # pop the first element which is the current scene
-        dfs_version_references.pop(0)
-
-        # iterate back in the list
-        for v in reversed(dfs_version_references):
-            # check inputs first
-            to_be_updated_list = []
-            for ref_v in v.inputs:
-                if not ref_v.is_latest_published_version():
-                    to_be_updated_list.append(ref_v)
-
-            if to_be_updated_list:
-                action = 'create'
-                # check if there is a new published version of this version
-                # that is using all the updated versions of the references
-                latest_published_version = v.latest_published_version
-                if latest_published_version and \
-                   not v.is_latest_published_version():
-                    # so there is a new published version
-                    # check if its children needs any update
-                    # and the updated child versions are already
-                    # referenced to the this published version
-                    if all([ref_v.latest_published_version
-                            in latest_published_version.inputs
-                            for ref_v in to_be_updated_list]):
-                        # so all new versions are referenced to this published
-                        # version, just update to this latest published version
-                        action = 'update'
-                    else:
-                        # not all references are in the inputs
-                        # so we need to create a new version as usual
-                        # and update the references to the latest versions
-                        action = 'create'
-            else:
-                # nothing needs to be updated,
-                # so check if this version has a new version,
-                # also there could be no reference under this referenced
-                # version
-                if v.is_latest_published_version():
-                    # do nothing
-                    action = 'leave'
-                else:
-                    # update to latest published version
-                    action = 'update'
-
-                # before setting the action check all the inputs in
-                # resolution_dictionary, if any of them are update, or create
-                # then set this one to 'create'
-                if any(rev_v in resolution_dictionary['update'] or
-                       rev_v in resolution_dictionary['create']
-                       for rev_v in v.inputs):
-                    action = 'create'
-
-            # so append this v to the related action list
-            resolution_dictionary[action].append(v)
-
-        return resolution_dictionary
+        return resolver.resolve()
 
     @count_calls
     def update_first_level_versions(self, reference_resolution):
@@ -5,8 +5,10 @@
 # License: http://www.opensource.org/licenses/BSD-2-Clause
 import json
 import os
+import threading
 
 from anima import max_recent_files
+from anima.utils import FileLock, atomic_write
 
 
 class RecentFileManager(object):
@@ -26,14 +28,29 @@ class RecentFileManager(object):
     The data is held as a dictionary and the resultant RecentFileManager
     instance is stored in %HOME/.cache/anima/ folder.
 
-    The RecentFileManager instance is restored from the cache folder when a new
-    one is created. So it is kind of a Singleton.
+    RecentFileManager is a Singleton, there is only one instance per process.
+    The data is restored from the cache folder only if the cache file is
+    changed (by another process) since it is last read or written. The cache
+    file is written atomically and is locked while it is being updated, so
+    the applications running in the same workstation will not overwrite the
+    changes of each other.
     """
 
+    _instance = None
+    _lock = threading.RLock()
+
     def __new__(cls):
         """restore from locally saved one
         """
-        return super(RecentFileManager, cls).__new__(cls)
+        with cls._lock:
+            if cls._instance is None:
+                instance = super(RecentFileManager, cls).__new__(cls)
+                instance.recent_files = dict()
+                instance._file_path = None
+                instance._file_stat = None
+                instance._file_locks = {}
+                cls._instance = instance
+            return cls._instance
 
     @classmethod
     def cache_file_full_path(cls):
@@ -53,12 +70,54 @@ class RecentFileManager(object):
         )
 
     def __init__(self):
-        self.recent_files = dict()
-        self.restore()
+        # only restore if the file is changed
+        self.refresh()
+
+    @classmethod
+    def _stat(cls, path):
+        """returns a tuple of values to detect if the file at the given path is
+        changed or None if there is no file
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime, stat.st_size, stat.st_ino
+
+    def _file_lock(self, path):
+        """returns the FileLock for the given path
+        """
+        with self._lock:
+            if path not in self._file_locks:
+                self._file_locks[path] = FileLock(path)
+            return self._file_locks[path]
+
+    def is_changed(self):
+        """returns True if the cache file is changed since it is last read or
+        written by this instance
+        """
+        file_full_path = self.cache_file_full_path()
+        return file_full_path != self._file_path \
+            or self._stat(file_full_path) != self._file_stat
+
+    def refresh(self):
+        """restores the data from the cache file if it is changed
+        """
+        with self._lock:
+            if self.is_changed():
+                self.restore()
 
     def save(self):
         """save itself to local cache
         """
+        file_full_path = self.cache_file_full_path()
+        with self._lock:
+            with self._file_lock(file_full_path):
+                self._write(file_full_path)
+
+    def _write(self, file_full_path):
+        """writes the data to the given path, the file should be locked
+        """
         dumped_data = json.dumps(
             self.recent_files,
             sort_keys=True,
@@ -66,6 +125,8 @@ class RecentFileManager(object):
             separators=(',', ': ')
         )
         self._write_data(dumped_data)
+        self._file_path = file_full_path
+        self._file_stat = self._stat(file_full_path)
 
     def _write_data(self, data):
         """Writes the given data to the cache file
@@ -73,31 +134,26 @@ class RecentFileManager(object):
         :param data: the data to be written (generally serialized
           RecentFilesManager class itself).
         """
-        file_full_path = self.cache_file_full_path()
-
-        # create the path first
-        file_path = os.path.dirname(file_full_path)
-        try:
-            os.makedirs(file_path)
-        except OSError:
-            # dir exists
-            pass
-        finally:
-            with open(file_full_path, 'w+') as data_file:
-                data_file.writelines(data)
+        atomic_write(self.cache_file_full_path(), data)
 
     def restore(self):
         """restore from local cache folder
         """
-        try:
-            with open(RecentFileManager.cache_file_full_path(), 'r') as s:
-                self.recent_files = json.loads(s.read())
-        except (IOError, ValueError):
-            pass
-
-        # limit maximum recent files
-        for env in self.recent_files:
-            self.recent_files[env] = self.recent_files[env][:max_recent_files]
+        file_full_path = self.cache_file_full_path()
+        with self._lock:
+            self.recent_files = dict()
+            self._file_path = file_full_path
+            self._file_stat = self._stat(file_full_path)
+            try:
+                with open(file_full_path, 'r') as s:
+                    self.recent_files = json.loads(s.read())
+            except (IOError, ValueError):
+                pass
+
+            # limit maximum recent files
+            for env in self.recent_files:
+                self.recent_files[env] = \
+                    self.recent_files[env][:max_recent_files]
 
     def add(self, env_name, file_path):
         """Saves the given file_path under the given environment name
@@ -106,31 +162,37 @@ class RecentFileManager(object):
         :param file_path: The file_path
         :return: None
         """
-        if not self.recent_files.has_key(env_name):
-            self.recent_files[env_name] = []
+        file_full_path = self.cache_file_full_path()
+        with self._lock:
+            with self._file_lock(file_full_path):
+                # get the changes of the other processes
+                self.refresh()
+
+                if env_name not in self.recent_files:
+                    self.recent_files[env_name] = []
 
-        if file_path in self.recent_files[env_name]:
-            self.recent_files[env_name].remove(file_path)
+                if file_path in self.recent_files[env_name]:
+                    self.recent_files[env_name].remove(file_path)
 
-        self.recent_files[env_name].insert(0, file_path)
+                self.recent_files[env_name].insert(0, file_path)
 
-        # clamp max files stored
-        self.recent_files[env_name] = \
-            self.recent_files[env_name][:max_recent_files]
+                # clamp max files stored
+                self.recent_files[env_name] = \
+                    self.recent_files[env_name][:max_recent_files]
 
-        self.save()
+                self._write(file_full_path)
 
     def remove(self, env_name, file_path):
         """Removes the given path from the recent files list
         """
-        self[env_name].remove(file_path)
+        self.recent_files[env_name].remove(file_path)
 
     def __getitem__(self, item):
         """
         :param str item: The name of the environment
-        :return:
+        :return: a copy of the recent files list of the given environment
         """
-        return self.recent_files[item]
+        return list(self.recent_files[item])
 
     def __setitem__(self, key, value):
         """
@@ -3,7 +3,6 @@
 #
 # This module is part of anima-tools and is released under the BSD 2
 # License: http://www.opensource.org/licenses/BSD-2-Clause
-import shutil
 import subprocess
 import os
 from anima.utils import do_db_setup
@@ -84,6 +83,7 @@ class MainDialog(QtGui.QDialog, edl_importer_UI.Ui_Dialog,
         self.setupUi(self)
 
         self.media_files_path = ''
+        self.copier_thread = None
         self.cache_file_full_path = os.path.normpath(
             os.path.expanduser(
                 os.path.expandvars(
@@ -183,16 +183,10 @@ class MainDialog(QtGui.QDialog, edl_importer_UI.Ui_Dialog,
         with open(edl_path) as f:
             l = parser.parse(f)
 
-        total_item_count = len(l) + 1
-
-        progress_dialog = QtGui.QProgressDialog(self)
-        progress_dialog.setRange(0, total_item_count)
-        progress_dialog.setLabelText('Copying MXF files...')
-        progress_dialog.show()
-
-        step = 0
-        progress_dialog.setValue(step)
+        from anima.utils import FileCopier
+        from anima.ui.utils import FileCopierThread
 
+        file_copier = FileCopier()
         for event in l:
             # assert isinstance(event, edl.Event)
             mov_full_path = event.source_file
@@ -206,19 +200,77 @@ class MainDialog(QtGui.QDialog, edl_importer_UI.Ui_Dialog,
                 )
             )
 
-            shutil.copy(
-                mxf_full_path,
-                target_mxf_path
+            # the same MXF can be used by more than one event, the
+            # FileCopier copies it only once and skips it if it is already
+            # in the media folder
+            file_copier.add(mxf_full_path, target_mxf_path)
+
+        progress_dialog = QtGui.QProgressDialog(self)
+        progress_dialog.setRange(0, 0)
+        progress_dialog.setLabelText('Copying MXF files...')
+        progress_dialog.show()
+
+        copier_thread = FileCopierThread(file_copier, parent=self)
+
+        def update_progress(copied_kbytes, total_kbytes):
+            """updates the progress dialog
+            """
+            progress_dialog.setRange(0, total_kbytes)
+            progress_dialog.setValue(copied_kbytes)
+            progress_dialog.setLabelText(
+                'Copying MXF files... (%i MB / %i MB)' % (
+                    copied_kbytes / 1024, total_kbytes / 1024
+                )
             )
 
-            step += 1
-            progress_dialog.setValue(step)
+        def copy_finished():
+            """called when all the files are copied
+            """
+            progress_dialog.close()
+            self.copier_thread = None
+
+            if file_copier.cancelled:
+                return
+
+            if file_copier.errors:
+                QtGui.QMessageBox.critical(
+                    self,
+                    'Error',
+                    'The following files could not be copied:\n\n%s' %
+                    '\n'.join(
+                        '%s: %s' % (source, e)
+                        for source, target, e in file_copier.errors
+                    )
+                )
+                return
+
+            # and call EDL_Manager.exe with the edl_path
+            subprocess.call(
+                ['EDL_Mgr', os.path.normcase(edl_path)],
+                shell=False
+            )
+
+        QtCore.QObject.connect(
+            copier_thread,
+            QtCore.SIGNAL('progress(int, int)'),
+            update_progress
+        )
+
+        QtCore.QObject.connect(
+            copier_thread,
+            QtCore.SIGNAL('finished()'),
+            copy_finished
+        )
+
+        QtCore.QObject.connect(
+            progress_dialog,
+            QtCore.SIGNAL('canceled()'),
+            copier_thread.cancel
+        )
 
-        # and call EDL_Manager.exe with the edl_path
-        progress_dialog.setLabelText('Calling EDL Manager...')
-        step += 1
-        progress_dialog.setValue(step)
-        subprocess.call(['EDL_Mgr', os.path.normcase(edl_path)], shell=False)
+        # keep a reference to the thread until it is finished
+        self.copier_thread = copier_thread
+        copier_thread.start()
 
     def store_media_file_path(self, path):
         """stores the given path as the avid media file path in anima cache
@@ -4,301 +4,847 @@
 # This module is part of anima-tools and is released under the BSD 2
 # License: http://www.opensource.org/licenses/BSD-2-Clause
 
+import array
+import collections
+import threading
+import time
+
 from stalker import defaults, Task, Project
 
 from anima import logger, status_colors
 from anima.ui.lib import QtGui, QtCore
 
 
-def set_item_color(item, color):
-    """sets the item color
+VersionRowData = collections.namedtuple(
+    'VersionRowData',
+    ['id', 'nice_name', 'version_number', 'take_name', 'full_path',
+     'input_ids', 'latest_published_version_id',
+     'latest_published_version_number', 'updated_by_name', 'description']
+)
 
-    :param item: the item
-    """
-    foreground = item.foreground()
-    foreground.setColor(color)
-    item.setForeground(foreground)
 
+def get_version_row_data(version_ids, chunk_size=500):
+    """Returns the data needed to display the versions with the given ids and
+    all of their inputs in a :class:`.VersionTreeModel`.
+
+    The inputs are walked level by level, so the number of queries is
+    proportional to the depth of the hierarchy and not to the number of
+    versions. It only returns plain data, so it is safe to be called from a
+    thread other than the UI thread.
 
-class VersionItem(QtGui.QStandardItem):
-    """Implements the Version as a QStandardItem
+    :param version_ids: A list of version ids.
+    :param int chunk_size: The maximum number of ids in one query.
+    :return: A dictionary of version id to :class:`.VersionRowData`.
     """
+    from sqlalchemy.orm import joinedload, subqueryload
+    from stalker import User, Version
+    from stalker.db import DBSession
+    from anima.env.base import ReferenceResolver
+
+    versions = {}
+    ids_to_visit = set(version_ids)
+    while ids_to_visit:
+        ids = sorted(ids_to_visit)
+        ids_to_visit = set()
+        for i in range(0, len(ids), chunk_size):
+            chunk = ids[i:i + chunk_size]
+            query = Version.query\
+                .options(joinedload(Version.task))\
+                .options(subqueryload(Version.inputs))\
+                .filter(Version.id.in_(chunk))
+            for version in query.all():
+                versions[version.id] = version
+                for input_version in version.inputs:
+                    if input_version.id not in versions:
+                        ids_to_visit.add(input_version.id)
+
+    latest_published_versions = \
+        ReferenceResolver.get_latest_published_versions(
+            versions.values(), chunk_size
+        )
 
-    def __init__(self, *args, **kwargs):
-        QtGui.QStandardItem.__init__(self, *args, **kwargs)
-        logger.debug(
-            'VersionItem.__init__() is started for item: %s' % self.text())
-        self.loaded = False
-        self.version = None
-        self.parent = None
-        self.pseudo_model = None
-        self.fetched_all = False
-        self.setEditable(False)
-        logger.debug(
-            'VersionItem.__init__() is finished for item: %s' % self.text())
-
-    def clone(self):
-        """returns a copy of this item
-        """
-        logger.debug('VersionItem.clone() is started for item: %s' % self.text())
-        new_item = VersionItem()
-        new_item.version = self.version
-        new_item.parent = self.parent
-        new_item.fetched_all = self.fetched_all
-        logger.debug('VersionItem.clone() is finished for item: %s' % self.text())
-        return new_item
-
-    def canFetchMore(self):
-        logger.debug(
-            'VersionItem.canFetchMore() is started for item: %s' % self.text())
-        if self.version and not self.fetched_all:
-            return_value = bool(self.version.inputs)
-        else:
-            return_value = False
-        logger.debug(
-            'VersionItem.canFetchMore() is finished for item: %s' % self.text())
-        return return_value
+    user_ids = sorted(set(
+        v.updated_by_id for v in latest_published_versions.values()
+        if v and v.updated_by_id
+    ))
+    user_names = {}
+    for i in range(0, len(user_ids), chunk_size):
+        chunk = user_ids[i:i + chunk_size]
+        user_names.update(
+            DBSession.query(User.id, User.name)
+            .filter(User.id.in_(chunk))
+            .all()
+        )
 
-    @classmethod
-    def generate_version_row(cls, parent, pseudo_model, version):
-        """Generates a new version row
-
-        :return:
-        """
-        # column 0
-        version_item = VersionItem(0, 0)
-        version_item.parent = parent
-        version_item.pseudo_model = pseudo_model
-
-        version_item.version = version
-        version_item.setEditable(False)
-        reference_resolution = pseudo_model.reference_resolution
-
-        if version in reference_resolution['update']:
-            action = 'update'
-            font_color = QtGui.QColor(192, 128, 0)
-            if version in reference_resolution['root']:
-                version_item.setCheckable(True)
-                version_item.setCheckState(QtCore.Qt.Checked)
-        elif version in reference_resolution['create']:
-            action = 'create'
-            font_color = QtGui.QColor(192, 0, 0)
-            if version in reference_resolution['root']:
-                version_item.setCheckable(True)
-                version_item.setCheckState(QtCore.Qt.Checked)
-        else:
-            font_color = QtGui.QColor(0, 192, 0)
-            action = ''
-
-        version_item.action = action
-
-        set_item_color(version_item, font_color)
-
-        # thumbnail
-        thumbnail_item = QtGui.QStandardItem()
-        thumbnail_item.setEditable(False)
-        # thumbnail_item.setText('no thumbnail')
-        thumbnail_item.version = version
-        thumbnail_item.action = action
-        set_item_color(thumbnail_item, font_color)
-
-        # Nice Name
-        nice_name_item = QtGui.QStandardItem()
-        nice_name_item.toolTip()
-        nice_name_item.setText(
-            '%s_v%s' % (
-                version.nice_name,
-                ('%s' % version.version_number).zfill(3)
+    row_data = {}
+    for version in versions.values():
+        latest_published_version = \
+            latest_published_versions[(version.task_id, version.take_name)]
+
+        lpv_id = None
+        lpv_number = None
+        updated_by_name = ''
+        description = ''
+        if latest_published_version:
+            lpv_id = latest_published_version.id
+            lpv_number = latest_published_version.version_number
+            updated_by_name = \
+                user_names.get(latest_published_version.updated_by_id, '')
+            description = latest_published_version.description or ''
+
+        row_data[version.id] = VersionRowData(
+            id=version.id,
+            nice_name=version.nice_name,
+            version_number=version.version_number,
+            take_name=version.take_name,
+            full_path=version.full_path,
+            input_ids=tuple(v.id for v in version.inputs),
+            latest_published_version_id=lpv_id,
+            latest_published_version_number=lpv_number,
+            updated_by_name=updated_by_name,
+            description=description
+        )
+
+    return row_data
+
+
+VersionTableRowData = collections.namedtuple(
+    'VersionTableRowData',
+    ['id', 'version_number', 'created_with', 'created_by_name',
+     'updated_by_name', 'is_published', 'description', 'file_size',
+     'file_date']
+)
+
+
+def get_version_table_rows(task_id, take_name, published_only=False,
+                           before_version_number=None, limit=25):
+    """Returns a page of the versions of the given task and take, newest
+    first, with only the columns displayed in the version table.
+
+    The pages are queried with keyset pagination, the next page starts
+    before the version number of the last version of the previous page, so
+    the query cost does not depend on how deep the page is.
+
+    :param int task_id: The id of the task.
+    :param str take_name: The take name.
+    :param bool published_only: Only return the published versions.
+    :param int before_version_number: Only return the versions older than
+      this version number, None returns the latest versions.
+    :param int limit: The maximum number of versions.
+    :return: A list of :class:`.VersionTableRowData`.
+    """
+    import datetime
+    import os
+    from sqlalchemy.orm import aliased
+    from stalker import User, Version
+    from stalker.db import DBSession
+
+    created_by = aliased(User)
+    updated_by = aliased(User)
+
+    query = DBSession\
+        .query(
+            Version.id, Version.version_number, Version.created_with,
+            created_by.name, updated_by.name, Version.is_published,
+            Version.description, Version.full_path
+        )\
+        .outerjoin(created_by, Version.created_by_id == created_by.id)\
+        .outerjoin(updated_by, Version.updated_by_id == updated_by.id)\
+        .filter(Version.task_id == task_id)\
+        .filter(Version.take_name == take_name)
+
+    if published_only:
+        query = query.filter(Version.is_published == True)
+
+    if before_version_number is not None:
+        query = query.filter(Version.version_number < before_version_number)
+
+    rows = []
+    for (id_, version_number, created_with, created_by_name,
+         updated_by_name, is_published, description, full_path) in \
+            query.order_by(Version.version_number.desc()).limit(limit).all():
+        # get the file size and date
+        file_size = -1
+        file_date = datetime.datetime.today()
+        if full_path:
+            try:
+                stat = os.stat(os.path.expandvars(full_path))
+            except OSError:
+                pass
+            else:
+                file_size = float(stat.st_size) / 1048576
+                file_date = datetime.datetime.fromtimestamp(stat.st_mtime)
+
+        rows.append(
+            VersionTableRowData(
+                id=id_,
+                version_number=version_number,
+                created_with=created_with,
+                created_by_name=created_by_name or '',
+                updated_by_name=updated_by_name or '',
+                is_published=is_published,
+                description=description or '',
+                file_size=file_size,
+                file_date=file_date
             )
         )
-        nice_name_item.setEditable(False)
-        nice_name_item.version = version
-        nice_name_item.action = action
-        set_item_color(nice_name_item, font_color)
-
-        # Take
-        take_item = QtGui.QStandardItem()
-        take_item.setEditable(False)
-        take_item.setText(version.take_name)
-        take_item.version = version
-        take_item.action = action
-        set_item_color(take_item, font_color)
-
-        # Current
-        current_version_item = QtGui.QStandardItem()
-        current_version_item.setText('%s' % version.version_number)
-        current_version_item.setEditable(False)
-        current_version_item.version = version
-        current_version_item.action = action
-        set_item_color(current_version_item, font_color)
-
-        # Latest
-        latest_published_version = version.latest_published_version
-
-        latest_published_version_item = QtGui.QStandardItem()
-        latest_published_version_item.version = version
-        latest_published_version_item.action = action
-        latest_published_version_item.setEditable(False)
-
-        latest_published_version_text = 'No Published Version'
-        if latest_published_version:
-            latest_published_version_text = '%s' % \
-                latest_published_version.version_number
-        latest_published_version_item.setText(
-            latest_published_version_text
+    return rows
+
+
+def can_query_in_thread():
+    """Returns True if the database can be queried from a thread other than
+    the UI thread.
+
+    SQLite databases, especially the in-memory ones, are bound to the
+    connection of the UI thread, so they can not be used.
+
+    :return: bool
+    """
+    from stalker.db import DBSession
+    try:
+        bind = DBSession.get_bind()
+    except Exception:
+        return False
+    return not bind.url.drivername.startswith('sqlite')
+
+
+def get_task_ids_with_parents(task_ids):
+    """Returns the given task ids together with the ids of all the parents of
+    those tasks.
+
+    The parents are queried with one recursive query instead of walking the
+    ``Task.parents`` of every task.
+
+    :param task_ids: A list of task ids.
+    :return: set
+    """
+    task_ids = set(task_ids)
+    if not task_ids:
+        return task_ids
+
+    from stalker.db import DBSession
+
+    tasks = Task.__table__
+    ancestors = DBSession.query(tasks.c.id, tasks.c.parent_id)\
+        .filter(tasks.c.id.in_(sorted(task_ids)))\
+        .cte(name='ancestors', recursive=True)
+
+    parent_tasks = tasks.alias()
+    ancestors = ancestors.union(
+        DBSession.query(parent_tasks.c.id, parent_tasks.c.parent_id)
+        .filter(parent_tasks.c.id == ancestors.c.parent_id)
+    )
+
+    task_ids.update(r[0] for r in DBSession.query(ancestors.c.id).all())
+    return task_ids
+
+
+class VersionRowLoaderThread(QtCore.QThread):
+    """Runs :func:`.get_version_row_data` outside of the UI thread.
+
+    Connect to the ``finished()`` signal to get notified when the data is
+    loaded, the result can be reached through the ``row_data`` attribute and
+    the error, if there is any, through the ``error`` attribute.
+
+    :param version_ids: A list of version ids.
+    """
+
+    def __init__(self, version_ids, parent=None):
+        super(VersionRowLoaderThread, self).__init__(parent)
+        self.version_ids = list(version_ids)
+        self.row_data = None
+        self.error = None
+
+    @classmethod
+    def is_supported(cls):
+        """returns True if the database can be queried from another thread.
+        """
+        return can_query_in_thread()
+
+    def run(self):
+        """loads the row data
+        """
+        from stalker.db import DBSession
+        try:
+            self.row_data = get_version_row_data(self.version_ids)
+        except Exception as e:
+            logger.error('could not load version data: %s' % e)
+            self.error = e
+        finally:
+            # the session of this thread is not needed anymore
+            DBSession.remove()
+
+
+class TreeModelItem(object):
+    """A light weight handle to a row of a :class:`.LazyTreeModel`.
+
+    The models are not creating an object per row, these items are created
+    on demand by :meth:`.LazyTreeModel.itemFromIndex` to keep the
+    ``QStandardItem`` like interface that the UIs are using.
+
+    :param model: The :class:`.LazyTreeModel` instance.
+    :param int node: The node number of the row in the model.
+    :param int column: The column.
+    """
+
+    def __init__(self, model, node, column=0):
+        self.model = model
+        self.node = node
+        self.column = column
+
+    def __eq__(self, other):
+        return isinstance(other, TreeModelItem) \
+            and other.model is self.model \
+            and other.node == self.node \
+            and other.column == self.column
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((id(self.model), self.node, self.column))
+
+    def index(self):
+        """returns the QModelIndex of this item
+        """
+        return self.model.index_of_node(self.node, self.column)
+
+    def data(self, role):
+        """returns the data of this item for the given role
+        """
+        return self.model.data(self.index(), role)
+
+    def text(self):
+        """returns the display text of this item
+        """
+        text = self.data(QtCore.Qt.DisplayRole)
+        if text is None:
+            text = ''
+        return text
+
+    def font(self):
+        """returns the font of this item
+        """
+        font = self.data(QtCore.Qt.FontRole)
+        if font is None:
+            font = QtGui.QFont()
+        return font
+
+    def foreground(self):
+        """returns the foreground brush of this item
+        """
+        brush = self.data(QtCore.Qt.ForegroundRole)
+        if brush is None:
+            brush = QtGui.QBrush()
+        return brush
+
+    def background(self):
+        """returns the background color of this item
+        """
+        return self.data(QtCore.Qt.BackgroundRole)
+
+    def isCheckable(self):
+        """returns True if this item is checkable
+        """
+        return bool(
+            self.model.flags(self.index()) & QtCore.Qt.ItemIsUserCheckable
         )
-        set_item_color(latest_published_version_item, font_color)
-
-        # Action
-        action_item = QtGui.QStandardItem()
-        action_item.setEditable(False)
-        action_item.setText(action)
-        action_item.version = version
-        action_item.action = action
-        set_item_color(action_item, font_color)
-
-        # Updated By
-        updated_by_item = QtGui.QStandardItem()
-        updated_by_item.setEditable(False)
-        updated_by_text = ''
-        if latest_published_version.updated_by:
-            updated_by_text = latest_published_version.updated_by.name
-        updated_by_item.setText(updated_by_text)
-        updated_by_item.version = version
-        updated_by_item.action = action
-        set_item_color(updated_by_item, font_color)
-
-        # Description
-        description_item = QtGui.QStandardItem()
-        if latest_published_version:
-            description_item.setText(latest_published_version.description)
-        description_item.setEditable(False)
-        description_item.version = version
-        description_item.action = action
-        set_item_color(description_item, font_color)
-
-        # # Path
-        # path_item = QtGui.QStandardItem()
-        # if latest_published_version:
-        #     path_item.setText(version.absolute_full_path)
-        # path_item.setEditable(True)
-        # set_item_color(path_item, font_color)
-
-        return [version_item, thumbnail_item, nice_name_item, take_item,
-                current_version_item, latest_published_version_item,
-                action_item, updated_by_item, description_item]
-
-    def fetchMore(self):
-        logger.debug(
-            'VersionItem.fetchMore() is started for item: %s' % self.text())
-
-        if self.canFetchMore():
-            # model = self.model() # This will cause a SEGFAULT
-            versions = sorted(self.version.inputs, key=lambda x: x.full_path)
-
-            for version in versions:
-                self.appendRow(
-                    self.generate_version_row(self, self.pseudo_model, version)
-                )
 
-            self.fetched_all = True
-        logger.debug(
-            'VersionItem.fetchMore() is finished for item: %s' % self.text())
+    def checkState(self):
+        """returns the check state of this item
+        """
+        state = self.data(QtCore.Qt.CheckStateRole)
+        if state is None:
+            state = QtCore.Qt.Unchecked
+        return state
+
+    def setCheckState(self, state):
+        """sets the check state of this item
+        """
+        self.model.setData(self.index(), state, QtCore.Qt.CheckStateRole)
 
     def hasChildren(self):
-        logger.debug(
-            'VersionItem.hasChildren() is started for item: %s' % self.text())
-        if self.version:
-            return_value = bool(self.version.inputs)
-        else:
-            return_value = False
-        logger.debug(
-            'VersionItem.hasChildren() is finished for item: %s' % self.text())
-        return return_value
+        """returns True if this item has children
+        """
+        return self.model.node_has_children(self.node)
 
-    def type(self, *args, **kwargs):
+    def rowCount(self):
+        """returns the number of loaded children
         """
+        return len(self.model.child_nodes(self.node))
+
+    def child(self, row, column=0):
+        """returns the child item at the given row and column, the children
+        are loaded if they are not loaded yet
+
+        :param int row: The row of the child.
+        :param int column: The column of the child.
+        :return: :class:`.TreeModelItem` or None
         """
-        return QtGui.QStandardItem.UserType + 2
+        self.model.fetch_children(self.node)
+        children = self.model.child_nodes(self.node)
+        if 0 <= row < len(children):
+            return self.__class__(self.model, children[row], column)
+
+
+class LazyTreeModel(QtCore.QAbstractItemModel):
+    """A tree model which stores the rows in compact arrays and loads the
+    children of a row only when it is expanded.
+
+    Every row is a node, which is a number. The entity id, the parent node,
+    the row number under the parent and the "has children" flag of the nodes
+    are stored in ``array`` instances, and the data of the cells are
+    calculated in :meth:`.data` on demand. The derived classes should
+    implement the :meth:`.load_children`, :meth:`.add_child` and
+    :meth:`.data` methods.
+    """
+
+    headers = []
+    item_class = TreeModelItem
+
+    def __init__(self, *args, **kwargs):
+        QtCore.QAbstractItemModel.__init__(self, *args, **kwargs)
+        self.ids = None
+        self.parents = None
+        self.rows = None
+        self.has_children_flags = None
+        self.children = None
+        self.clear_nodes()
+
+    def clear_nodes(self):
+        """clears all the nodes
+        """
+        self.ids = array.array('l')
+        self.parents = array.array('l')
+        self.rows = array.array('l')
+        self.has_children_flags = array.array('b')
+        # node -> array of child nodes, only for the nodes that their
+        # children are loaded
+        self.children = {}
+
+    def add_node(self, parent, entity_id, has_children):
+        """adds a new node under the given parent node
+
+        :param int parent: The parent node, -1 for the top level nodes.
+        :param int entity_id: The id of the entity of the node.
+        :param bool has_children: True if the node has children.
+        :return: int, the new node
+        """
+        node = len(self.ids)
+        siblings = self.children.setdefault(parent, array.array('l'))
+        self.ids.append(entity_id)
+        self.parents.append(parent)
+        self.rows.append(len(siblings))
+        self.has_children_flags.append(1 if has_children else 0)
+        siblings.append(node)
+        return node
+
+    def add_child(self, parent, data):
+        """adds a new child from the data returned by :meth:`.load_children`
+
+        :param int parent: The parent node, -1 for the top level nodes.
+        :param data: The data of the child.
+        :return: int, the new node
+        """
+        raise NotImplementedError()
+
+    def load_children(self, node):
+        """returns the data of the children of the given node
+
+        :param int node: The node.
+        :return: list
+        """
+        raise NotImplementedError()
+
+    def set_top_level(self, data):
+        """resets the model and adds the top level nodes from the given data
+
+        :param data: A list of data to be passed to :meth:`.add_child`.
+        """
+        self.beginResetModel()
+        self.clear_nodes()
+        self.children[-1] = array.array('l')
+        for child_data in data:
+            self.add_child(-1, child_data)
+        self.endResetModel()
+
+    def fetch_children(self, node):
+        """loads the children of the given node if they are not loaded yet
+
+        :param int node: The node.
+        """
+        if node in self.children or not self.node_has_children(node):
+            return
+
+        children_data = self.load_children(node)
+        if children_data:
+            self.beginInsertRows(
+                self.index_of_node(node), 0, len(children_data) - 1
+            )
+        self.children[node] = array.array('l')
+        for child_data in children_data:
+            self.add_child(node, child_data)
+        if children_data:
+            self.endInsertRows()
+
+    def child_nodes(self, node):
+        """returns the loaded child nodes of the given node
+        """
+        return self.children.get(node, ())
 
+    def node_has_children(self, node):
+        """returns True if the given node has children
+        """
+        return bool(self.has_children_flags[node])
+
+    def node_of_index(self, index):
+        """returns the node of the given index, -1 for an invalid index
+        """
+        if index.isValid():
+            return index.internalId()
+        return -1
+
+    def index_of_node(self, node, column=0):
+        """returns the QModelIndex of the given node
+        """
+        if node < 0:
+            return QtCore.QModelIndex()
+        return self.createIndex(self.rows[node], column, node)
+
+    def itemFromIndex(self, index):
+        """returns a :class:`.TreeModelItem` for the given index
 
-class VersionTreeModel(QtGui.QStandardItemModel):
+        :param index: QModelIndex
+        :return: :class:`.TreeModelItem` or None
+        """
+        if not index.isValid():
+            return None
+        return self.item_class(self, index.internalId(), index.column())
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        if column < 0 or column >= self.columnCount():
+            return QtCore.QModelIndex()
+        children = self.child_nodes(self.node_of_index(parent))
+        if 0 <= row < len(children):
+            return self.createIndex(row, column, children[row])
+        return QtCore.QModelIndex()
+
+    def parent(self, index=None):
+        if index is None:
+            # QObject.parent()
+            return QtCore.QAbstractItemModel.parent(self)
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        return self.index_of_node(self.parents[index.internalId()])
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.child_nodes(self.node_of_index(parent)))
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return len(self.headers)
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        node = self.node_of_index(parent)
+        if node < 0:
+            return len(self.child_nodes(node)) > 0
+        return self.node_has_children(node)
+
+    def canFetchMore(self, parent):
+        node = self.node_of_index(parent)
+        return node >= 0 \
+            and node not in self.children \
+            and self.node_has_children(node)
+
+    def fetchMore(self, parent):
+        node = self.node_of_index(parent)
+        if node >= 0:
+            self.fetch_children(node)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal \
+           and role == QtCore.Qt.DisplayRole \
+           and 0 <= section < len(self.headers):
+            return self.headers[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return QtCore.Qt.NoItemFlags
+        return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+
+
+class VersionItem(TreeModelItem):
+    """A row of the :class:`.VersionTreeModel`
+    """
+
+    @property
+    def version(self):
+        """the :class:`~stalker.models.version.Version` of this row
+        """
+        return self.model.get_version(self.node)
+
+    @property
+    def action(self):
+        """the action of this row, one of "update", "create" or ""
+        """
+        return self.model.get_action(self.node)
+
+
+class VersionTreeModel(LazyTreeModel):
     """Implements the model view for the version hierarchy
+
+    The data of the rows are prefetched in bulk with
+    :func:`.get_version_row_data`. Use :meth:`.load` to prefetch them in a
+    :class:`.VersionRowLoaderThread` and populate the tree when the data is
+    ready, the ``populated()`` signal is emitted after that.
     """
 
+    headers = ['Do Update?', 'Thumbnail', 'Task', 'Take', 'Current',
+               'Latest', 'Action', 'Updated By', 'Notes']
+    item_class = VersionItem
+
+    action_colors = {
+        'update': (192, 128, 0),
+        'create': (192, 0, 0),
+        '': (0, 192, 0),
+    }
+
     def __init__(self, flat_view=False, *args, **kwargs):
-        QtGui.QStandardItemModel.__init__(self, *args, **kwargs)
+        LazyTreeModel.__init__(self, *args, **kwargs)
         logger.debug('VersionTreeModel.__init__() is started')
         self.root = None
         self.root_versions = []
         self.reference_resolution = None
         self.flat_view = flat_view
+        self.row_data = {}
+        self.versions = {}
+        self.loader = None
+        self._resolution_ids = {}
+        self._brushes = {}
         logger.debug('VersionTreeModel.__init__() is finished')
 
-    def populateTree(self, versions):
-        """populates tree with root versions
+    def clear_nodes(self):
+        """clears all the nodes
         """
-        logger.debug('VersionTreeModel.populateTree() is started')
-        self.setColumnCount(7)
-        self.setHorizontalHeaderLabels(
-            ['Do Update?', 'Thumbnail', 'Task', 'Take', 'Current', 'Latest',
-             'Action', 'Updated By', 'Notes']
-        )
+        LazyTreeModel.clear_nodes(self)
+        self.checkable_nodes = set()
+        # node -> check state
+        self.check_states = {}
 
-        self.root_versions = versions
+    def _store_versions(self, versions):
+        """stores the given versions to be found by their ids
+        """
         for version in versions:
-            self.appendRow(
-                VersionItem.generate_version_row(None, self, version)
+            self.versions[version.id] = version
+
+    def get_versions(self, version_ids):
+        """returns the versions with the given ids, the versions which are not
+        known by the model are queried in one go
+
+        :param version_ids: A list of version ids.
+        :return: list
+        """
+        missing_ids = [i for i in version_ids if i not in self.versions]
+        if missing_ids:
+            from stalker import Version
+            self._store_versions(
+                Version.query.filter(Version.id.in_(missing_ids)).all()
             )
+        return [self.versions[i] for i in version_ids if i in self.versions]
 
-        logger.debug('VersionTreeModel.populateTree() is finished')
+    def get_version(self, node):
+        """returns the version of the given node
+        """
+        versions = self.get_versions([self.ids[node]])
+        if versions:
+            return versions[0]
 
-    def canFetchMore(self, index):
-        logger.debug(
-            'VersionTreeModel.canFetchMore() is started for index: %s' % index)
-        if not index.isValid():
-            return_value = False
-        else:
-            item = self.itemFromIndex(index)
-            return_value = item.canFetchMore()
-        logger.debug(
-            'VersionTreeModel.canFetchMore() is finished for index: %s' % index)
-        return return_value
+    def prefetch(self, versions):
+        """prefetches the row data of the given versions and all of their
+        inputs, if they are not already fetched
 
-    def fetchMore(self, index):
-        """fetches more elements
+        :param versions: A list of :class:`~stalker.models.version.Version`
+          instances.
         """
-        logger.debug(
-            'VersionTreeModel.canFetchMore() is started for index: %s' % index
+        self._store_versions(versions)
+        missing_ids = [v.id for v in versions if v.id not in self.row_data]
+        if missing_ids:
+            self.row_data.update(get_version_row_data(missing_ids))
+
+    def _get_row_data_by_id(self, version_id):
+        """returns the :class:`.VersionRowData` of the version with the given
+        id
+        """
+        try:
+            return self.row_data[version_id]
+        except KeyError:
+            self.row_data.update(get_version_row_data([version_id]))
+            return self.row_data[version_id]
+
+    def get_row_data(self, version):
+        """returns the :class:`.VersionRowData` of the given version
+
+        :param version: A :class:`~stalker.models.version.Version` instance.
+        :return: :class:`.VersionRowData`
+        """
+        self._store_versions([version])
+        return self._get_row_data_by_id(version.id)
+
+    def get_action(self, node):
+        """returns the action of the given node
+        """
+        version_id = self.ids[node]
+        if version_id in self._resolution_ids.get('update', ()):
+            return 'update'
+        elif version_id in self._resolution_ids.get('create', ()):
+            return 'create'
+        return ''
+
+    def _get_brush(self, action):
+        """returns the foreground brush for the given action
+        """
+        try:
+            return self._brushes[action]
+        except KeyError:
+            brush = QtGui.QBrush(QtGui.QColor(*self.action_colors[action]))
+            self._brushes[action] = brush
+            return brush
+
+    def load(self, versions):
+        """prefetches the row data in a :class:`.VersionRowLoaderThread` and
+        populates the tree with the given root versions when the data is
+        ready.
+
+        :param versions: A list of :class:`~stalker.models.version.Version`
+          instances.
+        """
+        self.root_versions = versions
+        self._store_versions(versions)
+        self.loader = VersionRowLoaderThread(
+            [v.id for v in versions],
+            parent=self
         )
-        if index.isValid():
-            item = self.itemFromIndex(index)
-            item.fetchMore()
-        logger.debug(
-            'VersionTreeModel.canFetchMore() is finished for index: %s' % index
+        QtCore.QObject.connect(
+            self.loader,
+            QtCore.SIGNAL('finished()'),
+            self._loader_finished
         )
+        self.loader.start()
+
+    def _loader_finished(self):
+        """populates the tree with the data loaded by the loader thread
+        """
+        loader = self.loader
+        self.loader = None
+        if loader.row_data is not None:
+            self.row_data.update(loader.row_data)
+        self.populateTree(self.root_versions)
+        self.emit(QtCore.SIGNAL('populated()'))
+
+    def populateTree(self, versions):
+        """populates tree with root versions
+        """
+        logger.debug('VersionTreeModel.populateTree() is started')
+        self.root_versions = versions
 
-    def hasChildren(self, index):
-        """returns True or False depending on to the index and the item on the
-        index
+        self._resolution_ids = {}
+        if self.reference_resolution:
+            for key in self.reference_resolution:
+                resolved_versions = self.reference_resolution[key]
+                self._store_versions(resolved_versions)
+                self._resolution_ids[key] = \
+                    set(v.id for v in resolved_versions)
+        self.prefetch(versions)
+
+        self.set_top_level([v.id for v in versions])
+        logger.debug('VersionTreeModel.populateTree() is finished')
+
+    def add_child(self, parent, version_id):
+        """adds a new version node
         """
-        logger.debug(
-            'VersionTreeModel.hasChildren() is started for index: %s' % index
+        has_children = not self.flat_view \
+            and bool(self._get_row_data_by_id(version_id).input_ids)
+        node = self.add_node(parent, version_id, has_children)
+        if version_id in self._resolution_ids.get('root', ()) \
+           and self.get_action(node) != '':
+            self.checkable_nodes.add(node)
+            self.check_states[node] = QtCore.Qt.Checked
+        return node
+
+    def load_children(self, node):
+        """returns the input version ids of the given node sorted by their
+        full paths
+        """
+        input_ids = self._get_row_data_by_id(self.ids[node]).input_ids
+        return sorted(
+            input_ids,
+            key=lambda x: self._get_row_data_by_id(x).full_path
         )
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
         if not index.isValid():
-            return_value = len(self.root_versions) > 0
+            return None
+
+        node = index.internalId()
+        column = index.column()
+
+        if role == QtCore.Qt.DisplayRole:
+            row_data = self._get_row_data_by_id(self.ids[node])
+            if column == 2:
+                return '%s_v%s' % (
+                    row_data.nice_name,
+                    ('%s' % row_data.version_number).zfill(3)
+                )
+            elif column == 3:
+                return row_data.take_name
+            elif column == 4:
+                return '%s' % row_data.version_number
+            elif column == 5:
+                if row_data.latest_published_version_id is None:
+                    return 'No Published Version'
+                return '%s' % row_data.latest_published_version_number
+            elif column == 6:
+                return self.get_action(node)
+            elif column == 7:
+                return row_data.updated_by_name
+            elif column == 8:
+                return row_data.description
+        elif role == QtCore.Qt.ForegroundRole:
+            return self._get_brush(self.get_action(node))
+        elif role == QtCore.Qt.CheckStateRole and column == 0:
+            return self.check_states.get(node)
+
+        return None
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        if not index.isValid() or role != QtCore.Qt.CheckStateRole:
+            return False
+
+        node = index.internalId()
+        if index.column() != 0:
+            return False
+
+        if value == QtCore.Qt.Checked:
+            self.check_states[node] = QtCore.Qt.Checked
         else:
-            if self.flat_view:
-                return False
-            else:
-                item = self.itemFromIndex(index)
-                return_value = False
-                if item:
-                    return_value = item.hasChildren()
-        logger.debug(
-            'VersionTreeModel.hasChildren() is finished for index: %s' % index
+            self.check_states[node] = QtCore.Qt.Unchecked
+
+        self.emit(
+            QtCore.SIGNAL('dataChanged(const QModelIndex &, '
+                          'const QModelIndex &)'),
+            index,
+            index
         )
-        return return_value
+        return True
+
+    def flags(self, index):
+        flags = LazyTreeModel.flags(self, index)
+        if index.isValid() and index.column() == 0 \
+           and index.internalId() in self.checkable_nodes:
+            flags |= QtCore.Qt.ItemIsUserCheckable
+        return flags
 
 
 class VersionTreeView(QtGui.QTreeView):
@@ -311,263 +857,518 @@ class VersionTreeView(QtGui.QTreeView):
         # TODO: Implement this as a class with all its context menus etc.
 
 
-class TaskTreeView(QtGui.QTreeView):
-    """A custom tree view to display Tasks info
+class TableModelItem(object):
+    """A light weight handle to a cell of a :class:`.VersionTableModel`, to
+    keep the ``QTableWidgetItem`` like interface that the UIs are using.
+
+    :param model: The :class:`.VersionTableModel` instance.
+    :param int row: The row.
+    :param int column: The column.
     """
 
-    def __init__(self, *args, **kwargs):
-        super(TaskTreeView, self).__init__(*args, **kwargs)
+    def __init__(self, model, row, column=0):
+        self.model = model
+        self._row = row
+        self._column = column
 
+    def row(self):
+        """returns the row of this item
+        """
+        return self._row
 
-class TaskItem(QtGui.QStandardItem):
-    """Implements the Task as a QStandardItem
-    """
+    def column(self):
+        """returns the column of this item
+        """
+        return self._column
 
-    def __init__(self, *args, **kwargs):
-        QtGui.QStandardItem.__init__(self, *args, **kwargs)
-        logger.debug(
-            'TaskItem.__init__() is started for item: %s' % self.text()
-        )
-        self.loaded = False
-        self.task = None
-        self.parent = None
-        self.fetched_all = False
-        self.setEditable(False)
-        self.user = None
-        self.user_tasks_only = False
-        logger.debug(
-            'TaskItem.__init__() is finished for item: %s' % self.text()
-        )
+    def index(self):
+        """returns the QModelIndex of this item
+        """
+        return self.model.index(self._row, self._column)
 
-    def clone(self):
-        """returns a copy of this item
+    def data(self, role):
+        """returns the data of this item for the given role
         """
-        logger.debug('TaskItem.clone() is started for item: %s' % self.text())
-        new_item = TaskItem()
-        new_item.task = self.task
-        new_item.parent = self.parent
-        new_item.fetched_all = self.fetched_all
-        logger.debug('TaskItem.clone() is finished for item: %s' % self.text())
-        return new_item
+        return self.model.data(self.index(), role)
 
-    def canFetchMore(self):
-        logger.debug(
-            'TaskItem.canFetchMore() is started for item: %s' % self.text()
-        )
-        return_value = False
-        if self.task and not self.fetched_all:
-            if isinstance(self.task, Task):
-                return_value = self.task.is_container
-            elif isinstance(self.task, Project):
-                return_value = len(self.task.root_tasks) > 0
-        else:
-            return_value = False
-        logger.debug(
-            'TaskItem.canFetchMore() is finished for item: %s' % self.text()
-        )
-        return return_value
+    def text(self):
+        """returns the display text of this item
+        """
+        text = self.data(QtCore.Qt.DisplayRole)
+        if text is None:
+            text = ''
+        return text
 
-    def fetchMore(self):
-        logger.debug(
-            'TaskItem.fetchMore() is started for item: %s' % self.text()
-        )
+    def font(self):
+        """returns the font of this item
+        """
+        font = self.data(QtCore.Qt.FontRole)
+        if font is None:
+            font = QtGui.QFont()
+        return font
 
-        if self.canFetchMore():
-            tasks = []
-            if isinstance(self.task, Task):
-                tasks = self.task.children
-            elif isinstance(self.task, Project):
-                tasks = self.task.root_tasks
-
-            # model = self.model() # This will cause a SEGFAULT
-            if self.user_tasks_only:
-                user_tasks_and_parents = []
-                # need to filter tasks which do not belong to user
-                for task in tasks:
-                    for user_task in self.user.tasks:
-                        if task in user_task.parents or \
-                           task is user_task or \
-                           task in self.user.projects:
-                            user_tasks_and_parents.append(task)
-                            break
-
-                tasks = user_tasks_and_parents
-            tasks = sorted(tasks, key=lambda x: x.name)
-
-            for task in tasks:
-                task_item = TaskItem(0, 3)
-                task_item.parent = self
-                task_item.task = task
-                task_item.user = self.user
-                task_item.user_tasks_only = self.user_tasks_only
-
-                # set the font
-                # name_item = QtGui.QStandardItem(task.name)
-                # entity_type_item = QtGui.QStandardItem(task.entity_type)
-                # task_item.setItem(0, 0, name_item)
-                # task_item.setItem(0, 1, entity_type_item)
-                task_item.setText(task.name)
-
-                make_bold = False
-                if isinstance(task, Task):
-                    if task.is_container:
-                        make_bold = True
-                elif isinstance(task, Project):
-                    make_bold = True
-
-                if make_bold:
-                    my_font = task_item.font()
-                    my_font.setBold(True)
-                    task_item.setFont(my_font)
 
-                # color with task status
-                task_item.setData(
-                    QtGui.QColor(
-                        *status_colors[task_item.task.status.code.lower()]
-                    ),
-                    QtCore.Qt.BackgroundRole
-                )
+class VersionTableModel(QtCore.QAbstractTableModel):
+    """A table model showing the versions of a task and take.
 
-                # use black text
-                task_item.setForeground(
-                    QtGui.QBrush(QtGui.QColor(0, 0, 0))
-                )
+    The versions are loaded in pages of ``page_size`` rows with
+    :func:`.get_version_table_rows`, the latest page first. Older pages are
+    loaded with :meth:`.fetch_older` and inserted to the top of the table, so
+    the rows are always sorted by the version number.
 
-                self.appendRow(task_item)
+    The loaded rows are cached per (task id, take name, published only), and
+    a cached entry is reused as long as the latest version number and the
+    version count of it are not changed. Call :meth:`.clear_cache` after
+    changing a version.
 
-            self.fetched_all = True
-        logger.debug(
-            'TaskItem.fetchMore() is finished for item: %s' % self.text()
-        )
+    :param int page_size: The number of versions loaded at once.
+    """
 
-    def hasChildren(self):
-        logger.debug(
-            'TaskItem.hasChildren() is started for item: %s' % self.text()
+    headers = ['#', 'App', 'Created By', 'Updated By', 'Size', 'Date',
+               'Description']
+
+    published_color = (0, 192, 0)
+
+    def __init__(self, parent=None, page_size=25):
+        QtCore.QAbstractTableModel.__init__(self, parent)
+        self.page_size = page_size
+        self.key = None
+        # the rows in ascending version number order
+        self.rows = []
+        self.has_older = False
+        # key: [rows, has_older, signature]
+        self.cache = {}
+        self._icons = {}
+        self._bold_font = None
+        self._published_brush = None
+
+    def clear_cache(self):
+        """clears the cached rows
+        """
+        self.cache = {}
+
+    def clear(self):
+        """removes all the rows
+        """
+        self.beginResetModel()
+        self.key = None
+        self.rows = []
+        self.has_older = False
+        self.endResetModel()
+
+    @classmethod
+    def get_signature(cls, task_id, take_name, published_only):
+        """returns the latest version number, the version count and the
+        latest update date of the versions of the given task and take, which
+        are used to validate the cached rows
+        """
+        from sqlalchemy import func
+        from stalker import Version
+        from stalker.db import DBSession
+
+        query = DBSession\
+            .query(
+                func.max(Version.version_number),
+                func.count(Version.id),
+                func.max(Version.date_updated)
+            )\
+            .filter(Version.task_id == task_id)\
+            .filter(Version.take_name == take_name)
+        if published_only:
+            query = query.filter(Version.is_published == True)
+        return tuple(query.one())
+
+    def _fetch_page(self, before_version_number=None):
+        """returns the rows of the page before the given version number in
+        ascending order and if there are older versions
+        """
+        task_id, take_name, published_only = self.key
+        # query one more row to know if there is an older page
+        rows = get_version_table_rows(
+            task_id, take_name, published_only,
+            before_version_number=before_version_number,
+            limit=self.page_size + 1
         )
+        has_older = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        rows.reverse()
+        return rows, has_older
+
+    def load(self, task_id, take_name, published_only=False):
+        """loads the latest versions of the given task and take, the cached
+        rows are used if they are still valid
+
+        :param int task_id: The id of the task.
+        :param str take_name: The take name.
+        :param bool published_only: Only show the published versions.
+        """
+        self.beginResetModel()
+        self.key = (task_id, take_name, published_only)
+        signature = self.get_signature(*self.key)
 
-        if self.task:
-            if isinstance(self.task, Task):
-                return_value = self.task.is_container
-            elif isinstance(self.task, Project):
-                return_value = len(self.task.root_tasks) > 0
-            else:
-                return_value = False
+        cached = self.cache.get(self.key)
+        if cached and cached[2] == signature:
+            self.rows, self.has_older = cached[0], cached[1]
         else:
-            return_value = False
-        logger.debug(
-            'TaskItem.hasChildren() is finished for item: %s' % self.text()
-        )
+            self.rows, self.has_older = self._fetch_page()
+            self.cache[self.key] = [self.rows, self.has_older, signature]
+
+        # the page size may have been increased since the rows are cached
+        while self.has_older and len(self.rows) < self.page_size:
+            rows, self.has_older = self._fetch_page(self.rows[0].version_number)
+            self.rows = rows + self.rows
+            self._update_cache()
+        self.endResetModel()
+
+    def _update_cache(self):
+        """stores the current rows to the cache
+        """
+        cached = self.cache.get(self.key)
+        if cached:
+            cached[0] = self.rows
+            cached[1] = self.has_older
+
+    def can_fetch_older(self):
+        """returns True if there are older versions to be loaded
+        """
+        return self.key is not None and self.has_older
+
+    def fetch_older(self):
+        """loads the page of the older versions and inserts them to the top
+
+        :return: The number of rows inserted.
+        """
+        if not self.can_fetch_older():
+            return 0
+
+        before = self.rows[0].version_number if self.rows else None
+        rows, has_older = self._fetch_page(before)
+        self.has_older = has_older
+        if rows:
+            self.beginInsertRows(QtCore.QModelIndex(), 0, len(rows) - 1)
+            self.rows = rows + self.rows
+            self.endInsertRows()
+        self._update_cache()
+        return len(rows)
+
+    def get_version(self, row):
+        """returns the :class:`~stalker.models.version.Version` instance at
+        the given row or None
+        """
+        if 0 <= row < len(self.rows):
+            from stalker import Version
+            return Version.query.get(self.rows[row].id)
 
-        return return_value
+    def row_of_version(self, version):
+        """returns the row of the given version, the older pages are loaded
+        until the version is found
 
-    def type(self, *args, **kwargs):
+        :param version: A :class:`~stalker.models.version.Version` instance.
+        :return: int, -1 if the version is not in this table
         """
+        if version is None:
+            return -1
+
+        while True:
+            for i, row_data in enumerate(self.rows):
+                if row_data.id == version.id:
+                    return i
+
+            if not self.rows \
+               or self.rows[0].version_number <= version.version_number \
+               or not self.fetch_older():
+                return -1
+
+    def item(self, row, column=0):
+        """returns a :class:`.TableModelItem` for the given cell or None
         """
-        return QtGui.QStandardItem.UserType + 1
+        if 0 <= row < len(self.rows) and 0 <= column < len(self.headers):
+            return TableModelItem(self, row, column)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.rows)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal \
+           and role == QtCore.Qt.DisplayRole \
+           and 0 <= section < len(self.headers):
+            return self.headers[section]
+        return None
+
+    def _get_icon(self, created_with):
+        """returns the cached icon of the given application
+        """
+        created_with = created_with.lower()
+        icon = self._icons.get(created_with)
+        if icon is None:
+            from anima.ui.utils import get_icon
+            icon = get_icon(created_with)
+            self._icons[created_with] = icon
+        return icon
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self.rows):
+            return None
+
+        row_data = self.rows[index.row()]
+        column = index.column()
+
+        if role == QtCore.Qt.DisplayRole:
+            if column == 0:
+                return '%s' % row_data.version_number
+            elif column == 2:
+                return row_data.created_by_name
+            elif column == 3:
+                return row_data.updated_by_name
+            elif column == 4:
+                return defaults.file_size_format % row_data.file_size
+            elif column == 5:
+                return row_data.file_date.strftime(defaults.date_time_format)
+            elif column == 6:
+                return row_data.description
+        elif role == QtCore.Qt.DecorationRole:
+            if column == 1 and row_data.created_with:
+                return self._get_icon(row_data.created_with)
+        elif role == QtCore.Qt.TextAlignmentRole:
+            if column == 0:
+                # align to center and vertical center
+                return 0x0004 | 0x0080
+            # align to left and vertical center
+            return 0x0001 | 0x0080
+        elif role == QtCore.Qt.FontRole:
+            if row_data.is_published:
+                if self._bold_font is None:
+                    self._bold_font = QtGui.QFont()
+                    self._bold_font.setBold(True)
+                return self._bold_font
+        elif role == QtCore.Qt.ForegroundRole:
+            if row_data.is_published:
+                if self._published_brush is None:
+                    self._published_brush = QtGui.QBrush(
+                        QtGui.QColor(*self.published_color)
+                    )
+                return self._published_brush
+
+        return None
+
 
+class TaskTreeView(QtGui.QTreeView):
+    """A custom tree view to display Tasks info
+    """
 
-class TaskTreeModel(QtGui.QStandardItemModel):
+    def __init__(self, *args, **kwargs):
+        super(TaskTreeView, self).__init__(*args, **kwargs)
+
+
+class TaskItem(TreeModelItem):
+    """A row of the :class:`.TaskTreeModel`
+    """
+
+    @property
+    def task(self):
+        """the :class:`~stalker.models.task.Task` or
+        :class:`~stalker.models.project.Project` of this row
+        """
+        return self.model.get_entity(self.node)
+
+
+class TaskTreeModel(LazyTreeModel):
     """Implements the model view for the task hierarchy
+
+    Only the id, name, entity type and status code of the tasks are loaded,
+    with one query per expanded task, the Task instances are queried only
+    when they are requested through :attr:`.TaskItem.task`.
     """
 
+    headers = ['Name', 'Type', 'Dependencies']
+    item_class = TaskItem
+
     def __init__(self, *args, **kwargs):
-        QtGui.QStandardItemModel.__init__(self, *args, **kwargs)
+        LazyTreeModel.__init__(self, *args, **kwargs)
         logger.debug('TaskTreeModel.__init__() is started')
         self.user = None
         self.root = None
         self.user_tasks_only = False
+        self.projects = {}
+        self._user_task_ids = None
+        self._bold_font = None
+        self._status_colors = {}
+        self._foreground_brush = None
         logger.debug('TaskTreeModel.__init__() is finished')
 
+    def clear_nodes(self):
+        """clears all the nodes
+        """
+        LazyTreeModel.clear_nodes(self)
+        self.names = []
+        self.entity_types = []
+        self.status_codes = []
+
     def populateTree(self, projects):
         """populates tree with user projects
         """
         logger.debug('TaskTreeModel.populateTree() is started')
-        self.setColumnCount(3)
-        self.setHorizontalHeaderLabels(
-            ['Name', 'Type', 'Dependencies']
-        )
-
-        # item_prototype = TaskItem()
-        # self.setItemPrototype(item_prototype)
-        # root_item = TaskItem(0, 3)
-        # root_item.setColumnCount(3)
-        # self.appendRow(root_item)
+        from stalker.db import DBSession
 
+        self.projects = {}
         for project in projects:
-            project_item = TaskItem(0, 3)
-            project_item.parent = None
-            project_item.setColumnCount(3)
-            project_item.setText(project.name)
-            project_item.task = project
-            project_item.user = self.user
-            project_item.user_tasks_only = self.user_tasks_only
-
-            # set the font
-            # project_item.setText(0, entity.name)
-            # project_item.setText(1, entity.entity_type)
-            # name_item = QtGui.QStandardItem()
-            # name_item.setText(project.name)
-            # entity_type_item = QtGui.QStandardItem()
-            # entity_type_item.setText(project.entity_type)
-            # project_item.appendColumn([name_item, entity_type_item])
-
-            # Set Font
-            # project_item.setText(project.name)
-            my_font = project_item.font()
-            my_font.setBold(True)
-            project_item.setFont(my_font)
-
-            self.appendRow(project_item)
-            # root_item.appendRow(project_item)
+            self.projects[project.id] = project
+        self._user_task_ids = None
+
+        projects_with_tasks = set()
+        if self.projects:
+            projects_with_tasks = set(
+                r[0] for r in DBSession.query(Task.project_id)
+                .filter(Task.project_id.in_(list(self.projects.keys())))
+                .filter(Task.parent_id == None)
+                .distinct()
+                .all()
+            )
 
+        self.set_top_level([
+            (project.id, project.name, 'Project', None,
+             project.id in projects_with_tasks)
+            for project in projects
+        ])
         logger.debug('TaskTreeModel.populateTree() is finished')
 
-    def canFetchMore(self, index):
-        logger.debug(
-            'TaskTreeModel.canFetchMore() is started for index: %s' % index)
-        if not index.isValid():
-            return_value = False
+    def add_child(self, parent, data):
+        """adds a new task node from the given
+        (id, name, entity_type, status_code, has_children) tuple
+        """
+        entity_id, name, entity_type, status_code, has_children = data
+        node = self.add_node(parent, entity_id, has_children)
+        self.names.append(name)
+        self.entity_types.append(entity_type)
+        self.status_codes.append(status_code)
+        return node
+
+    def get_user_task_ids(self):
+        """returns the ids of the tasks of the user and the ids of all of
+        their parents.
+
+        It is calculated once per tree with two queries, one for the ids of
+        the user tasks and a recursive one for the ids of all of their
+        parents, so filtering the children of a task is just a set lookup.
+
+        :return: set
+        """
+        if self._user_task_ids is None:
+            user_task_ids = set()
+            if self.user:
+                from stalker.db import DBSession
+                user_task_ids = set(
+                    r[0] for r in DBSession.query(Task.id)
+                    .filter(Task.resources.contains(self.user))
+                    .all()
+                )
+            self._user_task_ids = get_task_ids_with_parents(user_task_ids)
+        return self._user_task_ids
+
+    def load_children(self, node):
+        """returns the (id, name, entity_type, status_code, has_children)
+        tuples of the child tasks of the given node sorted by name
+        """
+        from sqlalchemy import exists
+        from stalker import Status
+        from stalker.db import DBSession
+
+        statuses = Status.__table__
+        child_tasks = Task.__table__.alias()
+
+        query = DBSession.query(
+            Task.id,
+            Task.name,
+            Task.entity_type,
+            statuses.c.code,
+            exists().where(child_tasks.c.parent_id == Task.id)
+        ).outerjoin(statuses, Task.status_id == statuses.c.id)
+
+        entity_id = self.ids[node]
+        if self.entity_types[node] == 'Project':
+            query = query\
+                .filter(Task.project_id == entity_id)\
+                .filter(Task.parent_id == None)
         else:
-            item = self.itemFromIndex(index)
-            return_value = item.canFetchMore()
-        logger.debug(
-            'TaskTreeModel.canFetchMore() is finished for index: %s' % index)
-        return return_value
+            query = query.filter(Task.parent_id == entity_id)
+
+        children_data = query.order_by(Task.name).all()
+
+        if self.user_tasks_only:
+            # need to filter tasks which do not belong to user
+            user_task_ids = self.get_user_task_ids()
+            children_data = [
+                data for data in children_data if data[0] in user_task_ids
+            ]
+
+        return children_data
 
-    def fetchMore(self, index):
-        """fetches more elements
+    def get_entity(self, node):
+        """returns the Project or Task instance of the given node
         """
-        logger.debug(
-            'TaskTreeModel.canFetchMore() is started for index: %s' % index)
-        if index.isValid():
-            item = self.itemFromIndex(index)
-            item.fetchMore()
-        logger.debug(
-            'TaskTreeModel.canFetchMore() is finished for index: %s' % index)
+        entity_id = self.ids[node]
+        if self.entity_types[node] == 'Project':
+            project = self.projects.get(entity_id)
+            if project is None:
+                project = Project.query.get(entity_id)
+            return project
+        return Task.query.get(entity_id)
+
+    def _get_bold_font(self):
+        """returns the bold font for container tasks and projects
+        """
+        if self._bold_font is None:
+            self._bold_font = QtGui.QFont()
+            self._bold_font.setBold(True)
+        return self._bold_font
 
-    def hasChildren(self, index):
-        """returns True or False depending on to the index and the item on the
-        index
+    def _get_status_color(self, status_code):
+        """returns the background color for the given status code
         """
-        logger.debug(
-            'TaskTreeModel.hasChildren() is started for index: %s' % index)
-        if not index.isValid():
-            if self.user_tasks_only:
-                if self.user:
-                    projects = self.user.projects
-                else:
-                    projects = []
-            else:
-                projects = Project.query.all()
-            return_value = len(projects) > 0
-        else:
-            item = self.itemFromIndex(index)
-            return_value = False
-            if item:
-                return_value = item.hasChildren()
-        logger.debug(
-            'TaskTreeModel.hasChildren() is finished for index: %s' % index)
-        return return_value
+        if not status_code:
+            return None
+        status_code = status_code.lower()
+        try:
+            return self._status_colors[status_code]
+        except KeyError:
+            color = None
+            if status_code in status_colors:
+                color = QtGui.QColor(*status_colors[status_code])
+            self._status_colors[status_code] = color
+            return color
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid() or index.column() != 0:
+            return None
+
+        node = index.internalId()
+        is_project = self.entity_types[node] == 'Project'
+
+        if role == QtCore.Qt.DisplayRole:
+            return self.names[node]
+        elif role == QtCore.Qt.FontRole:
+            if is_project or self.node_has_children(node):
+                return self._get_bold_font()
+        elif role == QtCore.Qt.BackgroundRole:
+            if not is_project:
+                # color with task status
+                return self._get_status_color(self.status_codes[node])
+        elif role == QtCore.Qt.ForegroundRole:
+            if not is_project:
+                # use black text
+                if self._foreground_brush is None:
+                    self._foreground_brush = \
+                        QtGui.QBrush(QtGui.QColor(0, 0, 0))
+                return self._foreground_brush
+
+        return None
 
 
 class TakesListWidget(QtGui.QListWidget):
@@ -656,16 +1457,214 @@ class TakesListWidget(QtGui.QListWidget):
         QtGui.QListWidget.clear(self)
 
 
+class TaskNameIndex(object):
+    """An in-memory trigram index of the task names.
+
+    The names are searched with their trigrams, so searching a text in tens
+    of thousands of task names doesn't need to scan all the names or query
+    the database. It is safe to :meth:`.build` the index in one thread while
+    searching it in another.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.names = {}
+        self.lower_names = {}
+        self.trigrams = {}
+        self.built_at = None
+
+    @property
+    def is_ready(self):
+        """returns True if the index is built
+        """
+        return self.built_at is not None
+
+    @classmethod
+    def get_trigrams(cls, text):
+        """returns the trigrams of the given text
+
+        :param str text: The text.
+        :return: set
+        """
+        return set(text[i:i + 3] for i in range(len(text) - 2))
+
+    def build(self, rows):
+        """builds the index from the given (id, name) rows
+
+        :param rows: A list of (task_id, task_name) tuples.
+        """
+        names = {}
+        lower_names = {}
+        trigrams = {}
+        for task_id, task_name in rows:
+            lower_name = task_name.lower()
+            names[task_id] = task_name
+            lower_names[task_id] = lower_name
+            for trigram in self.get_trigrams(lower_name):
+                trigrams.setdefault(trigram, set()).add(task_id)
+
+        with self._lock:
+            self.names = names
+            self.lower_names = lower_names
+            self.trigrams = trigrams
+            self.built_at = time.time()
+
+    def load(self):
+        """builds the index from the database with a column only query
+        """
+        from stalker.db import DBSession
+        self.build(DBSession.query(Task.id, Task.name).all())
+
+    def search(self, text, limit=None):
+        """returns the sorted unique task names containing the given text
+
+        :param str text: The text to search for, case insensitive.
+        :param int limit: The maximum number of names to return.
+        :return: list
+        """
+        text = text.lower()
+        with self._lock:
+            names = self.names
+            lower_names = self.lower_names
+            trigrams = self.trigrams
+
+        if len(text) >= 3:
+            candidate_ids = None
+            for trigram in self.get_trigrams(text):
+                ids = trigrams.get(trigram)
+                if not ids:
+                    return []
+                if candidate_ids is None:
+                    candidate_ids = ids
+                else:
+                    candidate_ids = candidate_ids & ids
+        else:
+            candidate_ids = lower_names.keys()
+
+        task_names = sorted(set(
+            names[task_id] for task_id in candidate_ids
+            if text in lower_names[task_id]
+        ))
+        if limit:
+            task_names = task_names[:limit]
+        return task_names
+
+
+class TaskNameIndexThread(QtCore.QThread):
+    """Builds a :class:`.TaskNameIndex` outside of the UI thread.
+
+    :param index: The :class:`.TaskNameIndex` instance.
+    """
+
+    def __init__(self, index, parent=None):
+        super(TaskNameIndexThread, self).__init__(parent)
+        self.index = index
+
+    def run(self):
+        """loads the index
+        """
+        from stalker.db import DBSession
+        try:
+            self.index.load()
+        except Exception as e:
+            logger.error('could not load task names: %s' % e)
+        finally:
+            # the session of this thread is not needed anymore
+            DBSession.remove()
+
+
 class TaskNameCompleter(QtGui.QCompleter):
-    def __init__(self, parent):
+    """A completer for task names.
+
+    The search is started ``delay`` milliseconds after the last call to
+    :meth:`.update`, so the searches for the intermediate texts while typing
+    are dropped. The names are searched in a :class:`.TaskNameIndex` which is
+    built (and refreshed every ``index_ttl`` seconds) in a
+    :class:`.TaskNameIndexThread`. Until the index is ready the names are
+    queried from the database, only the names and at most ``limit`` of them.
+    """
+
+    delay = 150
+    limit = 50
+    index_ttl = 300
+
+    def __init__(self, parent, index=None):
         QtGui.QCompleter.__init__(self, [], parent)
+        if index is None:
+            index = TaskNameIndex()
+        self.index = index
+        self.index_loader = None
+        self.completion_text = ''
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.delay)
+        QtCore.QObject.connect(
+            self.timer,
+            QtCore.SIGNAL('timeout()'),
+            self.search
+        )
 
-    def update(self, completion_prefix):
-        tasks = Task.query \
-            .filter(Task.name.ilike('%' + completion_prefix + '%')) \
+        self.refresh_index()
+
+    def refresh_index(self):
+        """rebuilds the index in a :class:`.TaskNameIndexThread`
+        """
+        if self.index_loader is not None or not can_query_in_thread():
+            return
+
+        self.index_loader = TaskNameIndexThread(self.index, parent=self)
+        QtCore.QObject.connect(
+            self.index_loader,
+            QtCore.SIGNAL('finished()'),
+            self._index_loaded
+        )
+        self.index_loader.start()
+
+    def _index_loaded(self):
+        """called when the index is loaded
+        """
+        self.index_loader = None
+
+    @classmethod
+    def query_task_names(cls, text, limit):
+        """queries the sorted unique task names containing the given text
+
+        :param str text: The text to search for, case insensitive.
+        :param int limit: The maximum number of names to return.
+        :return: list
+        """
+        from stalker.db import DBSession
+        return [
+            r[0] for r in DBSession.query(Task.name)
+            .filter(Task.name.ilike('%' + text + '%'))
+            .distinct()
+            .order_by(Task.name)
+            .limit(limit)
             .all()
-        logger.debug('completer tasks : %s' % tasks)
-        task_names = [task.name for task in tasks]
+        ]
+
+    def update(self, completion_prefix):
+        """schedules a search for the given text, the previously scheduled
+        search is cancelled
+
+        :param str completion_prefix: The text to search for.
+        """
+        self.completion_text = completion_prefix
+        self.timer.start()
+
+    def search(self):
+        """searches the task names for the last text given to :meth:`.update`
+        """
+        text = self.completion_text
+        if self.index.is_ready:
+            task_names = self.index.search(text, self.limit)
+            if time.time() - self.index.built_at > self.index_ttl:
+                self.refresh_index()
+        else:
+            task_names = self.query_task_names(text, self.limit)
+
+        logger.debug('completer task names : %s' % task_names)
         model = QtGui.QStringListModel(task_names)
         self.setModel(model)
         # self.setCompletionPrefix(completion_prefix)
@@ -3,19 +3,53 @@
 #
 # This module is part of anima-tools and is released under the BSD 2
 # License: http://www.opensource.org/licenses/BSD-2-Clause
+import threading
+import time
+
 from anima.base import Singleton
 from anima.ui.lib import QtCore, QtGui
 
 
 class ProgressCaller(object):
     """A simple object to hold caller data for ProgressDialogManager
+
+    A caller with a ``parent`` caller is a nested caller, all of its steps
+    together are counted as one step of the parent caller.
     """
 
-    def __init__(self, max_steps=0, title=''):
+    def __init__(self, max_steps=0, title='', parent=None):
         self.max_steps = max_steps
         self.title = title
         self.current_step = 0
         self.manager = None
+        self.parent = parent
+        self.start_time = time.time()
+
+    @property
+    def full_title(self):
+        """returns the title of this caller prefixed with the titles of the
+        parent callers
+        """
+        if self.parent is None:
+            return self.title
+
+        parent_title = self.parent.full_title
+        if not parent_title:
+            return self.title
+        if not self.title:
+            return parent_title
+        return '%s > %s' % (parent_title, self.title)
+
+    @property
+    def step_weight(self):
+        """returns how many steps of the ProgressDialogManager one step of
+        this caller is worth
+        """
+        if self.parent is None:
+            return 1.0
+        if not self.max_steps:
+            return 0.0
+        return self.parent.step_weight / self.max_steps
 
     def step(self, step_size=1, message=''):
         """A shortcut for the ProgressDialogManager.step() method
@@ -46,10 +80,37 @@ class ProgressDialogManager(object):
     So calling ``register`` will register a new caller for the progress window.
     The ProgressDialogManager will store the caller and will kill the
     QProgressDialog when all of the callers are completed.
+
+    Pass a ``parent`` caller to ``register`` to report the progress of a
+    nested loop, the nested caller is counted as one step of its parent::
+
+      caller = pm.register(len(nodes), 'Moving Cache Files')
+      for node in nodes:
+          inner_caller = pm.register(len(files), parent=caller)
+          for f in files:
+              inner_caller.step()
+          inner_caller.end_progress()
+          caller.step()
+
+    The dialog is updated at most ``max_refresh_rate`` times per second, or
+    when another caller is stepped, so stepping is cheap even for hundreds of
+    thousands of steps. The steps are counted under a lock, so the callers
+    can be stepped from other threads, but the dialog is only updated in the
+    thread that created the ProgressDialogManager. Call :meth:`.refresh` from
+    that thread to show the progress of the other threads.
+
+    The functions added with :meth:`.add_event_handler` are called with a
+    dictionary for the "register", "progress" and "end" events of the
+    callers, which contains the "event", "title", "current_step",
+    "max_steps", "time" and "elapsed" keys, to log the timings of the
+    callers.
     """
 
     __metaclass__ = Singleton
 
+    # the maximum number of dialog updates per second
+    max_refresh_rate = 20
+
     def __init__(self, parent=None):
         self.in_progress = False
         self.dialog = None
@@ -59,16 +120,68 @@ class ProgressDialogManager(object):
             # prevent resetting the use_ui to True
             self.use_ui = True
 
+        if not hasattr(self, '_lock'):
+            # keep them when the dialog is closed
+            self._lock = threading.RLock()
+            self._ui_thread_ident = threading.current_thread().ident
+            self._dialogs_to_close = []
+            self.event_handlers = []
+
         self.parent = parent
 
         self.title = ''
         self.max_steps = 0
         self.current_step = 0
 
+        self._last_refresh_time = 0
+        self._last_refreshed_caller = None
+        self._range_changed = False
+
+    def is_ui_thread(self):
+        """returns True if it is called from the thread that the dialog can be
+        updated from
+        """
+        return threading.current_thread().ident == self._ui_thread_ident
+
+    def add_event_handler(self, handler):
+        """adds the given function to the event handlers
+
+        :param handler: A callable accepting one dictionary argument.
+        """
+        if handler not in self.event_handlers:
+            self.event_handlers.append(handler)
+
+    def remove_event_handler(self, handler):
+        """removes the given function from the event handlers
+        """
+        if handler in self.event_handlers:
+            self.event_handlers.remove(handler)
+
+    def emit_event(self, event, caller):
+        """calls the event handlers with the data of the given caller
+
+        :param str event: The name of the event.
+        :param caller: A :class:`.ProgressCaller` instance.
+        """
+        if not self.event_handlers:
+            return
+
+        now = time.time()
+        data = {
+            'event': event,
+            'title': caller.full_title,
+            'current_step': caller.current_step,
+            'max_steps': caller.max_steps,
+            'time': now,
+            'elapsed': now - caller.start_time,
+        }
+        for handler in list(self.event_handlers):
+            handler(data)
+
     def create_dialog(self):
         """creates the progressWindow
         """
-        if self.use_ui:
+        if self.use_ui and self.is_ui_thread():
             if self.dialog is None:
                 self.dialog = \
                     QtGui.QProgressDialog(self.parent)
@@ -87,32 +200,52 @@ class ProgressDialogManager(object):
     def close(self):
         """kills the progressWindow
         """
-        if self.dialog is not None:
-            self.dialog.close()
-
-        # re initialize self
-        self.__init__()
-
-    def register(self, max_iteration, title=''):
+        with self._lock:
+            if self.dialog is not None:
+                if self.is_ui_thread():
+                    self.dialog.close()
+                else:
+                    # close it in the UI thread
+                    self._dialogs_to_close.append(self.dialog)
+
+            # re initialize self
+            self.__init__()
+
+    def register(self, max_iteration, title='', parent=None):
         """registers a new caller
 
+        :param int max_iteration: The number of steps of the caller.
+        :param str title: The title of the caller.
+        :param parent: A :class:`.ProgressCaller` instance, the new caller is
+          counted as one step of the parent caller.
         :return: ProgressCaller instance
         """
-        caller = ProgressCaller(max_steps=max_iteration, title=title)
+        caller = ProgressCaller(
+            max_steps=max_iteration, title=title, parent=parent
+        )
         caller.manager = self
-        self.max_steps += max_iteration
 
-        if self.use_ui:
-            if not self.in_progress:
-                self.create_dialog()
+        with self._lock:
+            if parent is None:
+                self.max_steps += max_iteration
+                self._range_changed = True
+
+            if self.use_ui:
+                if not self.in_progress:
+                    self.create_dialog()
+                elif self.dialog is not None and self.is_ui_thread():
+                    # update the maximum
+                    self.dialog.setRange(0, self.max_steps)
+                    self.dialog.setValue(int(self.get_progress()))
+                    self._range_changed = False
+                # self. center_window()
             else:
-                # update the maximum
-                self.dialog.setRange(0, self.max_steps)
-                self.dialog.setValue(self.current_step)
-            # self. center_window()
+                self.in_progress = True
 
-        # also store this
-        self.callers.append(caller)
+            # also store this
+            self.callers.append(caller)
+
+        self.emit_event('register', caller)
         return caller
 
     def center_window(self):
@@ -131,23 +264,92 @@ class ProgressDialogManager(object):
                 (desktop_rect.height() - size.height()) * 0.5 + desktop_rect.top()
             )
 
+    def get_progress(self):
+        """returns the total progress, the steps of the nested callers are
+        counted as fractions of the steps of their parents
+        """
+        with self._lock:
+            progress = self.current_step
+            for caller in self.callers:
+                if caller.parent is not None:
+                    progress += \
+                        min(caller.current_step, caller.max_steps) * \
+                        caller.step_weight
+            return progress
+
     def step(self, caller, step=1, message=''):
         """Increments the progress by the given mount
 
         :param caller: A :class:`.ProgressCaller` instance, generally returned
           by the :meth:`.register` method.
         :param step: The step size to increment, the default value is 1.
+        :param str message: The message to be shown in the dialog.
         """
-        caller.current_step += step
-        self.current_step += step
-        if self.dialog:
-            self.dialog.setValue(self.current_step)
-            self.dialog.setLabelText('%s : %s' % (caller.title, message))
-            # self.center_window()
+        with self._lock:
+            caller.current_step += step
+            if caller.parent is None:
+                self.current_step += step
+            completed = caller.current_step >= caller.max_steps
 
-        if caller.current_step >= caller.max_steps:
+        if completed:
             # kill the caller
             self.end_progress(caller)
+        else:
+            self.refresh(caller, message)
+
+    def refresh(self, caller=None, message='', force=False):
+        """Updates the dialog with the current progress. The dialog is not
+        updated if it has been updated in the last 1 / ``max_refresh_rate``
+        seconds for the same caller, unless ``force`` is True. It does nothing
+        if it is not called from the UI thread.
+
+        :param caller: The :class:`.ProgressCaller` to show the title of.
+        :param str message: The message to be shown in the dialog.
+        :param bool force: Update the dialog even if it has just been updated.
+        """
+        if not self.is_ui_thread():
+            return
+
+        # other threads can close the dialog in the mean time, so read
+        # everything under the lock and only use the local values
+        with self._lock:
+            dialogs_to_close = self._dialogs_to_close[:]
+            del self._dialogs_to_close[:]
+
+            dialog = None
+            if self.use_ui and self.in_progress:
+                now = time.time()
+                if force \
+                   or caller is not self._last_refreshed_caller \
+                   or now - self._last_refresh_time >= \
+                        1.0 / self.max_refresh_rate:
+                    self._last_refresh_time = now
+                    self._last_refreshed_caller = caller
+
+                    if self.dialog is None:
+                        # the callers are registered in another thread
+                        self.create_dialog()
+
+                    dialog = self.dialog
+                    max_steps = self.max_steps
+                    range_changed = self._range_changed
+                    self._range_changed = False
+                    progress = self.get_progress()
+
+        for closed_dialog in dialogs_to_close:
+            closed_dialog.close()
+
+        if dialog is None:
+            return
+
+        if range_changed:
+            dialog.setRange(0, max_steps)
+
+        dialog.setValue(int(progress))
+        if caller is not None:
+            dialog.setLabelText('%s : %s' % (caller.full_title, message))
+            # self.center_window()
+            self.emit_event('progress', caller)
 
         QtGui.qApp.processEvents()
 
@@ -157,14 +359,33 @@ class ProgressDialogManager(object):
         :param caller: A :class:`.ProgressCaller` instance
         :return: None
         """
-        # remove the caller from the callers list
-        if caller in self.callers:
-            self.callers.remove(caller)
-            # also reduce the max_steps counter
-            # in case of an early kill
-            steps_left = caller.max_steps - caller.current_step
-            if steps_left > 0:
-                self.max_steps -= steps_left
+        with self._lock:
+            # remove the caller from the callers list
+            if caller in self.callers:
+                self.callers.remove(caller)
+                # also reduce the max_steps counter
+                # in case of an early kill
+                steps_left = caller.max_steps - caller.current_step
+                if steps_left > 0 and caller.parent is None:
+                    self.max_steps -= steps_left
+                    self._range_changed = True
+
+                # the nested callers of this caller are also ended
+                for nested_caller in list(self.callers):
+                    parent = nested_caller.parent
+                    while parent is not None and parent is not caller:
+                        parent = parent.parent
+                    if parent is caller:
+                        self.callers.remove(nested_caller)
+
+                ended = True
+            else:
+                ended = False
+
+            close = len(self.callers) == 0
+
+        if ended:
+            self.emit_event('end', caller)
 
-        if len(self.callers) == 0:
+        if close:
             self.close()
@@ -6,7 +6,6 @@
 import logging
 
 from anima import logger
-from anima.env.mayaEnv import Maya
 from anima.utils import do_db_setup
 
 
@@ -27,6 +26,7 @@ def version_creator(logging_level=logging.WARNING):
 
     from anima.ui import version_creator, models
     from anima.env import mayaEnv
+    from anima.env.mayaEnv import Maya
     reload(version_creator)
     reload(models)
     reload(mayaEnv)
@@ -55,6 +55,7 @@ def version_updater(logging_level=logging.WARNING):
 
     from anima.ui import version_updater, models
     from anima.env import mayaEnv
+    from anima.env.mayaEnv import Maya
     reload(mayaEnv)
     reload(version_updater)
     reload(models)
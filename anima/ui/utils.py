@@ -7,6 +7,8 @@
 """
 import os
 import shutil
+import threading
+from collections import OrderedDict
 
 from anima import logger
 from anima.ui.lib import QtCore, QtGui
@@ -30,6 +32,10 @@ def clear_thumbnail(gview):
     if not gview:
         return
 
+    # do not show the image of a previous request
+    if ThumbnailService._instance is not None:
+        ThumbnailService._instance.cancel(gview)
+
     # clear the graphics scene in case there is no thumbnail
     scene = gview.scene()
     if not scene:
@@ -40,7 +46,8 @@ def clear_thumbnail(gview):
 
 
 def update_gview_with_task_thumbnail(task, gview):
-    """Updates the given QGraphicsView with the given Task thumbnail
+    """Updates the given QGraphicsView with the given Task thumbnail, if the
+    task doesn't have a thumbnail the thumbnail of the closest parent is used.
 
     :param task: A
       :class:`~stalker.models.task.Task` instance
@@ -55,39 +62,18 @@ def update_gview_with_task_thumbnail(task, gview):
         logger.debug('task is not a stalker.models.task.Task instance')
         return
 
-    # get the thumbnail full path
-    full_path = None
-    if task.thumbnail:
-        # use the cache system to get the thumbnail
-        # try to get it as a normal file
-        full_path = os.path.expandvars(
-            task.thumbnail.full_path
-        )
-        if not os.path.exists(full_path):
-            full_path = None
-    else:
-        logger.debug('there is no thumbnail')
-        # try to get the thumbnail from parents
-        for parent in reversed(task.parents):
-            if parent.thumbnail:
-                # try to get it as a normal file
-                full_path = os.path.expandvars(
-                    parent.thumbnail.full_path
-                )
-                if not os.path.exists(full_path):
-                    full_path = None
-                logger.debug('found parent thumbnail at: %s' % full_path)
-                break
-
+    service = ThumbnailService.instance()
+    full_path = service.get_task_thumbnail_path(task)
     if full_path:
-        update_gview_with_image_file(
-            full_path,
-            gview
-        )
+        service.request(full_path, gview)
+    else:
+        # the image of the previously selected task is still loading
+        service.cancel(gview)
 
 
 def update_gview_with_image_file(image_full_path, gview):
-    """updates the QGraphicsView with the given image
+    """updates the QGraphicsView with the given image, the image is loaded
+    and scaled in a background thread by the :class:`.ThumbnailService`
     """
 
     if not isinstance(gview, QtGui.QGraphicsView):
@@ -96,29 +82,324 @@ def update_gview_with_image_file(image_full_path, gview):
     clear_thumbnail(gview)
 
     if image_full_path != "":
-        image_full_path = os.path.normpath(image_full_path)
-        image_format = os.path.splitext(image_full_path)[-1].replace('.', '').upper()
-        logger.debug("creating pixmap from: %s" % image_full_path)
+        ThumbnailService.instance().request(image_full_path, gview)
 
-        # size = conf.thumbnail_size
-        # width = size[0]
-        # height = size[1]
-        size = gview.size()
-        width = size.width()
-        height = size.height()
-        logger.debug('width: %s' % width)
-        logger.debug('height: %s' % height)
 
-        if os.path.exists(image_full_path):
-            pixmap = QtGui.QPixmap(image_full_path, format=image_format).scaled(
-                width, height,
-                QtCore.Qt.KeepAspectRatio,
-                QtCore.Qt.SmoothTransformation
-            )
-            # pixmap = QtGui.QPixmap(image_full_path, format='JPG')
+def get_thumbnail_cache_path(image_full_path, width, height):
+    """Returns the path of the cached scaled version of the given image in
+    the ``anima.local_cache_folder``. The path is keyed by the path, the
+    modification time and the size of the image file, so an updated image
+    gets a new cache file.
+
+    :param str image_full_path: The path of the original image.
+    :param int width: The width of the scaled image.
+    :param int height: The height of the scaled image.
+    :return: str or None if the image does not exist
+    """
+    import hashlib
+    import anima
+
+    image_full_path = os.path.normpath(image_full_path)
+    try:
+        stat = os.stat(image_full_path)
+    except OSError:
+        return None
+
+    key = '%s|%s|%s|%sx%s' % (
+        image_full_path, stat.st_mtime, stat.st_size, width, height
+    )
+    if not isinstance(key, bytes):
+        key = key.encode('utf-8')
+    key = hashlib.md5(key).hexdigest()
+
+    return os.path.join(
+        os.path.expanduser(anima.local_cache_folder),
+        anima.thumbnail_cache_folder_name,
+        key[:2],
+        '%s.png' % key
+    )
+
+
+def load_scaled_image(image_full_path, width, height):
+    """Returns a QImage of the given image scaled to fit in the given size.
+    The scaled image is cached on disk, so the full resolution image is
+    decoded only once.
+
+    It only uses QImage, so it is safe to call it outside the UI thread.
+
+    :param str image_full_path: The path of the original image.
+    :param int width: The maximum width of the image.
+    :param int height: The maximum height of the image.
+    :return: QtGui.QImage or None if the image can not be read
+    """
+    import tempfile
+
+    cache_path = get_thumbnail_cache_path(image_full_path, width, height)
+    if cache_path is None:
+        return None
+
+    if os.path.exists(cache_path):
+        image = QtGui.QImage(cache_path)
+        if not image.isNull():
+            return image
+
+    logger.debug('creating thumbnail from: %s' % image_full_path)
+    image = QtGui.QImage(os.path.normpath(image_full_path))
+    if image.isNull():
+        return None
+
+    image = image.scaled(
+        width, height,
+        QtCore.Qt.KeepAspectRatio,
+        QtCore.Qt.SmoothTransformation
+    )
+
+    # write it to a temp file and rename it, so the other processes never
+    # read a half written thumbnail
+    cache_folder = os.path.dirname(cache_path)
+    try:
+        os.makedirs(cache_folder)
+    except OSError:
+        # already exists
+        pass
+
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=cache_folder, suffix='.png')
+        os.close(fd)
+        if image.save(temp_path, 'PNG'):
+            replace = getattr(os, 'replace', None)
+            if replace is not None:
+                replace(temp_path, cache_path)
+            else:
+                try:
+                    os.rename(temp_path, cache_path)
+                except OSError:
+                    # on Windows the target should not exist
+                    os.remove(cache_path)
+                    os.rename(temp_path, cache_path)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    except (IOError, OSError) as e:
+        # the thumbnail is still usable without the cache
+        logger.debug('could not cache thumbnail %s: %s' % (cache_path, e))
+
+    return image
+
+
+class ThumbnailService(QtCore.QObject):
+    """Loads the thumbnails for the QGraphicsViews.
+
+    The images are decoded and scaled in a background thread with
+    :func:`.load_scaled_image` and converted to QPixmaps in the UI thread,
+    the last ``memory_cache_size`` QPixmaps are kept in memory. Only the last
+    requested image is shown in a QGraphicsView, so quickly changing the
+    selected task doesn't pile up the loads.
+
+    The thumbnail paths of the tasks, including the ones inherited from the
+    parents, are cached in the ``task_thumbnail_paths`` dictionary, call
+    :meth:`.clear_task_thumbnail_paths` after a thumbnail is changed.
+
+    :param int memory_cache_size: The number of the QPixmaps kept in memory.
+      The default is ``anima.thumbnail_memory_cache_size``.
+    """
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, parent=None, memory_cache_size=None):
+        super(ThumbnailService, self).__init__(parent)
+        import anima
+        if memory_cache_size is None:
+            memory_cache_size = anima.thumbnail_memory_cache_size
+        self.memory_cache_size = max(1, memory_cache_size)
+
+        # (path, mtime, file size, width, height): QPixmap
+        self.pixmaps = OrderedDict()
+        # task id: thumbnail full path or None
+        self.task_thumbnail_paths = {}
+
+        # id(gview): (gview, key) of the last request
+        self._requests = {}
+        self._queue = []
+        self._condition = threading.Condition()
+        self._busy = False
+        self._thread = None
+        self._results = []
+        self._results_lock = threading.Lock()
+
+        QtCore.QObject.connect(
+            self,
+            QtCore.SIGNAL('imagesLoaded()'),
+            self.images_loaded
+        )
+
+    @classmethod
+    def instance(cls):
+        """returns the process wide ThumbnailService instance
+        """
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def get_task_thumbnail_path(self, task):
+        """returns the thumbnail full path of the given task, or the
+        thumbnail of the closest parent if the task doesn't have one
+
+        :param task: A :class:`~stalker.models.task.Task` instance
+        :return: str or None
+        """
+        if task is None:
+            return None
+
+        try:
+            return self.task_thumbnail_paths[task.id]
+        except KeyError:
+            pass
+
+        if task.thumbnail:
+            full_path = os.path.expandvars(task.thumbnail.full_path)
+        else:
+            # the parents are resolved once and are also cached
+            full_path = self.get_task_thumbnail_path(task.parent)
+
+        self.task_thumbnail_paths[task.id] = full_path
+        return full_path
+
+    def clear_task_thumbnail_paths(self):
+        """clears the cached task thumbnail paths
+        """
+        self.task_thumbnail_paths = {}
+
+    def request(self, image_full_path, gview):
+        """shows the given image in the given QGraphicsView, the image is
+        loaded in the background if it is not in the memory cache
 
-            scene = gview.scene()
-            scene.addPixmap(pixmap)
+        :param str image_full_path: The path of the image.
+        :param gview: A QtGui.QGraphicsView instance
+        """
+        size = gview.size()
+        image_full_path = os.path.normpath(image_full_path)
+        try:
+            stat = os.stat(image_full_path)
+            mtime, file_size = stat.st_mtime, stat.st_size
+        except OSError:
+            mtime, file_size = None, None
+        # an overwritten image gets a new key, as in the disk cache
+        key = (image_full_path, mtime, file_size, size.width(), size.height())
+        gview_id = id(gview)
+
+        pixmap = self.pixmaps.get(key)
+        if pixmap is not None:
+            # mark it as the most recently used one
+            del self.pixmaps[key]
+            self.pixmaps[key] = pixmap
+            self._requests.pop(gview_id, None)
+            self.show_pixmap(gview, pixmap)
+            return
+
+        self._requests[gview_id] = (gview, key)
+        with self._condition:
+            # the last request of a gview wins
+            self._queue = [
+                item for item in self._queue if item[0] != gview_id
+            ]
+            self._queue.append((gview_id, key))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify_all()
+
+    def cancel(self, gview):
+        """cancels the pending request of the given QGraphicsView, so the
+        image is not shown when it is loaded
+
+        :param gview: A QtGui.QGraphicsView instance
+        """
+        gview_id = id(gview)
+        self._requests.pop(gview_id, None)
+        with self._condition:
+            self._queue = [
+                item for item in self._queue if item[0] != gview_id
+            ]
+
+    def wait(self):
+        """blocks until all the queued images are loaded
+        """
+        with self._condition:
+            while self._queue or self._busy:
+                self._condition.wait()
+
+    def _run(self):
+        """the worker loop
+        """
+        while True:
+            with self._condition:
+                if not self._queue:
+                    self._thread = None
+                    self._condition.notify_all()
+                    return
+                gview_id, key = self._queue.pop(0)
+                self._busy = True
+
+            image = None
+            try:
+                image = load_scaled_image(key[0], key[3], key[4])
+            except (IOError, OSError) as e:
+                logger.debug('could not load thumbnail %s: %s' % (key[0], e))
+            finally:
+                with self._results_lock:
+                    self._results.append((gview_id, key, image))
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+
+            # delivered in the UI thread
+            self.emit(QtCore.SIGNAL('imagesLoaded()'))
+
+    def images_loaded(self):
+        """converts the loaded images to QPixmaps and shows them in the
+        QGraphicsViews that are still waiting for them
+        """
+        with self._results_lock:
+            results = self._results
+            self._results = []
+
+        for gview_id, key, image in results:
+            request = self._requests.get(gview_id)
+            if request is not None and request[1] == key:
+                del self._requests[gview_id]
+            else:
+                # another image is requested in the mean time
+                request = None
+
+            if image is None:
+                continue
+
+            pixmap = self.pixmaps.get(key)
+            if pixmap is None:
+                pixmap = QtGui.QPixmap.fromImage(image)
+                self.pixmaps[key] = pixmap
+                while len(self.pixmaps) > self.memory_cache_size:
+                    self.pixmaps.popitem(last=False)
+
+            if request is not None:
+                self.show_pixmap(request[0], pixmap)
+
+    @classmethod
+    def show_pixmap(cls, gview, pixmap):
+        """shows the given QPixmap in the given QGraphicsView
+
+        :param gview: A QtGui.QGraphicsView instance
+        :param pixmap: A QtGui.QPixmap instance
+        """
+        try:
+            clear_thumbnail(gview)
+            gview.scene().addPixmap(pixmap)
+        except RuntimeError:
+            # the gview is deleted
+            pass
 
 
 def upload_thumbnail(task, thumbnail_full_path):
@@ -130,13 +411,27 @@ def upload_thumbnail(task, thumbnail_full_path):
     :param str thumbnail_full_path: A string which is showing the path
       of the thumbnail image
     """
+    thumbnail_final_full_path = \
+        copy_thumbnail_file(task.absolute_path, thumbnail_full_path)
+    link_thumbnail(task, thumbnail_final_full_path)
+
+
+def copy_thumbnail_file(task_absolute_path, thumbnail_full_path):
+    """Copies the given thumbnail to the thumbnail folder of the task. It
+    doesn't touch the database, so it is safe to call it outside the UI
+    thread.
+
+    :param str task_absolute_path: The absolute path of the task.
+    :param str thumbnail_full_path: The path of the thumbnail image.
+    :return: str, the path of the copied thumbnail
+    """
     extension = os.path.splitext(thumbnail_full_path)[-1]
 
     # move the file to the task thumbnail folder
     # and mimic StalkerPyramids output format
     thumbnail_original_file_name = 'thumbnail%s' % extension
     thumbnail_final_full_path = os.path.join(
-        task.absolute_path, 'Thumbnail', thumbnail_original_file_name
+        task_absolute_path, 'Thumbnail', thumbnail_original_file_name
     )
 
     try:
@@ -145,9 +440,20 @@ def upload_thumbnail(task, thumbnail_full_path):
         pass
 
     shutil.copy(thumbnail_full_path, thumbnail_final_full_path)
+    return thumbnail_final_full_path
 
+
+def link_thumbnail(task, thumbnail_final_full_path):
+    """Sets the thumbnail of the given task, and the naming parents that
+    don't have a thumbnail, to the given already copied thumbnail.
+
+    :param task: An instance of :class:`~stalker.models.entity.SimpleEntity`
+      or a derivative.
+    :param str thumbnail_final_full_path: The path of the copied thumbnail.
+    """
     from stalker import db, Link, Version, Repository
 
+    thumbnail_original_file_name = os.path.basename(thumbnail_final_full_path)
     thumbnail_os_independent_path = \
         Repository.to_os_independent_path(thumbnail_final_full_path)
     l_thumb = Link.query\
@@ -172,6 +478,9 @@ def upload_thumbnail(task, thumbnail_full_path):
     db.DBSession.add(l_thumb)
     db.DBSession.commit()
 
+    # the inherited thumbnails may have changed
+    ThumbnailService.instance().clear_task_thumbnail_paths()
+
 
 def choose_thumbnail(parent):
     """shows a dialog for thumbnail upload
@@ -189,6 +498,201 @@ def choose_thumbnail(parent):
     return thumbnail_full_path
 
 
+class FileCopierThread(QtCore.QThread):
+    """Runs a :class:`anima.utils.FileCopier` outside of the UI thread.
+
+    The progress is reported through the ``progress(int, int)`` signal with
+    the copied and total sizes in kilobytes (to not to overflow the int type
+    with multi-GB files). Connect to the ``finished()`` signal to get notified
+    when the copy operation is done, the errors can be reached through the
+    ``file_copier.errors`` attribute.
+
+    :param file_copier: An :class:`anima.utils.FileCopier` instance.
+    """
+
+    def __init__(self, file_copier, parent=None):
+        super(FileCopierThread, self).__init__(parent)
+        self.file_copier = file_copier
+        self.file_copier.progress_callback = self.emit_progress
+        self._last_reported_value = -1
+        self._lock = threading.Lock()
+
+    def emit_progress(self, copied_bytes, total_bytes):
+        """emits the progress signal, called from the worker threads of the
+        FileCopier instance
+        """
+        copied_kbytes = int(copied_bytes / 1024)
+        with self._lock:
+            # do not flood the event loop with the same or an older value
+            if copied_kbytes <= self._last_reported_value:
+                return
+            self._last_reported_value = copied_kbytes
+
+        self.emit(
+            QtCore.SIGNAL('progress(int, int)'),
+            copied_kbytes,
+            int(total_bytes / 1024)
+        )
+
+    def cancel(self):
+        """cancels the copy operation
+        """
+        self.file_copier.cancel()
+
+    def run(self):
+        """copies the files
+        """
+        with self._lock:
+            self._last_reported_value = -1
+        self.file_copier.run()
+
+
+class MainThreadDispatcher(QtCore.QObject):
+    """Calls functions in the thread that this dispatcher is created in,
+    which is the UI thread.
+
+    The DCC APIs, the database session and the widgets can only be used in
+    the UI thread, the worker threads use :meth:`.call` to run them there
+    through a queued signal.
+    """
+
+    def __init__(self, parent=None):
+        super(MainThreadDispatcher, self).__init__(parent)
+        self._thread_ident = threading.current_thread().ident
+        self._calls = []
+        self._lock = threading.Lock()
+
+        QtCore.QObject.connect(
+            self,
+            QtCore.SIGNAL('dispatch()'),
+            self.dispatch
+        )
+
+    def call(self, func, *args, **kwargs):
+        """calls the given function in the UI thread, waits for it and
+        returns its result, the exception raised by the function is raised
+        again in the calling thread
+
+        :param func: A callable.
+        :return: The return value of the function.
+        """
+        if threading.current_thread().ident == self._thread_ident:
+            return func(*args, **kwargs)
+
+        # func, args, kwargs, done event, result, exception
+        call = [func, args, kwargs, threading.Event(), None, None]
+        with self._lock:
+            self._calls.append(call)
+        self.emit(QtCore.SIGNAL('dispatch()'))
+
+        call[3].wait()
+        if call[5] is not None:
+            raise call[5]
+        return call[4]
+
+    def dispatch(self):
+        """runs the waiting calls, it is called in the UI thread
+        """
+        with self._lock:
+            calls = self._calls
+            self._calls = []
+
+        for call in calls:
+            func, args, kwargs, event = call[:4]
+            try:
+                call[4] = func(*args, **kwargs)
+            except Exception as e:
+                call[5] = e
+            finally:
+                event.set()
+
+
+class StagedJobThread(QtCore.QThread):
+    """Runs the stages of a job one after the other in a worker thread.
+
+    A stage is a (label, function, in_main_thread[, cancellable]) tuple. The
+    functions are
+    called with a ``context`` dictionary that is shared between the stages,
+    to pass the results from one stage to the other. The stages with
+    ``in_main_thread`` set to True are called in the UI thread through a
+    :class:`.MainThreadDispatcher`, so the DCC APIs and the database session
+    are only used in the UI thread, the others run in the worker thread to
+    not to block the UI with the file system work.
+
+    The ``progress(int, int)`` signal is emitted with the index of the
+    starting stage and the stage count, the label of the stage is in the
+    ``label`` attribute. Connect to the ``finished()`` signal to get notified
+    when the job is done. The exception of a failing stage is stored in the
+    ``error`` attribute and the remaining stages are skipped, the same is
+    done when :meth:`.cancel` is called. The stages with ``cancellable`` set
+    to False are run even if the job is cancelled, use it for the stages that
+    must follow a stage with side effects (like committing the database after
+    a file is saved).
+
+    Do not call ``wait()`` from the UI thread, the UI thread stages can not
+    run while it is blocked.
+
+    :param list stages: A list of (label, function, in_main_thread) or
+      (label, function, in_main_thread, cancellable) tuples.
+    :param dict context: The initial context.
+    """
+
+    def __init__(self, stages, context=None, parent=None):
+        super(StagedJobThread, self).__init__(parent)
+        self.stages = list(stages)
+        if context is None:
+            context = {}
+        self.context = context
+        self.label = ''
+        self.error = None
+        self.completed_stages = []
+        self._cancelled = False
+        self._skipped = False
+        self.dispatcher = MainThreadDispatcher()
+
+    def cancel(self):
+        """skips the stages that are not started yet
+        """
+        self._cancelled = True
+
+    @property
+    def cancelled(self):
+        """returns True if the job has been cancelled and some of the stages
+        are skipped
+        """
+        return self._skipped
+
+    def run(self):
+        """runs the stages
+        """
+        stage_count = len(self.stages)
+        for i, stage in enumerate(self.stages):
+            label, func, in_main_thread = stage[:3]
+            cancellable = stage[3] if len(stage) > 3 else True
+            if self._cancelled and cancellable:
+                self._skipped = True
+                break
+
+            self.label = label
+            self.emit(QtCore.SIGNAL('progress(int, int)'), i, stage_count)
+            try:
+                if in_main_thread:
+                    self.dispatcher.call(func, self.context)
+                else:
+                    func(self.context)
+            except Exception as e:
+                logger.debug('stage "%s" failed: %s' % (label, e))
+                self.error = e
+                break
+            self.completed_stages.append(label)
+
+        self.emit(
+            QtCore.SIGNAL('progress(int, int)'),
+            len(self.completed_stages),
+            stage_count
+        )
+
+
 def render_image_from_gview(gview, image_full_path):
     """renders the gview scene to an image at the given full path
     """
@@ -4,27 +4,27 @@
 # This module is part of anima-tools and is released under the BSD 2
 # License: http://www.opensource.org/licenses/BSD-2-Clause
 
-import logging
 import datetime
+import logging
 
 import os
 
 from sqlalchemy import distinct
 from stalker.db import DBSession
-from stalker import (defaults, Version, Project, Task, LocalSession, Group)
+from stalker import (Version, Project, Task, LocalSession, Group)
 
 import anima
 from anima import utils, logger, power_users_group_names
 from anima.env.base import EnvironmentBase
-from anima.env.external import ExternalEnvFactory
-from anima.exc import PublishError
+from anima.env.external import ExternalEnv, ExternalEnvFactory
 from anima.recent import RecentFileManager
 from anima.repr import Representation
 from anima.ui import utils as ui_utils
 from anima.ui.base import AnimaDialogBase, ui_caller
-from anima.ui import (IS_PYSIDE, IS_PYQT4, version_updater)
+from anima.ui import IS_PYSIDE, IS_PYQT4
 from anima.ui.lib import QtGui, QtCore
-from anima.ui.models import TaskTreeModel, TakesListWidget
+from anima.ui.models import (TaskTreeModel, TakesListWidget,
+                              VersionTableModel)
 
 
 if IS_PYSIDE():
@@ -50,27 +50,25 @@ class RecentFilesComboBox(QtGui.QComboBox):
         super(RecentFilesComboBox, self).showPopup(*args, **kwargs)
 
 
-class VersionsTableWidget(QtGui.QTableWidget):
-    """A QTableWidget derivative specialized to hold version data
+class VersionsTableWidget(QtGui.QTableView):
+    """A QTableView derivative specialized to hold version data.
+
+    The versions are shown with a :class:`.VersionTableModel`, which loads
+    them in pages. Scrolling to the top of the table loads the older
+    versions. It keeps the ``QTableWidget`` like interface (``item()``,
+    ``itemAt()``, ``rowCount()``, ``cellDoubleClicked(int,int)``) that the
+    UI is using.
     """
 
     def __init__(self, parent=None, *args, **kwargs):
-        QtGui.QTableWidget.__init__(self, parent, *args, **kwargs)
+        QtGui.QTableView.__init__(self, parent, *args, **kwargs)
 
         self.setEditTriggers(QtGui.QAbstractItemView.NoEditTriggers)
         self.setAlternatingRowColors(True)
         self.setSelectionMode(QtGui.QAbstractItemView.SingleSelection)
         self.setSelectionBehavior(QtGui.QAbstractItemView.SelectRows)
         self.setShowGrid(False)
-        self.setColumnCount(5)
         self.setObjectName("previous_versions_tableWidget")
-        self.setColumnCount(5)
-        self.setRowCount(0)
-        self.setHorizontalHeaderItem(0, QtGui.QTableWidgetItem())
-        self.setHorizontalHeaderItem(1, QtGui.QTableWidgetItem())
-        self.setHorizontalHeaderItem(2, QtGui.QTableWidgetItem())
-        self.setHorizontalHeaderItem(3, QtGui.QTableWidgetItem())
-        self.setHorizontalHeaderItem(4, QtGui.QTableWidgetItem())
         self.horizontalHeader().setStretchLastSection(True)
         self.verticalHeader().setStretchLastSection(False)
 
@@ -94,204 +92,119 @@ class VersionsTableWidget(QtGui.QTableWidget):
             )
         )
 
-        self.versions = []
-        self.labels = [
-            '#',
-            'App',
-            'Created By',
-            'Updated By',
-            'Size',
-            'Date',
-            'Description',
-        ]
-        self.setColumnCount(len(self.labels))
+        self.setModel(VersionTableModel(self))
+
+        QtCore.QObject.connect(
+            self,
+            QtCore.SIGNAL('doubleClicked(QModelIndex)'),
+            self._double_clicked
+        )
+
+        QtCore.QObject.connect(
+            self.verticalScrollBar(),
+            QtCore.SIGNAL('valueChanged(int)'),
+            self._scrolled
+        )
+
+    def _double_clicked(self, index):
+        """emits the cellDoubleClicked(int,int) signal
+        """
+        self.emit(
+            QtCore.SIGNAL('cellDoubleClicked(int,int)'),
+            index.row(),
+            index.column()
+        )
+
+    def _scrolled(self, value):
+        """loads the older versions when the table is scrolled to the top
+        """
+        scroll_bar = self.verticalScrollBar()
+        model = self.model()
+        if value != scroll_bar.minimum() or not model.can_fetch_older():
+            return
+
+        # keep the rows that were visible at the same place
+        old_maximum = scroll_bar.maximum()
+        if model.fetch_older():
+            self.resizeRowsToContents()
+            scroll_bar.setValue(scroll_bar.maximum() - old_maximum)
 
     def clear(self):
-        """overridden clear method
+        """removes all the versions
+        """
+        self.model().clear()
+
+    def clear_cache(self):
+        """clears the cached versions, call it after changing a version
         """
-        QtGui.QTableWidget.clear(self)
-        self.versions = []
+        self.model().clear_cache()
 
-        # reset the labels
-        self.setHorizontalHeaderLabels(self.labels)
+    def rowCount(self):
+        """returns the number of loaded versions
+        """
+        return self.model().rowCount()
+
+    def item(self, row, column):
+        """returns the item at the given row and column
+        """
+        return self.model().item(row, column)
+
+    def itemAt(self, position):
+        """returns the item at the given position
+        """
+        index = self.indexAt(position)
+        if index.isValid():
+            return self.model().item(index.row(), index.column())
+
+    def currentRow(self):
+        """returns the current row
+        """
+        return self.currentIndex().row()
+
+    def version_at(self, row):
+        """returns the version at the given row
+        """
+        return self.model().get_version(row)
 
     def select_version(self, version):
         """selects the given version in the list
         """
         # select the version in the previous version list
-        index = -1
-        for i, prev_version in enumerate(self.versions):
-            if self.versions[i] == version:
-                index = i
-                break
+        index = self.model().row_of_version(version)
 
         logger.debug('current index: %s' % index)
 
         # select the row
         if index != -1:
-            item = self.item(index, 0)
-            logger.debug('item : %s' % item)
-            self.setCurrentItem(item)
+            self.selectRow(index)
 
     @property
     def current_version(self):
         """returns the current selected version from the table
         """
-        index = self.currentRow()
-        try:
-            version = self.versions[index]
-            return version
-        except IndexError:
-            return None
+        return self.version_at(self.currentRow())
+
+    def update_content(self, task_id, take_name, published_only=False,
+                       count=25):
+        """updates the content with the versions of the given task and take
 
-    def update_content(self, versions):
-        """updates the content with the given versions data
+        :param int task_id: The id of the task.
+        :param str take_name: The take name.
+        :param bool published_only: Show only the published versions.
+        :param int count: The number of versions to be loaded at once.
         """
         logger.debug('VersionsTableWidget.update_content() is started')
 
-        self.clear()
-        self.versions = versions
-        self.setRowCount(len(versions))
-
-        def set_font(item):
-            """sets the font for the given item
-
-            :param item: the a QTableWidgetItem
-            """
-            my_font = item.font()
-            my_font.setBold(True)
-
-            item.setFont(my_font)
-
-            foreground = item.foreground()
-            foreground.setColor(QtGui.QColor(0, 192, 0))
-            item.setForeground(foreground)
-
-        # update the previous versions list
-        for i, version in enumerate(versions):
-            is_published = version.is_published
-
-            c = 0
-
-            # ------------------------------------
-            # version_number
-            item = QtGui.QTableWidgetItem(str(version.version_number))
-            # align to center and vertical center
-            item.setTextAlignment(0x0004 | 0x0080)
-
-            if is_published:
-                set_font(item)
-
-            self.setItem(i, c, item)
-            c += 1
-            # ------------------------------------
-
-            # ------------------------------------
-            # created_with
-            item = QtGui.QTableWidgetItem()
-            if version.created_with:
-                item.setIcon(ui_utils.get_icon(version.created_with.lower()))
-
-            if is_published:
-                set_font(item)
-            self.setItem(i, c, item)
-            c += 1
-            # ------------------------------------
-
-            # ------------------------------------
-            # user.name
-            created_by = ''
-            if version.created_by:
-                created_by = version.created_by.name
-            item = QtGui.QTableWidgetItem(created_by)
-            # align to left and vertical center
-            item.setTextAlignment(0x0001 | 0x0080)
-
-            if is_published:
-                set_font(item)
-
-            self.setItem(i, c, item)
-            c += 1
-            # ------------------------------------
-
-            # ------------------------------------
-            # user.name
-            updated_by = ''
-            if version.updated_by:
-                updated_by = version.updated_by.name
-            item = QtGui.QTableWidgetItem(updated_by)
-            # align to left and vertical center
-            item.setTextAlignment(0x0001 | 0x0080)
-
-            if is_published:
-                set_font(item)
-
-            self.setItem(i, c, item)
-            c += 1
-            # ------------------------------------
-
-            # ------------------------------------
-            # file size
-
-            # get the file size
-            #file_size_format = "%.2f MB"
-            file_size = -1
-            if os.path.exists(version.absolute_full_path):
-                file_size = float(
-                    os.path.getsize(version.absolute_full_path)) / 1048576
-
-            item = QtGui.QTableWidgetItem(
-                defaults.file_size_format % file_size)
-            # align to left and vertical center
-            item.setTextAlignment(0x0001 | 0x0080)
-
-            if is_published:
-                set_font(item)
-
-            self.setItem(i, c, item)
-            c += 1
-            # ------------------------------------
-
-            # ------------------------------------
-            # date
-
-            # get the file date
-            file_date = datetime.datetime.today()
-            if os.path.exists(version.absolute_full_path):
-                file_date = datetime.datetime.fromtimestamp(
-                    os.path.getmtime(version.absolute_full_path)
-                )
-            item = QtGui.QTableWidgetItem(
-                file_date.strftime(defaults.date_time_format)
-            )
-
-            # align to left and vertical center
-            item.setTextAlignment(0x0001 | 0x0080)
-
-            if is_published:
-                set_font(item)
+        model = self.model()
+        model.page_size = max(1, count)
+        model.load(task_id, take_name, published_only)
 
-            self.setItem(i, c, item)
-            c += 1
-            # ------------------------------------
-
-            # ------------------------------------
-            # description
-            item = QtGui.QTableWidgetItem(version.description)
-            # align to left and vertical center
-            item.setTextAlignment(0x0001 | 0x0080)
-
-            if is_published:
-                set_font(item)
-
-            self.setItem(i, c, item)
-            c += 1
-            # ------------------------------------
-
-        # resize the first column
         self.resizeRowsToContents()
         self.resizeColumnsToContents()
         self.resizeRowsToContents()
+
+        # show the latest versions
+        self.scrollToBottom()
         logger.debug('VersionsTableWidget.update_content() is finished')
 
 
@@ -400,6 +313,7 @@ class MainDialog(QtGui.QDialog, version_creator_UI.Ui_Dialog, AnimaDialogBase):
 
         # create the project attribute in projects_comboBox
         self.current_dialog = None
+        self.job_thread = None
 
         # remove recent files comboBox and create a new one
         layout = self.horizontalLayout_8
@@ -658,7 +572,7 @@ class MainDialog(QtGui.QDialog, version_creator_UI.Ui_Dialog, AnimaDialogBase):
             return
 
         index = item.row()
-        version = self.previous_versions_tableWidget.versions[index]
+        version = self.previous_versions_tableWidget.version_at(index)
 
         # create the menu
         menu = QtGui.QMenu()
@@ -711,9 +625,12 @@ class MainDialog(QtGui.QDialog, version_creator_UI.Ui_Dialog, AnimaDialogBase):
                     # publish it
                     version.is_published = True
                     version.updated_by = logged_in_user
+                    version.date_updated = \
+                        datetime.datetime.now(version.date_created.tzinfo)
                     DBSession.add(version)
                     DBSession.commit()
                     # refresh the tableWidget
+                    self.previous_versions_tableWidget.clear_cache()
                     self.update_previous_versions_tableWidget()
                     return
                 elif choice == "Un-Publish":
@@ -762,9 +679,12 @@ class MainDialog(QtGui.QDialog, version_creator_UI.Ui_Dialog, AnimaDialogBase):
 
                     version.is_published = False
                     version.updated_by = logged_in_user
+                    version.date_updated = \
+                        datetime.datetime.now(version.date_created.tzinfo)
                     DBSession.add(version)
                     DBSession.commit()
                     # refresh the tableWidget
+                    self.previous_versions_tableWidget.clear_cache()
                     self.update_previous_versions_tableWidget()
                     return
 
@@ -819,11 +739,15 @@ class MainDialog(QtGui.QDialog, version_creator_UI.Ui_Dialog, AnimaDialogBase):
                     if ok:
                         # change the description of the version
                         version.description = new_description
+                        version.date_updated = datetime.datetime.now(
+                            version.date_created.tzinfo
+                        )
 
                         DBSession.add(version)
                         DBSession.commit()
 
                         # update the previous_versions_tableWidget
+                        self.previous_versions_tableWidget.clear_cache()
                         self.update_previous_versions_tableWidget()
             elif choice == 'Copy Path':
                 # just set the clipboard to the version.absolute_full_path
@@ -888,7 +812,7 @@ class MainDialog(QtGui.QDialog, version_creator_UI.Ui_Dialog, AnimaDialogBase):
                 import webbrowser
                 webbrowser.open(
                     '%s/tasks/%s/view' % (
-                        anima.stalker_server_internal_address,
+                        anima.get_stalker_server_address(),
                         task.id
                     )
                 )
@@ -1403,23 +1327,15 @@ class MainDialog(QtGui.QDialog, version_creator_UI.Ui_Dialog, AnimaDialogBase):
         else:
             return
 
-        # query the Versions of this type and take
-        query = Version.query \
-            .filter(Version.task == task) \
-            .filter(Version.take_name == take_name)
-
-        # get the published only
-        if self.show_published_only_checkBox.isChecked():
-            query = query.filter(Version.is_published == True)
-
-        # show how many
+        # the versions are loaded in pages of this many versions
         count = self.version_count_spinBox.value()
 
-        versions = query.order_by(Version.version_number.desc()) \
-            .limit(count).all()
-        versions.reverse()
-
-        self.previous_versions_tableWidget.update_content(versions)
+        self.previous_versions_tableWidget.update_content(
+            task.id,
+            take_name,
+            published_only=self.show_published_only_checkBox.isChecked(),
+            count=count
+        )
         logger.debug('update_previous_versions_tableWidget is finished')
 
     def get_task(self):
@@ -1610,67 +1526,123 @@ class MainDialog(QtGui.QDialog, version_creator_UI.Ui_Dialog, AnimaDialogBase):
                         # no, just return
                         return
 
-        try:
+        def prepare(context):
+            """renders the paths of the new version, the templates are read
+            from the database so it is done in the UI thread
+            """
+            extension = new_version.extension
+            new_version.update_paths()
+            new_version.extension = extension
+
+            folder_paths = [os.path.normpath(new_version.absolute_path)]
+            if is_external_env:
+                folder_paths.extend(
+                    os.path.normpath(
+                        os.path.join(new_version.absolute_path, folder)
+                    )
+                    for folder in environment.structure
+                )
+            context['folder_paths'] = folder_paths
+
+        def create_folders(context):
+            """creates the folders of the new version before the environment
+            saves the file, the file server can be slow so it is done in the
+            worker thread
+            """
+            ExternalEnv.create_folders(context['folder_paths'])
+
+        def save(context):
+            """saves the new version in the environment
+            """
             environment.save_as(new_version)
-        except (RuntimeError, PublishError) as e:
-            try:
-                error_message = '%s' % e
-            except UnicodeEncodeError:
-                error_message = unicode(e)
+            context['full_path'] = new_version.absolute_full_path
 
-            print(error_message)
-            QtGui.QMessageBox.critical(
-                self,
-                'Error',
-                error_message
-            )
+        def check_file(context):
+            """checks if the file is created, the file server can be slow so
+            it is done in the worker thread
+            """
+            context['file_exists'] = os.path.exists(context['full_path'])
 
-            DBSession.rollback()
-            return
+        def commit(context):
+            """saves the new version to the database
+            """
+            if context['file_exists']:
+                DBSession.add(new_version)
+            else:
+                DBSession.rollback()
+            DBSession.commit()
 
-        if is_external_env:
-            # set the clipboard to the new_version.absolute_full_path
-            clipboard = QtGui.QApplication.clipboard()
+        def save_finished(job):
+            """called when all the stages are done
+            """
+            if job.error is not None or job.cancelled:
+                DBSession.rollback()
+                if job.error is not None:
+                    try:
+                        error_message = '%s' % job.error
+                    except UnicodeEncodeError:
+                        error_message = unicode(job.error)
 
-            logger.debug('new_version.absolute_full_path: %s' %
-                         new_version.absolute_full_path)
+                    print(error_message)
+                    QtGui.QMessageBox.critical(
+                        self,
+                        'Error',
+                        error_message
+                    )
+                return
 
-            v_path = os.path.normpath(new_version.absolute_full_path)
-            clipboard.setText(v_path)
+            if is_external_env:
+                # set the clipboard to the new_version.absolute_full_path
+                clipboard = QtGui.QApplication.clipboard()
 
-            # and warn the user about a new version is created and the
-            # clipboard is set to the new version full path
-            QtGui.QMessageBox.warning(
-                self,
-                "Path Generated",
-                "A new Version is created at:\n\n%s\n\n"
-                "And the path is copied to your clipboard!!!" % v_path,
-                QtGui.QMessageBox.Ok
-            )
+                logger.debug('new_version.absolute_full_path: %s' %
+                             job.context['full_path'])
 
-        # check if the new version is pointing to a valid file
-        if os.path.exists(new_version.absolute_full_path):
-            # save the new version to the database
-            DBSession.add(new_version)
-        else:
-            # raise an error
-            QtGui.QMessageBox.critical(
-                self,
-                'Error',
-                'Something went wrong with %s\n'
-                'and the file is not created!\n\n'
-                'Please save again!' % environment.name
-            )
-            DBSession.rollback()
+                v_path = os.path.normpath(job.context['full_path'])
+                clipboard.setText(v_path)
 
-        DBSession.commit()
+                # and warn the user about a new version is created and the
+                # clipboard is set to the new version full path
+                QtGui.QMessageBox.warning(
+                    self,
+                    "Path Generated",
+                    "A new Version is created at:\n\n%s\n\n"
+                    "And the path is copied to your clipboard!!!" % v_path,
+                    QtGui.QMessageBox.Ok
+                )
 
-        if is_external_env:
-            # refresh the UI
-            self.tasks_treeView_changed()
-        else:
-            # close the UI
-            self.close()
+            # check if the new version is pointing to a valid file
+            if not job.context['file_exists']:
+                # raise an error
+                QtGui.QMessageBox.critical(
+                    self,
+                    'Error',
+                    'Something went wrong with %s\n'
+                    'and the file is not created!\n\n'
+                    'Please save again!' % environment.name
+                )
+
+            if is_external_env:
+                # refresh the UI
+                self.tasks_treeView_changed()
+            else:
+                # close the UI
+                self.close()
+
+        # the environment and the database are used in the UI thread, the
+        # folder creation and the file check run in the worker thread, once
+        # the file is saved the job can not be cancelled, so the file always
+        # gets its Version
+        self.run_staged_job(
+            [
+                ('Preparing the paths...', prepare, True),
+                ('Creating the folders...', create_folders, False),
+                ('Saving %s...' % new_version.nice_name, save, True),
+                ('Checking the saved file...', check_file, False, False),
+                ('Updating the database...', commit, True, False),
+            ],
+            save_finished
+        )
 
     def chose_pushButton_clicked(self):
         """runs when the chose_pushButton clicked
@@ -1690,16 +1662,26 @@ class MainDialog(QtGui.QDialog, version_creator_UI.Ui_Dialog, AnimaDialogBase):
 
         skip_update_check = not self.checkUpdates_checkBox.isChecked()
 
+        if old_version is None:
+            return
+
         # call the environments open method
-        if self.environment is not None:
-            repr_name = self.representations_comboBox.currentText()
-            ref_depth = ref_depth_res.index(
-                self.ref_depth_comboBox.currentText()
-            )
+        if self.environment is None:
+            # close the dialog
+            self.close()
+            return
 
+        repr_name = self.representations_comboBox.currentText()
+        ref_depth = ref_depth_res.index(
+            self.ref_depth_comboBox.currentText()
+        )
+
+        def open_(context):
+            """opens the version in the environment
+            """
             # environment can throw RuntimeError for unsaved changes
             try:
-                reference_resolution = \
+                context['reference_resolution'] = \
                     self.environment.open(
                         old_version,
                         representation=repr_name,
@@ -1720,7 +1702,7 @@ class MainDialog(QtGui.QDialog, version_creator_UI.Ui_Dialog, AnimaDialogBase):
                 )
 
                 if answer == QtGui.QMessageBox.Yes:
-                    reference_resolution =\
+                    context['reference_resolution'] = \
                         self.environment.open(
                             old_version,
                             True,
@@ -1728,14 +1710,24 @@ class MainDialog(QtGui.QDialog, version_creator_UI.Ui_Dialog, AnimaDialogBase):
                             reference_depth=ref_depth,
                             skip_update_check=skip_update_check
                         )
-                else:
-                    # no, just return
-                    return
+
+        def open_finished(job):
+            """called when the version is opened
+            """
+            if job.error is not None:
+                QtGui.QMessageBox.critical(self, 'Error', '%s' % job.error)
+                return
+
+            reference_resolution = job.context.get('reference_resolution')
+            if reference_resolution is None:
+                # the user didn't want to lose the unsaved changes
+                return
 
             # check the reference_resolution to update old versions
             if reference_resolution['create'] \
                or reference_resolution['update']:
                 # invoke the version_updater for this scene
+                from anima.ui import version_updater
                 version_updater_main_dialog = \
                     version_updater.MainDialog(
                         environment=self.environment,
@@ -1745,8 +1737,68 @@ class MainDialog(QtGui.QDialog, version_creator_UI.Ui_Dialog, AnimaDialogBase):
 
                 version_updater_main_dialog.exec_()
 
-        # close the dialog
-        self.close()
+            # close the dialog
+            self.close()
+
+        self.run_staged_job(
+            [('Opening %s...' % old_version.nice_name, open_, True)],
+            open_finished
+        )
+
+    def run_staged_job(self, stages, finished_callback, context=None):
+        """Runs the given stages with a
+        :class:`anima.ui.utils.StagedJobThread` and shows the progress.
+
+        :param list stages: A list of (label, function, in_main_thread) or
+          (label, function, in_main_thread, cancellable) tuples.
+        :param finished_callback: A callable which is called with the
+          :class:`anima.ui.utils.StagedJobThread` when all the stages are done.
+        :param dict context: The initial context of the stages.
+        """
+        progress_dialog = QtGui.QProgressDialog(self)
+        # do not let the user start another job until this one is finished
+        progress_dialog.setWindowModality(QtCore.Qt.WindowModal)
+        progress_dialog.setRange(0, len(stages))
+        progress_dialog.setLabelText(stages[0][0])
+        progress_dialog.show()
+
+        job_thread = ui_utils.StagedJobThread(stages, context, parent=self)
+
+        def update_progress(stage_index, stage_count):
+            """updates the progress dialog
+            """
+            progress_dialog.setRange(0, stage_count)
+            progress_dialog.setValue(stage_index)
+            progress_dialog.setLabelText(job_thread.label)
+
+        def job_finished():
+            """called when all the stages are done
+            """
+            progress_dialog.close()
+            self.job_thread = None
+            finished_callback(job_thread)
+
+        QtCore.QObject.connect(
+            job_thread,
+            QtCore.SIGNAL('progress(int, int)'),
+            update_progress
+        )
+
+        QtCore.QObject.connect(
+            job_thread,
+            QtCore.SIGNAL('finished()'),
+            job_finished
+        )
+
+        QtCore.QObject.connect(
+            progress_dialog,
+            QtCore.SIGNAL('canceled()'),
+            job_thread.cancel
+        )
+
+        # keep a reference to the thread until it is finished
+        self.job_thread = job_thread
+        job_thread.start()
 
     def reference_pushButton_clicked(self):
         """runs when the reference_pushButton clicked
@@ -1890,10 +1942,39 @@ class MainDialog(QtGui.QDialog, version_creator_UI.Ui_Dialog, AnimaDialogBase):
         # get the current task
         task = self.get_task()
 
-        ui_utils.upload_thumbnail(task, thumbnail_full_path)
+        def copy_file(context):
+            """copies the thumbnail to the task folder
+            """
+            context['thumbnail_path'] = ui_utils.copy_thumbnail_file(
+                context['task_absolute_path'], thumbnail_full_path
+            )
 
-        # update the thumbnail
-        self.update_thumbnail()
+        def link(context):
+            """sets the task thumbnail in the database
+            """
+            ui_utils.link_thumbnail(task, context['thumbnail_path'])
+
+        def upload_finished(job):
+            """called when the thumbnail is uploaded
+            """
+            if job.error is not None:
+                DBSession.rollback()
+                QtGui.QMessageBox.critical(self, 'Error', '%s' % job.error)
+                return
+
+            # update the thumbnail
+            self.update_thumbnail()
+
+        # the file is copied in the worker thread, the database is updated in
+        # the UI thread, the copied file is always linked
+        self.run_staged_job(
+            [
+                ('Copying the thumbnail...', copy_file, False),
+                ('Updating the database...', link, True, False),
+            ],
+            upload_finished,
+            context={'task_absolute_path': task.absolute_path}
+        )
 
     def clear_thumbnail_push_button_clicked(self):
         """clears the thumbnail of the current task if it has one
@@ -1925,6 +2006,7 @@ class MainDialog(QtGui.QDialog, version_creator_UI.Ui_Dialog, AnimaDialogBase):
                     db.DBSession.delete(t.thumbnail.thumbnail)
             # leave the files there
             db.DBSession.commit()
+            ui_utils.ThumbnailService.instance().clear_task_thumbnail_paths()
 
             # update the thumbnail
             self.clear_thumbnail()
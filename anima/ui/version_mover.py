@@ -3,9 +3,9 @@
 #
 # This module is part of anima-tools and is released under the BSD 2
 # License: http://www.opensource.org/licenses/BSD-2-Clause
+import json
 import os
-import shutil
-from sqlalchemy import distinct
+from sqlalchemy import and_, func
 from stalker import db, Project, Task, Version
 
 from anima.ui.lib import QtCore, QtGui
@@ -30,6 +30,185 @@ def UI(app_in=None, executor=None, **kwargs):
     return ui_caller(app_in, executor, VersionMover, **kwargs)
 
 
+class VersionMoveJob(object):
+    """Copies the latest versions of each take of a task to another task.
+
+    The latest versions are resolved with one grouped query, all the new
+    versions are created in a single transaction and the files are copied
+    with an :class:`anima.utils.FileCopier`. The file pairs are written to a
+    journal file before the versions are committed and the journal is removed
+    by :meth:`.finish` when all the files are copied, so an interrupted move
+    is resumed without creating the versions again.
+
+    :param from_task: The source :class:`~stalker.models.task.Task`.
+    :param to_task: The destination :class:`~stalker.models.task.Task`.
+    :param created_by: The :class:`~stalker.models.auth.User` which is set as
+      the ``created_by`` of the new versions.
+    """
+
+    def __init__(self, from_task, to_task, created_by=None):
+        self.from_task = from_task
+        self.to_task = to_task
+        self.created_by = created_by
+
+    @property
+    def journal_path(self):
+        """returns the path of the journal file of this job
+        """
+        from anima import local_cache_folder, version_mover_journal_folder_name
+        return os.path.normpath(
+            os.path.expanduser(
+                os.path.join(
+                    local_cache_folder,
+                    version_mover_journal_folder_name,
+                    '%s_%s.json' % (self.from_task.id, self.to_task.id)
+                )
+            )
+        )
+
+    def read_journal(self):
+        """returns the (source, target) file pairs of an interrupted move or
+        None if there is no journal
+        """
+        try:
+            with open(self.journal_path) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        return [(source, target) for source, target in data['files']]
+
+    def write_journal(self, files):
+        """writes the given (source, target) file pairs to the journal
+
+        :param list files: A list of (source, target) tuples.
+        """
+        from anima.utils import atomic_write
+        atomic_write(
+            self.journal_path,
+            json.dumps({
+                'from_task_id': self.from_task.id,
+                'to_task_id': self.to_task.id,
+                'files': files
+            })
+        )
+
+    def get_latest_versions(self):
+        """returns the latest version of each take of the from_task ordered by
+        the take name, with a single query
+        """
+        latest = db.DBSession\
+            .query(
+                Version.take_name,
+                func.max(Version.version_number).label('version_number')
+            )\
+            .filter(Version.task_id == self.from_task.id)\
+            .group_by(Version.take_name)\
+            .subquery()
+
+        return db.DBSession.query(Version)\
+            .join(
+                latest,
+                and_(
+                    Version.take_name == latest.c.take_name,
+                    Version.version_number == latest.c.version_number
+                )
+            )\
+            .filter(Version.task_id == self.from_task.id)\
+            .order_by(Version.take_name)\
+            .all()
+
+    def create_versions(self, latest_versions):
+        """creates a new version in the to_task for each of the given versions
+        in one transaction and returns the (source, target) file pairs
+
+        :param list latest_versions: A list of
+          :class:`~stalker.models.version.Version` instances.
+        :return: list of (source, target) tuples
+        """
+        new_versions = []
+        for latest_version in latest_versions:
+            new_version = Version(
+                task=self.to_task,
+                take_name=latest_version.take_name
+            )
+            new_version.created_by = self.created_by
+            new_version.extension = latest_version.extension
+            new_version.description = \
+                'Moved from another task (id=%s) with Version Mover' % \
+                self.from_task.id
+            new_version.created_with = latest_version.created_with
+            db.DBSession.add(new_version)
+            new_versions.append(new_version)
+
+        try:
+            # the paths need the version numbers
+            db.DBSession.flush()
+            files = []
+            for latest_version, new_version in \
+                    zip(latest_versions, new_versions):
+                new_version.update_paths()
+                files.append(
+                    (latest_version.absolute_full_path,
+                     new_version.absolute_full_path)
+                )
+
+            # be sure that the files will be copied even if the move is
+            # interrupted right after the commit
+            self.write_journal(files)
+            db.DBSession.commit()
+        except Exception:
+            db.DBSession.rollback()
+            self.remove_journal()
+            raise
+
+        return files
+
+    def prepare(self, latest_versions=None):
+        """creates the new versions, or reads the journal of an interrupted
+        move, and returns an :class:`anima.utils.FileCopier` ready to copy
+        the files
+
+        :param list latest_versions: The versions to be copied, the default is
+          the result of :meth:`.get_latest_versions`. It is not used if the
+          move is being resumed.
+        :return: :class:`anima.utils.FileCopier`
+        """
+        from anima.utils import FileCopier
+
+        files = self.read_journal()
+        if files is None:
+            if latest_versions is None:
+                latest_versions = self.get_latest_versions()
+            files = self.create_versions(latest_versions)
+
+        # the files that were copied before the interruption are skipped by
+        # the FileCopier
+        file_copier = FileCopier()
+        for source, target in files:
+            file_copier.add(source, target)
+        return file_copier
+
+    def remove_journal(self):
+        """removes the journal file
+        """
+        try:
+            os.remove(self.journal_path)
+        except OSError:
+            pass
+
+    def finish(self, file_copier):
+        """removes the journal if all the files are copied
+
+        :param file_copier: The :class:`anima.utils.FileCopier` returned by
+          :meth:`.prepare`.
+        :return: bool, True if the move is completed
+        """
+        if file_copier.cancelled or file_copier.errors:
+            return False
+        self.remove_journal()
+        return True
+
+
 class VersionMover(QtGui.QDialog, AnimaDialogBase):
     """Moves versions from one task to other.
 
@@ -46,6 +225,7 @@ class VersionMover(QtGui.QDialog, AnimaDialogBase):
         self.from_task_tree_view = None
         self.to_task_tree_view = None
         self.copy_push_button = None
+        self.copier_thread = None
 
         self.setup_ui(self)
 
@@ -220,75 +400,108 @@ class VersionMover(QtGui.QDialog, AnimaDialogBase):
             )
             return
 
-        # get take names and related versions
-        # get distinct take names
-        from_take_names = map(
-            lambda x: x[0],
-            db.DBSession.query(distinct(Version.take_name))
-            .filter(Version.task == from_task)
-            .order_by(Version.take_name)
-            .all()
-        )
+        job = VersionMoveJob(from_task, to_task, created_by=logged_in_user)
+
+        files = job.read_journal()
+        latest_versions = None
+        if files is not None:
+            message = "Found an interrupted copy of %s versions between " \
+                      "these tasks.<br><br>" \
+                      "Resume it?" % len(files)
+        else:
+            # get the latest version of each take
+            latest_versions = job.get_latest_versions()
+            from_take_names = [v.take_name for v in latest_versions]
+            message = "Will copy %s versions from take names:<br><br>" \
+                      "%s" \
+                      "<br><br>" \
+                      "Is that Ok?" % (
+                          len(from_take_names),
+                          '<br>'.join(from_take_names)
+                      )
 
         # create versions for each take
         answer = QtGui.QMessageBox.question(
             self,
             'Info',
-            "Will copy %s versions from take names:<br><br>"
-            "%s"
-            "<br><br>"
-            "Is that Ok?" % (
-                len(from_take_names),
-                '<br>'.join(from_take_names)
-            ),
+            message,
             QtGui.QMessageBox.Yes,
             QtGui.QMessageBox.No
         )
 
         if answer == QtGui.QMessageBox.Yes:
-            for take_name in from_take_names:
-                latest_version = Version.query\
-                    .filter_by(task=from_task)\
-                    .filter_by(take_name=take_name)\
-                    .order_by(Version.version_number.desc())\
-                    .first()
-
-                # create a new version
-                new_version = Version(
-                    task=to_task,
-                    take_name=take_name
-                )
-                new_version.created_by = logged_in_user
-                new_version.extension = latest_version.extension
-                new_version.description = \
-                    'Moved from another task (id=%s) with Version Mover' % \
-                    latest_version.task.id
-                new_version.created_with = latest_version.created_with
-                db.DBSession.add(new_version)
-                db.DBSession.commit()
-
-                # update path
-                new_version.update_paths()
-                db.DBSession.add(new_version)
-                db.DBSession.commit()
+            file_copier = job.prepare(latest_versions)
+            self.copy_files(job, file_copier)
 
-                # now copy the last_version file to the new_version path
-                try:
-                    os.makedirs(new_version.absolute_path)
-                except OSError:  # path exists
-                    pass
+    def copy_files(self, job, file_copier):
+        """copies the files of the given VersionMoveJob in a background thread
+        and informs the user when it is done
 
-                # move the file there
-                shutil.copyfile(
-                    latest_version.absolute_full_path,
-                    new_version.absolute_full_path
+        :param job: A :class:`.VersionMoveJob` instance.
+        :param file_copier: The :class:`anima.utils.FileCopier` of the job.
+        """
+        from anima.ui.utils import FileCopierThread
+
+        progress_dialog = QtGui.QProgressDialog(self)
+        progress_dialog.setRange(0, 0)
+        progress_dialog.setLabelText('Copying version files...')
+        progress_dialog.show()
+
+        copier_thread = FileCopierThread(file_copier, parent=self)
+
+        def update_progress(copied_kbytes, total_kbytes):
+            """updates the progress dialog
+            """
+            progress_dialog.setRange(0, total_kbytes)
+            progress_dialog.setValue(copied_kbytes)
+
+        def copy_finished():
+            """called when all the files are copied
+            """
+            progress_dialog.close()
+            self.copier_thread = None
+
+            if file_copier.cancelled:
+                return
+
+            if not job.finish(file_copier):
+                QtGui.QMessageBox.critical(
+                    self,
+                    'Error',
+                    'The following files could not be copied:<br><br>%s'
+                    '<br><br>Copy again to resume.' %
+                    '<br>'.join(
+                        '%s: %s' % (source, e)
+                        for source, target, e in file_copier.errors
+                    )
                 )
+                return
 
             # inform the user
             QtGui.QMessageBox.information(
                 self,
                 'Success',
-                'Successfully copied %s versions' % len(from_take_names)
+                'Successfully copied %s versions' % len(file_copier.files)
             )
 
+        QtCore.QObject.connect(
+            copier_thread,
+            QtCore.SIGNAL('progress(int, int)'),
+            update_progress
+        )
+
+        QtCore.QObject.connect(
+            copier_thread,
+            QtCore.SIGNAL('finished()'),
+            copy_finished
+        )
+
+        QtCore.QObject.connect(
+            progress_dialog,
+            QtCore.SIGNAL('canceled()'),
+            copier_thread.cancel
+        )
 
+        # keep a reference to the thread until it is finished
+        self.copier_thread = copier_thread
+        copier_thread.start()
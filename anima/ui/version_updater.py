@@ -6,7 +6,7 @@
 from anima import logger
 from anima.env import empty_reference_resolution
 from anima.ui.base import AnimaDialogBase, ui_caller
-from anima.ui.models import VersionTreeModel
+from anima.ui.models import VersionTreeModel, VersionRowLoaderThread
 from anima.ui.lib import QtGui, QtCore
 from anima.ui import IS_PYSIDE, IS_PYQT4
 
@@ -168,11 +168,21 @@ class MainDialog(QtGui.QDialog, version_updater_UI.Ui_Dialog, AnimaDialogBase):
 
         version_tree_model = VersionTreeModel()
         version_tree_model.reference_resolution = self.reference_resolution
+        self.versions_treeView.setModel(version_tree_model)
 
         # populate with all update items
-        version_tree_model.populateTree(self.reference_resolution['root'])
-
-        self.versions_treeView.setModel(version_tree_model)
+        if VersionRowLoaderThread.is_supported():
+            # load the data in another thread and do not block the UI
+            self.update_pushButton.setEnabled(False)
+            QtCore.QObject.connect(
+                version_tree_model,
+                QtCore.SIGNAL('populated()'),
+                self.versions_treeView_populated
+            )
+            version_tree_model.load(self.reference_resolution['root'])
+        else:
+            version_tree_model.populateTree(self.reference_resolution['root'])
+            self.versions_treeView_populated()
 
         logger.debug('setting up signals for versions_treeView_changed')
         # versions_treeView
@@ -184,9 +194,14 @@ class MainDialog(QtGui.QDialog, version_updater_UI.Ui_Dialog, AnimaDialogBase):
         # )
 
         self.versions_treeView.is_updating = False
-        self.versions_treeView_auto_fit_column()
         logger.debug('finished filling versions_treeView')
 
+    def versions_treeView_populated(self):
+        """called when the versions_treeView is populated
+        """
+        self.update_pushButton.setEnabled(True)
+        self.versions_treeView_auto_fit_column()
+
     def _fill_UI(self):
         """fills the UI with the asset data
         """
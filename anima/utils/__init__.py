@@ -15,6 +15,7 @@ import tempfile
 import uuid
 import copy
 import subprocess
+import threading
 
 from anima import logger
 
@@ -143,10 +144,10 @@ class StalkerThumbnailCache(object):
         cached_file_full_path = os.path.join(cache_path, filename)
 
         url = '%s/%s' % (
-            anima.stalker_server_internal_address,
+            anima.get_stalker_server_address(),
             thumbnail_full_path
         )
-        login_url = '%s/login' % anima.stalker_server_internal_address
+        login_url = '%s/login' % anima.get_stalker_server_address()
 
         logger.debug('cache_path            : %s' % cache_path)
         logger.debug('cached_file_full_path : %s' % cached_file_full_path)
@@ -236,28 +237,104 @@ def sort_strings_with_embedded_numbers(data):
     return sorted(data, key=embedded_numbers)
 
 
-def do_db_setup():
+def get_db_engine_settings(pool=None, settings=None):
+    """returns a copy of the database engine settings with the pool settings
+    are filled in
+
+    :param str pool: The pool type, "queue" or "null". The default is
+      ``anima.db_pool``. "queue" uses a QueuePool with the pool size, max
+      overflow and recycle values from the settings (or from
+      ``anima.db_pool_*`` if missing) and pings the connections before using
+      them. "null" uses a NullPool which opens a new connection for every
+      checkout, use it in forked processes. SQLite databases always use the
+      default pool of SQLAlchemy with "queue".
+    :param dict settings: The engine settings, the default is
+      ``stalker.defaults.database_engine_settings``.
+    :return: dict
+    """
+    import anima
+    if pool is None:
+        pool = anima.db_pool
+
+    if settings is None:
+        from stalker import defaults
+        settings = defaults.database_engine_settings
+
+    # do not change the defaults
+    settings = copy.copy(settings)
+
+    if pool == 'null':
+        from sqlalchemy.pool import NullPool
+        settings['sqlalchemy.poolclass'] = NullPool
+    elif pool == 'queue':
+        if not settings.get('sqlalchemy.url', '').startswith('sqlite'):
+            from sqlalchemy.pool import QueuePool
+            settings['sqlalchemy.poolclass'] = QueuePool
+            settings.setdefault('sqlalchemy.pool_size', anima.db_pool_size)
+            settings.setdefault(
+                'sqlalchemy.max_overflow', anima.db_pool_max_overflow
+            )
+            settings.setdefault(
+                'sqlalchemy.pool_recycle', anima.db_pool_recycle
+            )
+
+            # pre ping is introduced in SQLAlchemy 1.2
+            import sqlalchemy
+            sqlalchemy_version = tuple(
+                int(v) for v in re.findall(r'\d+', sqlalchemy.__version__)[:2]
+            )
+            if sqlalchemy_version >= (1, 2):
+                settings.setdefault('sqlalchemy.pool_pre_ping', True)
+    else:
+        raise ValueError(
+            'pool should be one of "queue" or "null", not %s' % pool
+        )
+
+    return settings
+
+
+def do_db_setup(pool=None, lazy=None):
     """the common routing for setting up the database
+
+    :param str pool: The connection pool type, "queue" or "null", see
+      :func:`.get_db_engine_settings` for details. The default is
+      ``anima.db_pool`` which can be set with the ``ANIMA_DB_POOL``
+      environment variable.
+    :param bool lazy: If True, only the engine is created and bound to the
+      session, so the connection is done on the first query. The table
+      creation and the version check of Stalker is skipped, so only use it
+      with an existing database. The default is ``anima.db_lazy_setup``.
     """
     from sqlalchemy.exc import UnboundExecutionError
 
     from stalker import db
     from stalker.db import DBSession
 
+    import anima
+    if lazy is None:
+        lazy = anima.db_lazy_setup
+
     DBSession.remove()
     DBSession.close()
 
     try:
-        DBSession.connection()
+        # this doesn't connect to the database
+        DBSession.get_bind()
         logger.debug('already connected, not creating any new connections')
     except UnboundExecutionError:
         # no connection do setup
-        logger.debug('doing a new connection with NullPool')
-        from stalker import defaults
-        from sqlalchemy.pool import NullPool
-        settings = defaults.database_engine_settings
-        settings['sqlalchemy.poolclass'] = NullPool
-        db.setup(settings)
+        settings = get_db_engine_settings(pool=pool)
+        logger.debug(
+            'doing a new connection with %s pool' %
+            (pool or anima.db_pool)
+        )
+        if lazy:
+            from sqlalchemy import engine_from_config
+            engine = engine_from_config(settings, 'sqlalchemy.')
+            DBSession.remove()
+            DBSession.configure(bind=engine)
+        else:
+            db.setup(settings)
 
 
 def utc_to_local(utc_dt):
@@ -412,6 +489,389 @@ def kelvin_to_rgb(kelvin):
     ]
 
 
+class FileLock(object):
+    """An inter process lock which uses a lock file beside the given path.
+
+    Use it as a context manager::
+
+        with FileLock('/path/to/data.json'):
+            # read and write /path/to/data.json
+            pass
+
+    It uses ``fcntl.flock`` on Linux and OSX and ``msvcrt.locking`` on
+    Windows, the lock is also re-entrant in the same process.
+
+    :param str path: The path of the file to be locked, the lock file is
+      created as ``path + '.lock'``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = '%s.lock' % path
+        self._lock_file = None
+        self._lock = threading.RLock()
+        self._count = 0
+
+    def acquire(self):
+        """acquires the lock, blocks until the lock is acquired
+        """
+        self._lock.acquire()
+        self._count += 1
+        if self._count > 1:
+            return
+
+        lock_dir = os.path.dirname(self.lock_path)
+        if lock_dir and not os.path.exists(lock_dir):
+            try:
+                os.makedirs(lock_dir)
+            except OSError:
+                # created by another process
+                pass
+
+        self._lock_file = open(self.lock_path, 'a+')
+        try:
+            import fcntl
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        except ImportError:
+            import msvcrt
+            # "a+" opens the file at the end, lock the same byte that is
+            # unlocked in release()
+            self._lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except IOError:
+                    # LK_LOCK gives up after 10 seconds, keep trying
+                    pass
+
+    def release(self):
+        """releases the lock
+        """
+        self._count -= 1
+        if self._count == 0:
+            try:
+                try:
+                    import fcntl
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+                except ImportError:
+                    import msvcrt
+                    self._lock_file.seek(0)
+                    msvcrt.locking(
+                        self._lock_file.fileno(), msvcrt.LK_UNLCK, 1
+                    )
+            finally:
+                self._lock_file.close()
+                self._lock_file = None
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+def atomic_write(path, data, mode='w'):
+    """Writes the given data to the given path atomically, by writing it to a
+    temp file in the same folder and then renaming it, so the readers never
+    see a half written file.
+
+    :param str path: The path of the file.
+    :param data: The data to be written.
+    :param str mode: The file mode, "w" or "wb".
+    """
+    file_path = os.path.dirname(path)
+    if file_path and not os.path.exists(file_path):
+        try:
+            os.makedirs(file_path)
+        except OSError:
+            # created by another process
+            pass
+
+    fd, temp_path = tempfile.mkstemp(
+        dir=file_path or None,
+        prefix='.%s.' % os.path.basename(path)
+    )
+    try:
+        with os.fdopen(fd, mode) as f:
+            f.write(data)
+
+        replace = getattr(os, 'replace', None)
+        if replace is not None:
+            replace(temp_path, path)
+        else:
+            try:
+                os.rename(temp_path, path)
+            except OSError:
+                # on Windows the target should not exist
+                os.remove(path)
+                os.rename(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def run_in_threads(func, items, max_workers=None):
+    """Calls the given function with each of the given items in a bounded pool
+    of threads and yields the results as they are completed. The items are
+    picked up by the threads in the given order.
+
+    :param func: A callable accepting one argument.
+    :param items: A list of items to be passed to the function.
+    :param int max_workers: The maximum number of threads. Default is the
+      number of CPUs.
+    :returns: A generator yielding (item, result, exception) tuples in the
+      order of completion. The exception is None if the call is successful.
+    """
+    import multiprocessing
+
+    if max_workers is None:
+        max_workers = multiprocessing.cpu_count()
+
+    jobs = list(items)
+    job_count = len(jobs)
+    results = []
+    condition = threading.Condition()
+
+    def worker():
+        while True:
+            with condition:
+                try:
+                    item = jobs.pop(0)
+                except IndexError:
+                    return
+
+            result = None
+            exception = None
+            try:
+                result = func(item)
+            except Exception as e:
+                exception = e
+
+            with condition:
+                results.append((item, result, exception))
+                condition.notify()
+
+    for i in range(min(max(1, max_workers), job_count)):
+        t = threading.Thread(target=worker)
+        t.daemon = True
+        t.start()
+
+    for i in range(job_count):
+        with condition:
+            while not results:
+                condition.wait()
+            data = results.pop(0)
+        yield data
+
+
+class FileCopier(object):
+    """Copies files concurrently.
+
+    Add file pairs with :meth:`.add` and then call :meth:`.run`. The same
+    target is copied only once even if it has been added more than once, and
+    targets that are already present with the same size and modification time
+    of their source are skipped. The remaining files are copied with
+    :func:`.run_in_threads` with large buffers, so the total copy time is
+    bound by the disk bandwidth instead of the number of files.
+
+    Use the ``progress_callback`` to get notified about the progress. It is
+    called with the number of bytes copied so far and the total number of
+    bytes to be copied. Be aware that it is called from the worker threads.
+
+    :param int max_workers: The maximum number of threads copying files at the
+      same time. Default is 4.
+    :param int buffer_size: The size of the read/write buffer in bytes.
+      Default is 16 MB.
+    :param progress_callback: A callable accepting two integers.
+    """
+
+    default_buffer_size = 16 * 1024 * 1024
+
+    def __init__(self, max_workers=4, buffer_size=None,
+                 progress_callback=None):
+        self.max_workers = max(1, max_workers)
+        if buffer_size is None:
+            buffer_size = self.default_buffer_size
+        self.buffer_size = buffer_size
+        self.progress_callback = progress_callback
+
+        self.files = []
+        self._targets = set()
+
+        self.copied_files = []
+        self.skipped_files = []
+        self.errors = []
+
+        self.copied_bytes = 0
+        self.total_bytes = 0
+
+        self._lock = threading.Lock()
+        self._cancelled = False
+
+    @classmethod
+    def _normalize(cls, path):
+        """returns the normalized version of the given path which is used to
+        compare paths
+        """
+        return os.path.normcase(
+            os.path.normpath(os.path.expanduser(os.path.expandvars(path)))
+        )
+
+    def add(self, source, target):
+        """Adds the given source and target pair to the list of files to be
+        copied.
+
+        :param str source: The source file path
+        :param str target: The target file path
+        :return: bool, False if the target has already been added
+        """
+        source = os.path.expandvars(source)
+        target = os.path.expandvars(target)
+
+        key = self._normalize(target)
+        if key in self._targets:
+            return False
+
+        self._targets.add(key)
+        self.files.append((source, target))
+        return True
+
+    @classmethod
+    def is_up_to_date(cls, source, target):
+        """Checks if the target file is already present with the same size and
+        modification time of the source file.
+
+        :param str source: The source file path
+        :param str target: The target file path
+        :return: bool
+        """
+        try:
+            source_stat = os.stat(source)
+            target_stat = os.stat(target)
+        except OSError:
+            return False
+
+        return source_stat.st_size == target_stat.st_size and \
+            int(source_stat.st_mtime) == int(target_stat.st_mtime)
+
+    def cancel(self):
+        """cancels the copy operation, the partially copied files are removed
+        and no other file will be copied
+        """
+        self._cancelled = True
+
+    @property
+    def cancelled(self):
+        """returns True if the copy operation has been cancelled
+        """
+        return self._cancelled
+
+    def _report(self, byte_count):
+        """updates the copied byte count and calls the progress callback
+        """
+        with self._lock:
+            self.copied_bytes += byte_count
+            copied_bytes = self.copied_bytes
+
+        if self.progress_callback:
+            self.progress_callback(copied_bytes, self.total_bytes)
+
+    def copy_file(self, source, target):
+        """Copies the given source file to the given target by using a large
+        buffer and reports the progress per chunk.
+
+        The modification time of the source is also copied, so the target
+        will be skipped in the next run.
+
+        :param str source: The source file path
+        :param str target: The target file path
+        :return: bool, False if the copy operation is cancelled
+        """
+        target_path = os.path.dirname(target)
+        if target_path and not os.path.exists(target_path):
+            try:
+                os.makedirs(target_path)
+            except OSError:
+                # created by another thread
+                pass
+
+        completed = False
+        with open(source, 'rb') as source_file:
+            try:
+                with open(target, 'wb') as target_file:
+                    while not self._cancelled:
+                        data = source_file.read(self.buffer_size)
+                        if not data:
+                            completed = True
+                            break
+                        target_file.write(data)
+                        self._report(len(data))
+            finally:
+                if not completed and os.path.exists(target):
+                    # do not leave partially copied files behind
+                    os.remove(target)
+
+        if not completed:
+            return False
+
+        shutil.copystat(source, target)
+        return True
+
+    def _copy_job(self, job):
+        """copies the file of the given (source, target) job unless the copy
+        operation is cancelled, it is called from the worker threads
+        """
+        if self._cancelled:
+            return False
+        source, target = job
+        return self.copy_file(source, target)
+
+    def run(self):
+        """Copies the files.
+
+        :return: A list of (source, target, exception) tuples for the files
+          that could not be copied.
+        """
+        self.copied_files = []
+        self.skipped_files = []
+        self.errors = []
+        self.copied_bytes = 0
+        self.total_bytes = 0
+
+        jobs = []
+        for source, target in self.files:
+            if self.is_up_to_date(source, target):
+                logger.debug('skipping up to date file: %s' % target)
+                self.skipped_files.append((source, target))
+                continue
+
+            try:
+                size = os.path.getsize(source)
+            except OSError as e:
+                self.errors.append((source, target, e))
+                continue
+
+            self.total_bytes += size
+            jobs.append((size, source, target))
+
+        # start with the biggest files to balance the work between threads
+        jobs.sort(key=lambda x: x[0], reverse=True)
+        jobs = [(source, target) for size, source, target in jobs]
+
+        results = run_in_threads(self._copy_job, jobs, self.max_workers)
+        for (source, target), completed, exception in results:
+            if exception is not None:
+                self.errors.append((source, target, exception))
+            elif completed:
+                self.copied_files.append((source, target))
+
+        return self.errors
+
+
 class MediaManager(object):
     """Manages media files.
 
@@ -481,6 +941,7 @@ class MediaManager(object):
         """
         # get the image rotation from EXIF information
         import exifread
+        from PIL import Image
 
         file_full_path = img.filename
 
@@ -520,6 +981,8 @@ class MediaManager(object):
           given path
         :return str: returns the thumbnail path
         """
+        from PIL import Image
+
         # generate thumbnail for the image and save it to a tmp folder
         suffix = self.thumbnail_format
 
@@ -551,6 +1014,8 @@ class MediaManager(object):
           given path.
         :return str: returns the thumbnail path
         """
+        from PIL import Image
+
         # generate thumbnail for the image and save it to a tmp folder
         suffix = self.thumbnail_format
 
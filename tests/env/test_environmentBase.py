@@ -5,13 +5,15 @@
 # License: http://www.opensource.org/licenses/BSD-2-Clause
 
 import logging
+import os
 
 import unittest
 from stalker import (db, Repository, Project, Structure, FilenameTemplate,
                      Status, StatusList, Task, Version)
 from stalker.db import DBSession
 
-from anima.env.base import EnvironmentBase
+from anima.env.base import (EnvironmentBase, LookupCache, PathNormalizer,
+                            RepositoryIndex)
 
 
 logger = logging.getLogger(__name__)
@@ -212,6 +214,153 @@ class EnvironmentBaseTestCase(unittest.TestCase):
         )
         self.assertEqual(version2_found, version2)
 
+    def test_get_versions_from_full_paths_with_multiple_repositories(self):
+        """testing if the get_versions_from_full_paths is working fine with
+        multiple repositories and with same version names
+        """
+        repo1 = Repository(
+            name='Test Repo 1',
+            linux_path='/mnt/T/',
+            windows_path='T:/',
+            osx_path='/Volumes/T/'
+        )
+        DBSession.add(repo1)
+
+        repo2 = Repository(
+            name='Test Repo 2',
+            linux_path='/mnt/S/',
+            windows_path='S:/',
+            osx_path='/Volumes/S/'
+        )
+        DBSession.add(repo2)
+
+        task_ft = FilenameTemplate(
+            name='Task Filename Template',
+            target_entity_type='Task',
+            path='$REPO{{project.repository.id}}/{{project.code}}/'
+                 '{%- for parent_task in parent_tasks -%}'
+                 '{{parent_task.nice_name}}/{%- endfor -%}',
+            filename='{{task.nice_name}}_{{version.take_name}}'
+                     '_v{{"%03d"|format(version.version_number)}}',
+        )
+        DBSession.add(task_ft)
+
+        structure1 = Structure(
+            name='Commercial Project Structure',
+            templates=[task_ft]
+        )
+        DBSession.add(structure1)
+
+        status1 = Status(name='Status 1', code='STS1')
+        status2 = Status(name='Status 2', code='STS2')
+        status3 = Status(name='Status 3', code='STS3')
+        DBSession.add_all([status1, status2, status3])
+
+        proj_status_list = StatusList(
+            name='Project Statuses',
+            target_entity_type='Project',
+            statuses=[status1, status2, status3]
+        )
+        DBSession.add(proj_status_list)
+
+        task_status_list = StatusList(
+            name='Task Statuses',
+            target_entity_type='Task',
+            statuses=[status1, status2, status3]
+        )
+        DBSession.add(task_status_list)
+
+        version_status_list = StatusList(
+            name='Version Statuses',
+            target_entity_type='Version',
+            statuses=[status1, status2, status3]
+        )
+        DBSession.add(version_status_list)
+
+        project1 = Project(
+            name='Test Project 1',
+            code='TP1',
+            repositories=[repo1],
+            structure=structure1,
+            status_list=proj_status_list
+        )
+        DBSession.add(project1)
+
+        project2 = Project(
+            name='Test Project 2',
+            code='TP2',
+            repositories=[repo2],
+            structure=structure1,
+            status_list=proj_status_list
+        )
+        DBSession.add(project2)
+
+        task1 = Task(
+            name='Test Task 1',
+            code='TT1',
+            project=project1,
+            status_list=task_status_list
+        )
+        DBSession.add(task1)
+
+        task2 = Task(
+            name='Test Task 1',
+            code='TT1',
+            project=project2,
+            status_list=task_status_list
+        )
+        DBSession.add(task2)
+
+        DBSession.commit()
+
+        # now create versions
+        version1 = Version(
+            task=task1,
+            status_list=version_status_list
+        )
+        DBSession.add(version1)
+        DBSession.commit()
+        version1.update_paths()
+
+        version2 = Version(
+            task=task2,
+            status_list=version_status_list
+        )
+        DBSession.add(version2)
+        DBSession.commit()
+        version2.update_paths()
+
+        DBSession.commit()
+        logger.debug('version1.full_path : %s' % version1.full_path)
+        logger.debug('version2.full_path : %s' % version2.full_path)
+
+        # now try to get the versions with an EnvironmentBase instance
+        env = EnvironmentBase()
+
+        paths = [
+            '/mnt/T/TP1/Test_Task_1/Test_Task_1_Main_v001',
+            '/mnt/S/TP2/Test_Task_1/Test_Task_1_Main_v001',
+            'T:/TP1/Test_Task_1/Test_Task_1_Main_v001',
+            '/Volumes/S/TP2/Test_Task_1/Test_Task_1_Main_v001',
+            '/mnt/T/TP1/Test_Task_1/Test_Task_1_Main_v002',
+            '',
+            None,
+        ]
+        versions = env.get_versions_from_full_paths(paths, chunk_size=1)
+
+        self.assertEqual(
+            versions,
+            {
+                '/mnt/T/TP1/Test_Task_1/Test_Task_1_Main_v001': version1,
+                '/mnt/S/TP2/Test_Task_1/Test_Task_1_Main_v001': version2,
+                'T:/TP1/Test_Task_1/Test_Task_1_Main_v001': version1,
+                '/Volumes/S/TP2/Test_Task_1/Test_Task_1_Main_v001': version2,
+            }
+        )
+
+        # no paths
+        self.assertEqual(env.get_versions_from_full_paths([]), {})
+
     def test_get_versions_from_path_handles_empty_and_None_path(self):
         """testing if no errors will be raised for a path which is None or an
         empty string
@@ -620,3 +769,348 @@ class EnvironmentBaseTestCase(unittest.TestCase):
             '/Volumes/S/TP2/Test_Task_1/Test_Task_1_Main_v001'
         )
         self.assertEqual(trimmed_path, expected_value2)
+
+    def test_find_repo_returns_the_repo_with_the_longest_prefix(self):
+        """testing if the find_repo will return the repository with the longest
+        matching path
+        """
+        repo1 = Repository(
+            name='Test Repo 1',
+            linux_path='/mnt/T/',
+            windows_path='T:/',
+            osx_path='/Volumes/T/'
+        )
+        repo2 = Repository(
+            name='Test Repo 2',
+            linux_path='/mnt/T/with_a_long_path/',
+            windows_path='T:/with_a_long_path/',
+            osx_path='/Volumes/T/with_a_long_path/'
+        )
+        DBSession.add_all([repo1, repo2])
+        DBSession.commit()
+
+        env = EnvironmentBase()
+        self.assertEqual(
+            env.find_repo('/mnt/T/with_a_long_path/TP1/file.ma'), repo2
+        )
+        self.assertEqual(env.find_repo('T:/TP1/file.ma'), repo1)
+        self.assertEqual(
+            env.trim_repo_path('/Volumes/T/with_a_long_path/TP1/file.ma'),
+            'TP1/file.ma'
+        )
+        self.assertIsNone(env.find_repo('/some/other/path/file.ma'))
+
+    def test_find_repo_is_not_querying_the_database_for_every_path(self):
+        """testing if the find_repo is using the RepositoryIndex and not
+        querying all the repositories for every path
+        """
+        repo1 = Repository(
+            name='Test Repo 1',
+            linux_path='/mnt/T/',
+            windows_path='T:/',
+            osx_path='/Volumes/T/'
+        )
+        DBSession.add(repo1)
+        DBSession.commit()
+
+        env = EnvironmentBase()
+        env.find_repo('/mnt/T/TP1/file.ma')
+        built_at = RepositoryIndex._built_at
+
+        for i in range(10):
+            self.assertEqual(
+                env.find_repo('/mnt/T/TP1/file_%s.ma' % i), repo1
+            )
+        self.assertEqual(RepositoryIndex._built_at, built_at)
+
+    def test_repository_index_is_invalidated_on_repository_changes(self):
+        """testing if the RepositoryIndex is invalidated when a new Repository
+        is created or an existing one is updated
+        """
+        repo1 = Repository(
+            name='Test Repo 1',
+            linux_path='/mnt/T/',
+            windows_path='T:/',
+            osx_path='/Volumes/T/'
+        )
+        DBSession.add(repo1)
+        DBSession.commit()
+
+        env = EnvironmentBase()
+        self.assertIsNone(env.find_repo('/mnt/S/TP1/file.ma'))
+
+        repo2 = Repository(
+            name='Test Repo 2',
+            linux_path='/mnt/S/',
+            windows_path='S:/',
+            osx_path='/Volumes/S/'
+        )
+        DBSession.add(repo2)
+        DBSession.commit()
+        self.assertEqual(env.find_repo('/mnt/S/TP1/file.ma'), repo2)
+
+        repo2.linux_path = '/mnt/X/'
+        DBSession.commit()
+        self.assertIsNone(env.find_repo('/mnt/S/TP1/file.ma'))
+        self.assertEqual(env.find_repo('/mnt/X/TP1/file.ma'), repo2)
+
+    def test_repository_index_is_rebuilt_when_ttl_is_expired(self):
+        """testing if the RepositoryIndex is rebuilt when it is older than the
+        RepositoryIndex.ttl
+        """
+        repo1 = Repository(
+            name='Test Repo 1',
+            linux_path='/mnt/T/',
+            windows_path='T:/',
+            osx_path='/Volumes/T/'
+        )
+        DBSession.add(repo1)
+        DBSession.commit()
+
+        RepositoryIndex.lookup('/mnt/T/TP1/file.ma')
+        built_at = RepositoryIndex._built_at
+
+        RepositoryIndex._built_at -= RepositoryIndex.ttl + 1
+        RepositoryIndex.lookup('/mnt/T/TP1/file.ma')
+        self.assertGreaterEqual(RepositoryIndex._built_at, built_at)
+
+        RepositoryIndex.invalidate()
+        self.assertIsNone(RepositoryIndex._prefixes)
+        self.assertEqual(
+            RepositoryIndex.lookup('/mnt/T/TP1/file.ma'), (repo1.id, '/mnt/T/')
+        )
+
+    def test_lookup_cache_is_saving_queries(self):
+        """testing if the LookupCache is serving the same Versions and
+        Repositories without querying them again and it is cleared at the end
+        of the operation
+        """
+        repo1 = Repository(
+            name='Test Repo 1',
+            linux_path='/mnt/T/',
+            windows_path='T:/',
+            osx_path='/Volumes/T/'
+        )
+        DBSession.add(repo1)
+
+        repo2 = Repository(
+            name='Test Repo 2',
+            linux_path='/mnt/S/',
+            windows_path='S:/',
+            osx_path='/Volumes/S/'
+        )
+        DBSession.add(repo2)
+
+        task_ft = FilenameTemplate(
+            name='Task Filename Template',
+            target_entity_type='Task',
+            path='$REPO{{project.repository.id}}/{{project.code}}/'
+                 '{%- for parent_task in parent_tasks -%}'
+                 '{{parent_task.nice_name}}/{%- endfor -%}',
+            filename='{{task.nice_name}}_{{version.take_name}}'
+                     '_v{{"%03d"|format(version.version_number)}}',
+        )
+        DBSession.add(task_ft)
+
+        structure1 = Structure(
+            name='Commercial Project Structure',
+            templates=[task_ft]
+        )
+        DBSession.add(structure1)
+
+        status1 = Status(name='Status 1', code='STS1')
+        status2 = Status(name='Status 2', code='STS2')
+        status3 = Status(name='Status 3', code='STS3')
+        DBSession.add_all([status1, status2, status3])
+
+        proj_status_list = StatusList(
+            name='Project Statuses',
+            target_entity_type='Project',
+            statuses=[status1, status2, status3]
+        )
+        DBSession.add(proj_status_list)
+
+        task_status_list = StatusList(
+            name='Task Statuses',
+            target_entity_type='Task',
+            statuses=[status1, status2, status3]
+        )
+        DBSession.add(task_status_list)
+
+        version_status_list = StatusList(
+            name='Version Statuses',
+            target_entity_type='Version',
+            statuses=[status1, status2, status3]
+        )
+        DBSession.add(version_status_list)
+
+        project1 = Project(
+            name='Test Project 1',
+            code='TP1',
+            repositories=[repo1],
+            structure=structure1,
+            status_list=proj_status_list
+        )
+        DBSession.add(project1)
+
+        project2 = Project(
+            name='Test Project 2',
+            code='TP2',
+            repositories=[repo2],
+            structure=structure1,
+            status_list=proj_status_list
+        )
+        DBSession.add(project2)
+
+        task1 = Task(
+            name='Test Task 1',
+            code='TT1',
+            project=project1,
+            status_list=task_status_list
+        )
+        DBSession.add(task1)
+
+        task2 = Task(
+            name='Test Task 1',
+            code='TT1',
+            project=project2,
+            status_list=task_status_list
+        )
+        DBSession.add(task2)
+
+        DBSession.commit()
+
+        # now create versions
+        version1 = Version(
+            task=task1,
+            status_list=version_status_list
+        )
+        DBSession.add(version1)
+        DBSession.commit()
+        version1.update_paths()
+
+        version2 = Version(
+            task=task2,
+            status_list=version_status_list
+        )
+        DBSession.add(version2)
+        DBSession.commit()
+        version2.update_paths()
+
+        DBSession.commit()
+        logger.debug('version1.full_path : %s' % version1.full_path)
+        logger.debug('version2.full_path : %s' % version2.full_path)
+
+        env = EnvironmentBase()
+        path1 = '/mnt/T/TP1/Test_Task_1/Test_Task_1_Main_v001'
+        path2 = '/mnt/S/TP2/Test_Task_1/Test_Task_1_Main_v001'
+
+        self.assertIsNone(LookupCache.current())
+        with LookupCache() as cache:
+            self.assertEqual(LookupCache.current(), cache)
+
+            self.assertEqual(env.get_version_from_full_path(path1), version1)
+            self.assertEqual(cache.hits, 0)
+            self.assertEqual(cache.misses, 1)
+
+            self.assertEqual(env.get_version_from_full_path(path1), version1)
+            self.assertEqual(cache.hits, 1)
+            self.assertEqual(cache.misses, 1)
+
+            # only the missing one is queried
+            self.assertEqual(
+                env.get_versions_from_full_paths([path1, path2]),
+                {path1: version1, path2: version2}
+            )
+            self.assertEqual(cache.hits, 1)
+            self.assertEqual(cache.misses, 2)
+
+            # all of them are cached now
+            self.assertEqual(
+                env.get_versions_from_full_paths([path1, path2]),
+                {path1: version1, path2: version2}
+            )
+            self.assertEqual(cache.hits, 2)
+            self.assertEqual(cache.misses, 2)
+
+            self.assertEqual(env.find_repo(path1), repo1)
+            self.assertEqual(env.find_repo(path1), repo1)
+            self.assertEqual(cache.hits, 3)
+            self.assertEqual(cache.misses, 3)
+
+            # the version is queried with its task, project and repositories
+            cache.clear()
+            self.assertEqual(env.get_version_from_full_path(path1), version1)
+            self.assertEqual(cache.misses, 4)
+            self.assertEqual(version1.task.project.repositories, [repo1])
+
+        self.assertIsNone(LookupCache.current())
+        self.assertEqual(cache.versions_by_full_path, {})
+        self.assertEqual(cache.repositories, {})
+
+    def test_path_normalizer_converts_paths_in_batch(self):
+        """testing if the PathNormalizer converts the given paths to os
+        independent paths in one go
+        """
+        repo1 = Repository(
+            name='Test Repo 1',
+            linux_path='/mnt/T/',
+            windows_path='T:/',
+            osx_path='/Volumes/T/'
+        )
+        repo2 = Repository(
+            name='Test Repo 2',
+            linux_path='/mnt/T/with_a_long_path/',
+            windows_path='T:/with_a_long_path/',
+            osx_path='/Volumes/T/with_a_long_path/'
+        )
+        DBSession.add_all([repo1, repo2])
+        DBSession.commit()
+
+        os.environ['TEST_TEXTURES'] = '/mnt/T/Textures'
+        normalizer = PathNormalizer()
+        result = normalizer.to_os_independent_paths([
+            'T:\\TP1\\Textures\\a.tif',
+            '/Volumes/T/with_a_long_path/TP1//b.tif',
+            '$TEST_TEXTURES/c.tif',
+            '/some/other/path/d.tif',
+            '',
+        ])
+        self.assertEqual(
+            result,
+            [
+                '$REPO%s/TP1/Textures/a.tif' % repo1.id,
+                '$REPO%s/TP1/b.tif' % repo2.id,
+                '$REPO%s/Textures/c.tif' % repo1.id,
+                '/some/other/path/d.tif',
+                '',
+            ]
+        )
+        self.assertEqual(normalizer.misses, 4)
+
+        # the same with the result of stalker
+        path = '/mnt/T/TP1/Textures/a.tif'
+        self.assertEqual(
+            normalizer.to_os_independent_path(path),
+            Repository.to_os_independent_path(path)
+        )
+
+        # cached
+        normalizer.to_os_independent_paths(['T:\\TP1\\Textures\\a.tif'])
+        self.assertEqual(normalizer.hits, 1)
+
+        # changing the environment variables invalidates the related paths
+        os.environ['TEST_TEXTURES'] = '/mnt/T/with_a_long_path/Textures'
+        self.assertEqual(
+            normalizer.to_os_independent_path('$TEST_TEXTURES/c.tif'),
+            '$REPO%s/Textures/c.tif' % repo2.id
+        )
+
+    def test_path_normalizer_max_cache_size(self):
+        """testing if the PathNormalizer cache is limited with max_cache_size
+        """
+        normalizer = PathNormalizer(max_cache_size=2)
+        normalizer.normalize_paths(['/a//b', '/c//d', '/e//f'])
+        self.assertEqual(len(normalizer._cache), 2)
+        self.assertEqual(normalizer.normalize_paths(['/e//f']), ['/e/f'])
+        self.assertEqual(normalizer.hits, 1)
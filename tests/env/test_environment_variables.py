@@ -9,7 +9,9 @@ import os
 import platform
 import unittest
 import shutil
-from anima.env import discover_env_vars
+
+import anima
+from anima.env import discover_env_vars, build_env_profile_cache
 
 
 platform_name = "Linux"
@@ -48,6 +50,10 @@ class EnvironmentVariableSetupTestCase(unittest.TestCase):
         self.anima_path = tempfile.mkdtemp()
         os.environ['ANIMAPATH'] = self.anima_path
 
+        # use a temp cache folder
+        self.orig_local_cache_folder = anima.local_cache_folder
+        anima.local_cache_folder = os.path.join(self.anima_path, 'cache')
+
         self.env_json_file_path = os.path.join(
             self.anima_path, 'env.json'
         )
@@ -100,6 +106,13 @@ class EnvironmentVariableSetupTestCase(unittest.TestCase):
     def tearDown(self):
         """clear tests each time
         """
+        anima.local_cache_folder = self.orig_local_cache_folder
+        for env_var in ['ENV1', 'ENV2']:
+            try:
+                os.environ.pop(env_var)
+            except KeyError:
+                pass
+
         try:
             shutil.rmtree(self.anima_path)
         except OSError:
@@ -237,3 +250,79 @@ class EnvironmentVariableSetupTestCase(unittest.TestCase):
         '/Volumes/Z/Test/Value:/Volumes/Z/some/path1:/Volumes/Z/some/path2:/Volumes/Z/some/other/path1:/Volumes/Z/some/other/path2'
         '/Volumes/Z/Test/Value:/mnt/Z/some/path1:/mnt/Z/some/path2:/mnt/Z/some/other/path1:/mnt/Z/some/other/path2'
 
+    def test_env_json_is_not_parsed_again_if_it_is_not_changed(self):
+        """testing if the env.json file is not read again if it is not changed
+        """
+        try:
+            os.environ.pop('ENV1')
+        except KeyError:
+            pass
+        # use an integer modification time, os.utime() can not restore the
+        # sub-second part of it on every platform
+        mtime = 1000000000
+        os.utime(self.env_json_file_path, (mtime, mtime))
+        discover_env_vars('test_env')
+
+        # break the json file without changing its size and modification time
+        stat = os.stat(self.env_json_file_path)
+        with open(self.env_json_file_path, 'w') as f:
+            f.write(' ' * stat.st_size)
+        os.utime(self.env_json_file_path, (mtime, mtime))
+
+        os.environ.pop('ENV1')
+        discover_env_vars('test_env')
+        self.assertEqual(
+            '/mnt/Z/some/path1:/mnt/Z/some/path2:'
+            '/mnt/Z/some/other/path1:/mnt/Z/some/other/path2',
+            os.environ['ENV1']
+        )
+
+    def test_cache_is_updated_if_env_json_is_changed(self):
+        """testing if the env.json file is read again if it is changed
+        """
+        try:
+            os.environ.pop('ENV1')
+        except KeyError:
+            pass
+        discover_env_vars('test_env')
+
+        with open(self.env_json_file_path, 'w') as f:
+            f.write('{"*": {"linux": {"ENV1": ["/mnt/Z/new/path"]}}}')
+
+        os.environ.pop('ENV1')
+        discover_env_vars('test_env')
+        self.assertEqual('/mnt/Z/new/path', os.environ['ENV1'])
+
+    def test_duplicate_values_are_not_appended(self):
+        """testing if the values those are already in the environment variable
+        are not appended again
+        """
+        os.environ['ENV1'] = '/mnt/Z/some/path2'
+        discover_env_vars('test_env')
+        discover_env_vars('test_env')
+        self.assertEqual(
+            '/mnt/Z/some/path2:/mnt/Z/some/path1:'
+            '/mnt/Z/some/other/path1:/mnt/Z/some/other/path2',
+            os.environ['ENV1']
+        )
+
+    def test_build_env_profile_cache(self):
+        """testing if build_env_profile_cache compiles the profiles of all the
+        environment names for the given os names
+        """
+        profiles = build_env_profile_cache(
+            self.env_json_file_path, ['windows', 'linux']
+        )
+        self.assertEqual(sorted(profiles.keys()), ['linux', 'windows'])
+        self.assertEqual(
+            sorted(profiles['linux'].keys()),
+            ['', '*', 'other_env', 'test_env']
+        )
+        self.assertEqual(
+            profiles['windows']['other_env'],
+            [
+                ('ENV1', ['Z:/some/path1', 'Z:/some/path2',
+                          'Z:/this/should/not/be/appended']),
+                ('ENV2', ['Z:/also/these/should/not/be/appended'])
+            ]
+        )
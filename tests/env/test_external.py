@@ -328,6 +328,51 @@ class ExternalEnvTestCase(unittest.TestCase):
         self.external_env.initialize_structure(self.version)
         self.external_env.initialize_structure(self.version)
 
+    def test_initialize_structures_will_create_the_folders_of_all_versions(self):
+        """testing if the initialize_structures method will create the folders
+        of all of the given Version instances
+        """
+        task2 = Task(name='Test Task 2', project=self.project)
+        version2 = Version(task=task2)
+        self.external_env.initialize_structures([self.version, version2])
+        for version in [self.version, version2]:
+            for folder in self.external_env.structure:
+                self.assertTrue(
+                    os.path.exists(
+                        os.path.join(version.absolute_path, folder)
+                    )
+                )
+
+    def test_initialize_structures_versions_argument_accepts_Versions_only(self):
+        """testing if a TypeError will be raised when the versions argument in
+        initialize_structures method contains something other than Version
+        instances
+        """
+        self.assertRaises(TypeError, self.external_env.initialize_structures,
+                          [self.version, 'not a version instance'])
+
+    def test_conform_versions_will_set_the_extension_of_all_versions(self):
+        """testing if the conform_versions method will set the extension and
+        created_with of all the given versions
+        """
+        version2 = Version(task=self.task)
+        self.external_env.conform_versions([self.version, version2])
+        for version in [self.version, version2]:
+            self.assertEqual(version.extension, '.psd')
+            self.assertEqual(version.created_with, 'Photoshop')
+
+    def test_create_folders_skips_duplicate_and_parent_paths(self):
+        """testing if the create_folders method will call os.makedirs only
+        once for duplicate paths and will skip parent paths
+        """
+        path1 = os.path.join(self.temp_path, 'A', 'Outputs')
+        path2 = os.path.join(self.temp_path, 'A')
+        path3 = os.path.join(self.temp_path, 'B', 'Outputs')
+        result = ExternalEnv.create_folders([path1, path2, path1, path3])
+        self.assertEqual(sorted(result), sorted([path1, path3]))
+        self.assertTrue(os.path.isdir(path1))
+        self.assertTrue(os.path.isdir(path3))
+
     def test_save_as_will_conform_and_initialize_structure(self):
         """testing if the save_as method will conform the given version and
         initialize the structure
@@ -514,3 +559,60 @@ class ExternalEnvFactoryTestCase(unittest.TestCase):
         self.assertEqual(mudbox.name, 'MudBox')
         self.assertEqual(mudbox.extensions, ['.mud'])
         self.assertEqual(mudbox.structure, ['Outputs'])
+
+    def test_get_env_names_returns_a_copy_of_the_cached_names(self):
+        """testing if changing the list returned by
+        ExternalEnvFactory.get_env_names() will not change the cached names
+        """
+        result = ExternalEnvFactory.get_env_names()
+        result.append('Modo')
+        self.assertFalse('Modo' in ExternalEnvFactory.get_env_names())
+
+    def test_clear_cache_will_update_the_env_names(self):
+        """testing if ExternalEnvFactory.clear_cache() will clear the cached
+        environment names
+        """
+        ExternalEnvFactory.get_env_names('%n (%e)')
+        ExternalEnvFactory.clear_cache()
+        self.assertEqual({}, ExternalEnvFactory._name_index)
+        self.assertEqual({}, ExternalEnvFactory._name_patterns)
+
+    def test_env_names_are_updated_when_external_environments_changes(self):
+        """testing if the cached environment names are updated automatically
+        when an environment is added to or removed from the
+        external_environments dictionary
+        """
+        from anima.env.external import external_environments
+        ExternalEnvFactory.get_env_names('%n (%e)')
+        external_environments['Modo'] = {
+            'name': 'Modo',
+            'extensions': ['.lxo'],
+        }
+        try:
+            self.assertTrue(
+                'Modo (.lxo)' in ExternalEnvFactory.get_env_names('%n (%e)')
+            )
+            self.assertEqual(
+                ExternalEnvFactory.get_env('Modo (.lxo)', '%n (%e)').name,
+                'Modo'
+            )
+        finally:
+            external_environments.pop('Modo')
+
+        self.assertFalse(
+            'Modo (.lxo)' in ExternalEnvFactory.get_env_names('%n (%e)')
+        )
+
+    def test_get_env_name_is_working_properly(self):
+        """testing if ExternalEnvFactory.get_env_name() will return the
+        environment name of the given formatted name
+        """
+        self.assertEqual(
+            ExternalEnvFactory.get_env_name('.ztl - ZBrush', '%e - %n'),
+            'ZBrush'
+        )
+        self.assertEqual(
+            ExternalEnvFactory.get_env_name('(.mud) MudBox', '(%e) - %n'),
+            'MudBox'
+        )
+        self.assertTrue(ExternalEnvFactory.get_env_name('', '%n') is None)
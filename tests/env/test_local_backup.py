@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012-2015, Anima Istanbul
+#
+# This module is part of anima-tools and is released under the BSD 2
+# License: http://www.opensource.org/licenses/BSD-2-Clause
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from anima.env.base import LocalBackupWorker
+
+
+class LocalBackupWorkerTestCase(unittest.TestCase):
+    """tests the anima.env.base.LocalBackupWorker class
+    """
+
+    def setUp(self):
+        """set up the test
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.source = os.path.join(self.temp_dir, 'scene.ma')
+        self.backup_path = os.path.join(self.temp_dir, 'backup')
+        self.target = os.path.join(self.backup_path, 'mnt/T/TP/scene.ma')
+
+    def tearDown(self):
+        """clean up the test
+        """
+        shutil.rmtree(self.temp_dir)
+
+    def write_source(self, data):
+        """writes the given data to the source file
+        """
+        with open(self.source, 'wb') as f:
+            f.write(data)
+
+    def read(self, path):
+        """returns the content of the given file
+        """
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def test_add_copies_the_file_in_background(self):
+        """testing if the add method copies the file in a background thread
+        """
+        self.write_source(b'data 1')
+        worker = LocalBackupWorker(backup_path=self.backup_path)
+        worker.add(self.source, self.target)
+        worker.wait()
+        self.assertEqual(self.read(self.target), b'data 1')
+        self.assertEqual(worker.copied_files, [self.source])
+        self.assertFalse(os.path.exists('%s.part' % self.target))
+
+    def test_identical_content_is_skipped(self):
+        """testing if the copy is skipped if the last copy has the same
+        content
+        """
+        self.write_source(b'data 1')
+        worker = LocalBackupWorker(backup_path=self.backup_path)
+        self.assertTrue(worker.backup(self.source, self.target))
+        self.assertFalse(worker.backup(self.source, self.target))
+        self.assertEqual(worker.skipped_files, [self.source])
+        self.assertFalse(os.path.exists('%s.1' % self.target))
+
+    def test_only_last_max_copies_are_kept(self):
+        """testing if only the last max_copies of a file are kept
+        """
+        worker = LocalBackupWorker(
+            backup_path=self.backup_path, max_copies=2, max_bytes=0
+        )
+        for data in [b'data 1', b'data 2', b'data 3']:
+            self.write_source(data)
+            worker.backup(self.source, self.target)
+
+        self.assertEqual(self.read(self.target), b'data 3')
+        self.assertEqual(self.read('%s.1' % self.target), b'data 2')
+        self.assertFalse(os.path.exists('%s.2' % self.target))
+
+    def test_least_recently_used_files_are_evicted(self):
+        """testing if the least recently used files are deleted when the total
+        size exceeds the max_bytes
+        """
+        worker = LocalBackupWorker(
+            backup_path=self.backup_path, max_copies=1, max_bytes=25
+        )
+        targets = [
+            os.path.join(self.backup_path, 'file%s.ma' % i) for i in range(3)
+        ]
+        for target in targets:
+            self.write_source(b'0123456789')
+            worker.backup(self.source, target)
+            # be sure that the last use times are different
+            time.sleep(0.01)
+
+        self.assertFalse(os.path.exists(targets[0]))
+        self.assertTrue(os.path.exists(targets[1]))
+        self.assertTrue(os.path.exists(targets[2]))
+
+    def test_copy_speed_is_limited(self):
+        """testing if the copy speed is limited with bytes_per_second
+        """
+        self.write_source(b'0' * 1000)
+        worker = LocalBackupWorker(
+            backup_path=self.backup_path, bytes_per_second=2000
+        )
+        start = time.time()
+        worker.backup(self.source, self.target)
+        self.assertGreaterEqual(time.time() - start, 0.45)
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012-2015, Anima Istanbul
+#
+# This module is part of anima-tools and is released under the BSD 2
+# License: http://www.opensource.org/licenses/BSD-2-Clause
+
+import unittest
+
+from stalker import (db, Repository, Project, Structure, FilenameTemplate,
+                     Status, StatusList, Task, Version)
+from stalker.db import DBSession
+
+from anima.env.base import ReferenceResolver
+from anima.env.testing import TestEnvironment
+
+
+class ReferenceResolverTestCase(unittest.TestCase):
+    """tests the anima.env.base.ReferenceResolver class
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """set up the test in class level
+        """
+        DBSession.remove()
+        DBSession.configure(extension=None)
+
+    @classmethod
+    def tearDownClass(cls):
+        """cleanup the test
+        """
+        DBSession.remove()
+        DBSession.configure(extension=None)
+
+    def setUp(self):
+        """set up the test
+        """
+        db.setup({'sqlalchemy.url': 'sqlite:///:memory:'})
+
+        repo = Repository(
+            name='Test Repo',
+            linux_path='/mnt/T/',
+            windows_path='T:/',
+            osx_path='/Volumes/T/'
+        )
+        DBSession.add(repo)
+
+        task_ft = FilenameTemplate(
+            name='Task Filename Template',
+            target_entity_type='Task',
+            path='{{project.code}}/{%- for parent_task in parent_tasks -%}'
+                 '{{parent_task.nice_name}}/{%- endfor -%}',
+            filename='{{task.nice_name}}_{{version.take_name}}'
+                     '_v{{"%03d"|format(version.version_number)}}',
+        )
+        DBSession.add(task_ft)
+
+        structure = Structure(
+            name='Commercial Project Structure',
+            templates=[task_ft]
+        )
+        DBSession.add(structure)
+
+        status1 = Status(name='Status 1', code='STS1')
+        status2 = Status(name='Status 2', code='STS2')
+        DBSession.add_all([status1, status2])
+
+        proj_status_list = StatusList(
+            name='Project Statuses',
+            target_entity_type='Project',
+            statuses=[status1, status2]
+        )
+        task_status_list = StatusList(
+            name='Task Statuses',
+            target_entity_type='Task',
+            statuses=[status1, status2]
+        )
+        self.version_status_list = StatusList(
+            name='Version Statuses',
+            target_entity_type='Version',
+            statuses=[status1, status2]
+        )
+        DBSession.add_all(
+            [proj_status_list, task_status_list, self.version_status_list]
+        )
+
+        project = Project(
+            name='Test Project',
+            code='TP',
+            repositories=[repo],
+            structure=structure,
+            status_list=proj_status_list
+        )
+        DBSession.add(project)
+
+        self.tasks = []
+        for i in range(5):
+            task = Task(
+                name='Test Task %s' % i,
+                project=project,
+                status_list=task_status_list
+            )
+            self.tasks.append(task)
+        DBSession.add_all(self.tasks)
+        DBSession.commit()
+
+    def create_version(self, task, inputs=None, is_published=True):
+        """creates a new version for the given task
+        """
+        version = Version(task=task, status_list=self.version_status_list)
+        if inputs:
+            version.inputs = inputs
+        version.is_published = is_published
+        DBSession.add(version)
+        DBSession.commit()
+        return version
+
+    def test_get_latest_published_versions_is_working_properly(self):
+        """testing if the get_latest_published_versions() returns the latest
+        published versions of the given versions
+        """
+        version1 = self.create_version(self.tasks[0])
+        version2 = self.create_version(self.tasks[0])
+        self.create_version(self.tasks[0], is_published=False)
+        version4 = self.create_version(self.tasks[1], is_published=False)
+
+        result = ReferenceResolver.get_latest_published_versions(
+            [version1, version4]
+        )
+        self.assertEqual(
+            result,
+            {
+                (self.tasks[0].id, 'Main'): version2,
+                (self.tasks[1].id, 'Main'): None,
+            }
+        )
+
+    def test_resolve_second_level_update(self):
+        """testing if the resolve() will return "create" for all the versions
+        up in the hierarchy when a deeply referenced version is updated
+
+        version15 -> has no new version
+          version11 -> has no new version
+            version4 -> has no new version
+              version2 -> has new published version (version3)
+        """
+        version2 = self.create_version(self.tasks[0])
+        self.create_version(self.tasks[0])
+        version4 = self.create_version(self.tasks[1], inputs=[version2])
+        version11 = self.create_version(self.tasks[2], inputs=[version4])
+        version15 = self.create_version(
+            self.tasks[3], inputs=[version11], is_published=False
+        )
+
+        resolver = ReferenceResolver(version15, root=[version11])
+        result = resolver.resolve()
+
+        self.assertEqual(
+            result,
+            {
+                'root': [version11],
+                'leave': [],
+                'update': [version2],
+                'create': [version4, version11]
+            }
+        )
+
+    def test_resolve_update_to_already_updated_version(self):
+        """testing if the resolve() will return "update" for a version which
+        has a newer published version that is already using the updated
+        references
+
+        version15
+          version11 -> has a new version using version6 (version12)
+            version4 -> has a new published version (version6)
+          version38 -> no update
+        """
+        version4 = self.create_version(self.tasks[0])
+        version6 = self.create_version(self.tasks[0])
+        version11 = self.create_version(self.tasks[1], inputs=[version4])
+        version12 = self.create_version(self.tasks[1], inputs=[version6])
+        version38 = self.create_version(self.tasks[2])
+        version15 = self.create_version(
+            self.tasks[3], inputs=[version11, version38], is_published=False
+        )
+
+        called_with = []
+        resolver = ReferenceResolver(version15, root=[version11, version38])
+        result = resolver.resolve(callback=called_with.append)
+
+        self.assertEqual(result['root'], [version11, version38])
+        self.assertEqual(result['leave'], [version38])
+        self.assertEqual(
+            sorted(result['update'], key=lambda x: x.id),
+            [version4, version11]
+        )
+        self.assertEqual(result['create'], [])
+        self.assertEqual(
+            sorted(called_with, key=lambda x: x.id),
+            [version4, version11, version38]
+        )
+        self.assertEqual(
+            resolver.latest_published_version(version11), version12
+        )
+
+    def test_resolve_with_no_version(self):
+        """testing if the resolve() will return an empty reference resolution
+        if there is no version
+        """
+        resolver = ReferenceResolver(None)
+        self.assertEqual(
+            resolver.resolve(),
+            {'root': [], 'leave': [], 'update': [], 'create': []}
+        )
+
+    def test_test_environment_is_using_reference_resolver(self):
+        """testing if the TestEnvironment.check_referenced_versions() returns
+        the same result with the ReferenceResolver
+        """
+        version2 = self.create_version(self.tasks[0])
+        self.create_version(self.tasks[0])
+        version4 = self.create_version(self.tasks[1], inputs=[version2])
+        version15 = self.create_version(
+            self.tasks[3], inputs=[version4], is_published=False
+        )
+
+        env = TestEnvironment()
+        env.open(version15)
+        self.assertEqual(
+            env.check_referenced_versions(),
+            ReferenceResolver(version15, root=[version4]).resolve()
+        )
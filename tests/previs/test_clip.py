@@ -145,6 +145,40 @@ class ClipTestCase(unittest.TestCase):
         self.assertEqual('shot', f.name)
         self.assertEqual(pathurl, f.pathurl)
 
+    def test_from_xml_method_uses_shared_rate_instances(self):
+        """testing if the from_xml method will read the rate node in to a
+        shared Rate instance
+        """
+        from xml.etree import ElementTree
+        clip_nodes = []
+        for i in range(2):
+            clip_node = ElementTree.Element('clipitem', attrib={'id': 'shot'})
+            for tag, text in [('end', '65'), ('name', 'shot'),
+                              ('enabled', 'True'), ('start', '35'),
+                              ('in', '0'), ('duration', '30'), ('out', '30')]:
+                ElementTree.SubElement(clip_node, tag).text = text
+            rate_node = ElementTree.SubElement(clip_node, 'rate')
+            ElementTree.SubElement(rate_node, 'timebase').text = '24'
+            ElementTree.SubElement(rate_node, 'ntsc').text = 'FALSE'
+            clip_nodes.append(clip_node)
+
+        c1 = Clip()
+        c1.from_xml(clip_nodes[0])
+        c2 = Clip()
+        c2.from_xml(clip_nodes[1])
+
+        self.assertEqual('24', c1.rate.timebase)
+        self.assertEqual(False, c1.rate.ntsc)
+        self.assertTrue(c1.rate is c2.rate)
+
+    def test_clip_attributes_are_stored_in_slots(self):
+        """testing if all the Clip attributes are stored in __slots__
+        """
+        c = Clip(id='shot', name='shot', start=1, end=10, duration=9,
+                 rate=Rate())
+        c.file = File()
+        self.assertFalse(hasattr(c, '__dict__'))
+
     def test_from_xml_method_is_working_properly_with_no_file(self):
         """testing if the from_xml method will fill object attributes from the
         given xml node even there is no file node inside
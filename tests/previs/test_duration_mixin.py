@@ -5,7 +5,13 @@
 # License: http://www.opensource.org/licenses/BSD-2-Clause
 
 import unittest
-from anima.edit import DurationMixin
+from anima import edit
+
+
+class DurationMixin(edit.DurationMixin):
+    """DurationMixin has empty __slots__, so it is tested through this class
+    which has a __dict__ to store the _duration attribute
+    """
 
 
 class DurationAttrMixinTestCase(unittest.TestCase):
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012-2015, Anima Istanbul
+#
+# This module is part of anima-tools and is released under the BSD 2
+# License: http://www.opensource.org/licenses/BSD-2-Clause
+import os
+import shutil
+import tempfile
+import unittest
+
+from anima.edit import (Sequence, Media, Video, Audio, Track, Clip, File,
+                        Rate, get_edit_cache_path, save_edit_cache,
+                        load_edit_cache)
+
+
+class EditCacheTestCase(unittest.TestCase):
+    """tests the to_dict/from_dict methods and the edit cache functions
+    """
+
+    def setUp(self):
+        """setup the tests
+        """
+        self.temp_path = tempfile.mkdtemp()
+        self.source_path = os.path.join(self.temp_path, 'test_v001.edl')
+        with open(self.source_path, 'w') as f:
+            f.write('TITLE: SEQ001_HSNI_003\n')
+
+        s = Sequence()
+        s.duration = 109
+        s.name = 'SEQ001_HSNI_003'
+        s.timecode = '00:00:00:00'
+        s.rate = Rate(timebase='24', ntsc=False)
+
+        m = Media()
+        s.media = m
+
+        v = Video()
+        v.width = 1024
+        v.height = 778
+        m.video = v
+
+        a = Audio()
+        m.audio = a
+
+        video_track = Track()
+        v.tracks.append(video_track)
+
+        audio_track = Track()
+        audio_track.locked = True
+        a.tracks.append(audio_track)
+
+        for i, duration in enumerate([34, 30, 45]):
+            clip_name = 'SEQ001_HSNI_003_%04i_v001' % ((i + 1) * 10)
+            f = File()
+            f.duration = duration
+            f.name = clip_name
+            f.pathurl = 'file://localhost/tmp/%s.mov' % clip_name
+
+            c = Clip()
+            c.id = clip_name
+            c.name = clip_name
+            c.start = i * 50
+            c.end = i * 50 + duration
+            c.duration = duration
+            c.in_ = 10
+            c.out = 10 + duration
+            c.file = f
+            c.rate = Rate.get(timebase='24', ntsc=False)
+
+            video_track.clips.append(c)
+
+        c = Clip(id='music', name='music', type_='Audio', duration=100)
+        c.file = File(name='music', pathurl='file://localhost/tmp/music.wav')
+        audio_track.clips.append(c)
+
+        self.sequence = s
+
+    def tearDown(self):
+        """clean up test
+        """
+        shutil.rmtree(self.temp_path)
+
+    def test_to_dict_and_from_dict_round_trip(self):
+        """testing if a Sequence created with from_dict from the output of
+        to_dict is the same with the original one
+        """
+        new_sequence = Sequence()
+        new_sequence.from_dict(self.sequence.to_dict())
+
+        self.assertEqual(self.sequence.to_dict(), new_sequence.to_dict())
+        self.assertEqual(self.sequence.to_xml(), new_sequence.to_xml())
+
+        clip = new_sequence.media.video.tracks[0].clips[0]
+        self.assertTrue(clip.rate is Rate.get(timebase='24', ntsc=False))
+        audio_track = new_sequence.media.audio.tracks[0]
+        self.assertEqual(True, audio_track.locked)
+        self.assertEqual('Audio', audio_track.clips[0].type)
+
+    def test_shared_files_stay_shared_after_a_round_trip(self):
+        """testing if a File shared by more than one Clip is stored once and
+        is still shared by the clips of the Sequence loaded from the cache
+        """
+        clips = self.sequence.media.video.tracks[0].clips
+        clips[1].file = clips[0].file
+
+        data = self.sequence.to_dict()
+        self.assertEqual(3, len(data['files']))
+
+        save_edit_cache(self.source_path, self.sequence)
+        result = load_edit_cache(self.source_path)
+
+        new_clips = result.media.video.tracks[0].clips
+        self.assertTrue(new_clips[0].file is new_clips[1].file)
+        self.assertFalse(new_clips[0].file is new_clips[2].file)
+
+        # the shared file is written once and then referenced by its id
+        xml = result.to_xml()
+        file_id = new_clips[0].file.id
+        self.assertEqual(1, xml.count('<file id="%s">' % file_id))
+        self.assertEqual(1, xml.count('<file id="%s"/>' % file_id))
+
+    def test_different_files_with_the_same_id_are_not_merged(self):
+        """testing if different File instances with the same id are not
+        merged in to one File by a round trip
+        """
+        clips = self.sequence.media.video.tracks[0].clips
+        clips[1].file = File(
+            duration=clips[0].file.duration + 10,
+            name=clips[0].file.name,
+            pathurl=clips[0].file.pathurl
+        )
+        self.assertEqual(clips[0].file.id, clips[1].file.id)
+
+        new_sequence = Sequence()
+        new_sequence.from_dict(self.sequence.to_dict())
+
+        new_clips = new_sequence.media.video.tracks[0].clips
+        self.assertFalse(new_clips[0].file is new_clips[1].file)
+        self.assertEqual(
+            clips[1].file.duration,
+            new_clips[1].file.duration
+        )
+
+    def test_save_edit_cache_writes_the_cache_beside_the_source(self):
+        """testing if the save_edit_cache function will create the cache file
+        beside the source file
+        """
+        self.assertTrue(save_edit_cache(self.source_path, self.sequence))
+        cache_path = get_edit_cache_path(self.source_path)
+        self.assertEqual(self.temp_path, os.path.dirname(cache_path))
+        self.assertTrue(os.path.exists(cache_path))
+
+    def test_load_edit_cache_returns_the_cached_sequence(self):
+        """testing if the load_edit_cache function will return the cached
+        Sequence
+        """
+        save_edit_cache(self.source_path, self.sequence, key='fps:24')
+        result = load_edit_cache(self.source_path, key='fps:24')
+        self.assertTrue(isinstance(result, Sequence))
+        self.assertEqual(self.sequence.to_dict(), result.to_dict())
+
+    def test_load_edit_cache_returns_None_if_there_is_no_cache(self):
+        """testing if the load_edit_cache function will return None if there
+        is no cache file
+        """
+        self.assertIsNone(load_edit_cache(self.source_path))
+
+    def test_load_edit_cache_returns_None_if_the_source_has_changed(self):
+        """testing if the load_edit_cache function will return None if the
+        source file content has changed
+        """
+        save_edit_cache(self.source_path, self.sequence)
+        with open(self.source_path, 'a') as f:
+            f.write('\n')
+        self.assertIsNone(load_edit_cache(self.source_path))
+
+    def test_load_edit_cache_returns_None_if_the_key_is_different(self):
+        """testing if the load_edit_cache function will return None if the
+        cache is saved with another key
+        """
+        save_edit_cache(self.source_path, self.sequence, key='fps:24')
+        self.assertIsNone(load_edit_cache(self.source_path, key='fps:25'))
+
+    def test_load_edit_cache_returns_None_if_the_cache_is_corrupted(self):
+        """testing if the load_edit_cache function will return None if the
+        cache file is corrupted
+        """
+        with open(get_edit_cache_path(self.source_path), 'w') as f:
+            f.write('{not json')
+        self.assertIsNone(load_edit_cache(self.source_path))
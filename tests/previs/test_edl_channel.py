@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012-2015, Anima Istanbul
+#
+# This module is part of anima-tools and is released under the BSD 2
+# License: http://www.opensource.org/licenses/BSD-2-Clause
+import unittest
+from anima.edit import parse_edl_channel, edl_channel
+
+
+class EDLChannelTestCase(unittest.TestCase):
+    """tests the anima.edit.parse_edl_channel and anima.edit.edl_channel
+    functions
+    """
+
+    def test_parse_edl_channel_with_video_channels(self):
+        """testing if parse_edl_channel will parse video channels properly
+        """
+        self.assertEqual([('Video', 1)], parse_edl_channel('V'))
+        self.assertEqual([('Video', 2)], parse_edl_channel('V2'))
+        self.assertEqual([('Video', 12)], parse_edl_channel('V12'))
+
+    def test_parse_edl_channel_with_audio_channels(self):
+        """testing if parse_edl_channel will parse audio channels properly
+        """
+        self.assertEqual([('Audio', 1)], parse_edl_channel('A'))
+        self.assertEqual([('Audio', 3)], parse_edl_channel('A3'))
+        self.assertEqual(
+            [('Audio', 1), ('Audio', 2)],
+            parse_edl_channel('AA')
+        )
+
+    def test_parse_edl_channel_with_combined_channels(self):
+        """testing if parse_edl_channel will parse combined channels properly
+        """
+        self.assertEqual(
+            [('Video', 1), ('Audio', 1)],
+            parse_edl_channel('B')
+        )
+        self.assertEqual(
+            [('Audio', 1), ('Video', 1)],
+            parse_edl_channel('A/V')
+        )
+        self.assertEqual(
+            [('Audio', 1), ('Audio', 2), ('Video', 1)],
+            parse_edl_channel('AA/V')
+        )
+
+    def test_parse_edl_channel_with_unknown_channel(self):
+        """testing if parse_edl_channel will return an empty list for unknown
+        channels
+        """
+        self.assertEqual([], parse_edl_channel('NONE'))
+
+    def test_edl_channel_is_working_properly(self):
+        """testing if edl_channel will return the proper channel
+        """
+        self.assertEqual('V', edl_channel('Video', 1))
+        self.assertEqual('V3', edl_channel('Video', 3))
+        self.assertEqual('A', edl_channel('Audio', 1))
+        self.assertEqual('A2', edl_channel('Audio', 2))
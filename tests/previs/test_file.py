@@ -179,3 +179,9 @@ class FileTestCase(unittest.TestCase):
             call2,
             '<file id="%s"/>' % f.id
         )
+
+    def test_file_attributes_are_stored_in_slots(self):
+        """testing if all the File attributes are stored in __slots__
+        """
+        f = File(duration=10, name='shot', pathurl='file:///tmp/shot.mov')
+        self.assertFalse(hasattr(f, '__dict__'))
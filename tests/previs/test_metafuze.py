@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012-2015, Anima Istanbul
+#
+# This module is part of anima-tools and is released under the BSD 2
+# License: http://www.opensource.org/licenses/BSD-2-Clause
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from xml.etree import ElementTree
+
+from anima.edit import Sequence, Media, Video, Track, Clip, File, Rate
+
+
+class MetaFuzeTestCase(unittest.TestCase):
+    """tests the MetaFuze XML generation of the anima.edit.Sequence class
+    """
+
+    def setUp(self):
+        """setup the tests
+        """
+        self.temp_path = tempfile.mkdtemp()
+
+        s = Sequence()
+        s.duration = 109
+        s.name = 'SEQ001_HSNI_003'
+        s.timecode = '00:00:00:00'
+        s.rate = Rate(timebase='24', ntsc=False)
+
+        m = Media()
+        s.media = m
+
+        v = Video()
+        v.width = 1024
+        v.height = 778
+        m.video = v
+
+        t = Track()
+        v.tracks.append(t)
+
+        for i, duration in enumerate([34, 30, 45]):
+            clip_name = 'SEQ001_HSNI_003_%04i_v001' % ((i + 1) * 10)
+            f = File()
+            f.duration = duration
+            f.name = clip_name
+            f.pathurl = 'file://localhost%s/%s.mov' % (
+                self.temp_path, clip_name
+            )
+
+            c = Clip()
+            c.id = clip_name
+            c.name = clip_name
+            c.duration = duration
+            c.file = f
+
+            t.clips.append(c)
+
+        self.sequence = s
+
+    def tearDown(self):
+        """clean up test
+        """
+        shutil.rmtree(self.temp_path)
+
+    def test_to_metafuze_xml_returns_one_xml_per_clip(self):
+        """testing if the to_metafuze_xml method will return one XML with one
+        Group element per clip
+        """
+        result = self.sequence.to_metafuze_xml()
+        self.assertEqual(3, len(result))
+
+        groups = []
+        for xml in result:
+            root = ElementTree.fromstring(xml)
+            self.assertEqual('MetaFuze_BatchTranscode', root.tag)
+            self.assertEqual(1, len(root.findall('Configuration')))
+            self.assertEqual(1, len(root.findall('Group')))
+            groups.append(root.find('Group'))
+
+        self.assertEqual(
+            ['SEQ001_HSNI_003_0010_v001',
+             'SEQ001_HSNI_003_0020_v001',
+             'SEQ001_HSNI_003_0030_v001'],
+            [g.find('Transcode').find('ClipName').text for g in groups]
+        )
+        self.assertEqual(
+            ['33', '29', '44'],
+            [g.find('Transcode').find('Frames').text for g in groups]
+        )
+
+    def test_write_metafuze_xmls_skips_up_to_date_clips(self):
+        """testing if the write_metafuze_xmls method will skip the clips with
+        up to date MXF files
+        """
+        # create the source and the mxf of the first clip
+        mov_path = os.path.join(self.temp_path, 'SEQ001_HSNI_003_0010_v001.mov')
+        mxf_path = os.path.join(self.temp_path, 'SEQ001_HSNI_003_0010_v001.mxf')
+        with open(mov_path, 'w') as f:
+            f.write('')
+        with open(mxf_path, 'w') as f:
+            f.write('')
+        mtime = time.time()
+        os.utime(mov_path, (mtime - 10, mtime - 10))
+
+        output_path = os.path.join(self.temp_path, 'xmls')
+        xml_paths = self.sequence.write_metafuze_xmls(output_path)
+        self.assertEqual(
+            [os.path.join(output_path, 'SEQ001_HSNI_003_0020_v001.xml'),
+             os.path.join(output_path, 'SEQ001_HSNI_003_0030_v001.xml')],
+            xml_paths
+        )
+
+        # make the source newer
+        os.utime(mov_path, (mtime + 10, mtime + 10))
+        xml_paths = self.sequence.write_metafuze_xmls(output_path)
+        self.assertEqual(3, len(xml_paths))
+
+    def test_write_metafuze_xmls_writes_one_file_per_clip(self):
+        """testing if the write_metafuze_xmls method will write one XML file
+        per clip
+        """
+        output_path = os.path.join(self.temp_path, 'xmls')
+        xml_paths = self.sequence.write_metafuze_xmls(output_path)
+
+        self.assertEqual(
+            [os.path.join(output_path, 'SEQ001_HSNI_003_0010_v001.xml'),
+             os.path.join(output_path, 'SEQ001_HSNI_003_0020_v001.xml'),
+             os.path.join(output_path, 'SEQ001_HSNI_003_0030_v001.xml')],
+            xml_paths
+        )
+
+        expected_xmls = self.sequence.to_metafuze_xml()
+        for xml_path, expected_xml in zip(xml_paths, expected_xmls):
+            with open(xml_path) as f:
+                self.assertEqual(expected_xml, f.read())
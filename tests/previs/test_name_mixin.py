@@ -1,7 +1,13 @@
 # -*- coding: utf-8 -*-
 
 import unittest
-from anima.edit import NameMixin
+from anima import edit
+
+
+class NameMixin(edit.NameMixin):
+    """NameMixin has empty __slots__, so it is tested through this class
+    which has a __dict__ to store the _name attribute
+    """
 
 
 class NameAttrMixinTestCase(unittest.TestCase):
@@ -164,3 +164,50 @@ class RateTestCase(unittest.TestCase):
 
         self.assertEqual(r.timebase, '25')
         self.assertEqual(r.ntsc, True)
+
+    def test_get_method_returns_the_same_instance(self):
+        """testing if the get() method will return the same Rate instance for
+        the same timebase and ntsc values
+        """
+        r1 = Rate.get(timebase='24', ntsc=False)
+        r2 = Rate.get(timebase='24', ntsc=False)
+        self.assertTrue(r1 is r2)
+        self.assertEqual('24', r1.timebase)
+        self.assertEqual(False, r1.ntsc)
+
+    def test_get_method_returns_different_instances_for_different_values(self):
+        """testing if the get() method will return different Rate instances
+        for different timebase and ntsc values
+        """
+        r1 = Rate.get(timebase='24', ntsc=False)
+        r2 = Rate.get(timebase='24', ntsc=True)
+        r3 = Rate.get(timebase='25', ntsc=False)
+        self.assertFalse(r1 is r2)
+        self.assertFalse(r1 is r3)
+        self.assertFalse(r2 is r3)
+
+    def test_get_method_uses_the_default_timebase(self):
+        """testing if the get() method will use the default timebase value if
+        the timebase argument is None
+        """
+        self.assertTrue(Rate.get() is Rate.get(timebase='25', ntsc=False))
+
+    def test_shared_instances_can_not_be_changed(self):
+        """testing if an AttributeError will be raised when the timebase or
+        ntsc attributes of a shared instance is changed
+        """
+        r = Rate.get(timebase='30', ntsc=False)
+        with self.assertRaises(AttributeError):
+            r.timebase = '24'
+
+        with self.assertRaises(AttributeError):
+            r.ntsc = True
+
+        self.assertEqual('30', r.timebase)
+        self.assertEqual(False, r.ntsc)
+
+    def test_rate_instances_have_no_dict(self):
+        """testing if Rate instances use __slots__
+        """
+        r = Rate()
+        self.assertFalse(hasattr(r, '__dict__'))
@@ -13,7 +13,8 @@ from anima.env import mayaEnv  # to setup maya extensions
 import pymel.core as pm
 
 from edl import List, Event
-from anima.edit import Sequence, Media, Video, Track, Clip, File, Rate
+from anima.edit import (Sequence, Media, Video, Audio, Track, Clip, File,
+                        Rate)
 
 
 class SequenceTestCase(unittest.TestCase):
@@ -959,3 +960,93 @@ class SequenceTestCase(unittest.TestCase):
             expected_xmls[2],
             result[2]
         )
+
+    def test_from_edl_method_is_working_properly_with_multiple_tracks(self):
+        """testing if the from_edl method will create video and audio tracks
+        by looking at the channels of the events
+        """
+        from edl import Parser
+        p = Parser('24')
+        edl_path = os.path.abspath('./test_data/test_v005.edl')
+
+        with open(edl_path) as f:
+            edl_list = p.parse(f)
+
+        r = Rate(timebase='24')
+
+        s = Sequence(rate=r)
+        s.from_edl(edl_list)
+
+        self.assertEqual('SEQ001_HSNI_003', s.name)
+        self.assertEqual(112, s.duration)
+
+        m = s.media
+        self.assertTrue(isinstance(m, Media))
+
+        # video
+        v = m.video
+        self.assertTrue(isinstance(v, Video))
+        self.assertEqual(2, len(v.tracks))
+
+        v1_clips = v.tracks[0].clips
+        self.assertEqual(2, len(v1_clips))
+        self.assertEqual('SEQ001_HSNI_003_0010_v001', v1_clips[0].id)
+        self.assertEqual('SEQ001_HSNI_003_0030_v001', v1_clips[1].id)
+        self.assertEqual('Video', v1_clips[0].type)
+        self.assertEqual('Video', v1_clips[1].type)
+
+        v2_clips = v.tracks[1].clips
+        self.assertEqual(1, len(v2_clips))
+        self.assertEqual('SEQ001_HSNI_003_0020_v001', v2_clips[0].id)
+        self.assertEqual(35, v2_clips[0].start)
+        self.assertEqual(66, v2_clips[0].end)
+
+        # audio
+        a = m.audio
+        self.assertTrue(isinstance(a, Audio))
+        self.assertEqual(2, len(a.tracks))
+
+        a1_clips = a.tracks[0].clips
+        self.assertEqual(2, len(a1_clips))
+        self.assertEqual('SEQ001_HSNI_003_0030_v001', a1_clips[0].id)
+        self.assertEqual('SEQ001_HSNI_003_MUSIC', a1_clips[1].id)
+        self.assertEqual('Audio', a1_clips[0].type)
+        self.assertEqual('Audio', a1_clips[1].type)
+
+        # the video and audio clips of the same event share the same file
+        self.assertTrue(v1_clips[1].file is a1_clips[0].file)
+
+        a2_clips = a.tracks[1].clips
+        self.assertEqual(1, len(a2_clips))
+        self.assertEqual('SEQ001_HSNI_003_MUSIC', a2_clips[0].id)
+        self.assertEqual(1, a2_clips[0].start)
+        self.assertEqual(113, a2_clips[0].end)
+        self.assertEqual(
+            'file://localhost/tmp/SEQ001_HSNI_003_MUSIC.wav',
+            a2_clips[0].file.pathurl
+        )
+
+    def test_to_edl_method_is_working_properly_with_multiple_tracks(self):
+        """testing if the to_edl method will output events with proper
+        channels for multiple video and audio tracks
+        """
+        from edl import Parser
+        p = Parser('24')
+        edl_path = os.path.abspath('./test_data/test_v005.edl')
+
+        with open(edl_path) as f:
+            edl_list = p.parse(f)
+
+        s = Sequence(rate=Rate(timebase='24'))
+        s.from_edl(edl_list)
+
+        result = s.to_edl()
+        self.assertEqual(
+            [('000001', 'V', 'SEQ001_HSNI_003_0010_v001'),
+             ('000002', 'V', 'SEQ001_HSNI_003_0030_v001'),
+             ('000003', 'V2', 'SEQ001_HSNI_003_0020_v001'),
+             ('000004', 'A', 'SEQ001_HSNI_003_0030_v001'),
+             ('000005', 'A', 'SEQ001_HSNI_003_MUSIC'),
+             ('000006', 'A2', 'SEQ001_HSNI_003_MUSIC')],
+            [(e.num, e.track, e.clip_name) for e in result.events]
+        )
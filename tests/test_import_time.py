@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012-2015, Anima Istanbul
+#
+# This module is part of anima-tools and is released under the BSD 2
+# License: http://www.opensource.org/licenses/BSD-2-Clause
+"""Tests and measures the import time of the anima modules.
+
+Run it as a script to see which imports take the most time, each module is
+imported in a fresh interpreter, so the numbers show the cold start time::
+
+  python tests/test_import_time.py anima.ui.scripts.maya anima.ui.version_creator
+
+The output is similar to the output of ``python -X importtime``, the self and
+cumulative times are in microseconds.
+"""
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+repo_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+measure_code = '''
+import json
+import sys
+import time
+sys.path.insert(0, %(repo_path)r)
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+
+original_import = builtins.__import__
+stack = []
+timings = []
+
+
+def timed_import(name, *args, **kwargs):
+    if name in sys.modules:
+        return original_import(name, *args, **kwargs)
+
+    stack.append(0.0)
+    start = time.time()
+    try:
+        return original_import(name, *args, **kwargs)
+    finally:
+        cumulative = time.time() - start
+        nested = stack.pop()
+        if stack:
+            stack[-1] += cumulative
+        timings.append((cumulative - nested, cumulative, len(stack), name))
+
+builtins.__import__ = timed_import
+start = time.time()
+__import__(%(module_name)r)
+total = time.time() - start
+builtins.__import__ = original_import
+
+sys.stdout.write(json.dumps({
+    'total': total,
+    'timings': timings,
+    'modules': sorted(sys.modules.keys())
+}))
+'''
+
+
+def measure_import_time(module_name, env=None):
+    """Imports the given module in a new python interpreter and returns the
+    total import time in seconds, the timings of all the imports as
+    (self_time, cumulative_time, depth, name) tuples in the order they are
+    completed, and the names of the imported modules.
+
+    :param str module_name: The name of the module to import.
+    :param dict env: The environment variables of the interpreter.
+    :return: (float, list, list)
+    """
+    code = measure_code % {
+        'repo_path': repo_path,
+        'module_name': module_name
+    }
+    output = subprocess.check_output(
+        [sys.executable, '-c', code], env=env
+    )
+    data = json.loads(output.decode('utf-8'))
+    return data['total'], data['timings'], data['modules']
+
+
+def print_import_times(module_name, limit=20):
+    """prints the import times of the given module in the style of
+    ``python -X importtime`` and the slowest imports
+    """
+    total, timings, modules = measure_import_time(module_name)
+    print('%s : %.3f seconds' % (module_name, total))
+    print('import time: self [us] | cumulative | imported package')
+    for self_time, cumulative, depth, name in timings:
+        print('import time: %9i | %10i | %s%s' % (
+            self_time * 1e6, cumulative * 1e6, '  ' * depth, name
+        ))
+
+    print('slowest %s imports:' % limit)
+    for self_time, cumulative, depth, name in \
+            sorted(timings, key=lambda x: x[0], reverse=True)[:limit]:
+        print('%9i us : %s' % (self_time * 1e6, name))
+
+
+class ImportTimeTestCase(unittest.TestCase):
+    """tests if the heavy modules are imported only when they are needed
+    """
+
+    def setUp(self):
+        """set up the test
+        """
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """clean up the test
+        """
+        shutil.rmtree(self.temp_dir)
+
+    def test_importing_anima_does_not_import_stalker(self):
+        """testing if importing anima will not import stalker and sqlalchemy
+        """
+        total, timings, modules = measure_import_time('anima')
+        self.assertIn('anima', modules)
+        self.assertNotIn('stalker', modules)
+        self.assertNotIn('sqlalchemy', modules)
+
+    def test_importing_anima_does_not_create_the_log_file(self):
+        """testing if importing anima will not create the log file
+        """
+        env = dict(os.environ)
+        env['TMPDIR'] = self.temp_dir
+        env['TEMP'] = self.temp_dir
+        env['TMP'] = self.temp_dir
+        measure_import_time('anima', env=env)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_log_file_is_created_with_the_first_record(self):
+        """testing if the LogFileHandler creates the log file when the first
+        record is emitted
+        """
+        from anima import LogFileHandler
+        log_file_path = os.path.join(self.temp_dir, 'anima.log')
+        handler = LogFileHandler(log_file_path)
+        self.assertFalse(os.path.exists(log_file_path))
+
+        handler.handle(logging.makeLogRecord({'msg': 'test message'}))
+        handler.close()
+
+        self.assertTrue(os.path.exists(log_file_path))
+
+    def test_ui_scripts_do_not_import_the_environments(self):
+        """testing if importing the ui scripts will not import the host
+        environments before the tools are called
+        """
+        total, timings, modules = \
+            measure_import_time('anima.ui.scripts.maya')
+        self.assertIn('anima.ui.scripts.maya', modules)
+        self.assertNotIn('anima.env.mayaEnv', modules)
+        self.assertNotIn('stalker', modules)
+
+
+if __name__ == '__main__':
+    module_names = sys.argv[1:] or ['anima', 'anima.ui.scripts.maya']
+    for module_name in module_names:
+        print_import_times(module_name)
@@ -4,6 +4,7 @@
 # This module is part of anima-tools and is released under the BSD 2
 # License: http://www.opensource.org/licenses/BSD-2-Clause
 
+import json
 import tempfile
 import os
 
@@ -192,3 +193,67 @@ class RecentFileManagerTestCase(unittest.TestCase):
             rfm1['Env2'],
             ['Path6', 'Path4']
         )
+
+    def test_RecentFileManager_is_a_singleton(self):
+        """testing if the RecentFileManager is a singleton
+        """
+        rfm1 = RecentFileManager()
+        rfm1.add('Env1', 'Path1')
+        rfm2 = RecentFileManager()
+        self.assertTrue(rfm1 is rfm2)
+
+    def test_getitem_returns_a_copy(self):
+        """testing if changing the list returned by __getitem__ will not change
+        the stored data
+        """
+        rfm1 = RecentFileManager()
+        rfm1.add('Env1', 'Path1')
+        recent_files = rfm1['Env1']
+        recent_files.insert(0, '')
+        self.assertEqual(rfm1['Env1'], ['Path1'])
+
+    def test_restore_is_not_reading_the_file_if_it_is_not_changed(self):
+        """testing if the file is not read again if it is not changed
+        """
+        rfm1 = RecentFileManager()
+        rfm1.add('Env1', 'Path1')
+        self.assertFalse(rfm1.is_changed())
+
+        # change the data in memory, it should not be restored
+        rfm1.recent_files['Env1'].append('Path2')
+        rfm2 = RecentFileManager()
+        self.assertEqual(rfm2['Env1'], ['Path1', 'Path2'])
+
+    def test_changes_of_other_processes_are_restored(self):
+        """testing if the changes in the cache file done by other processes
+        are restored
+        """
+        rfm1 = RecentFileManager()
+        rfm1.add('Env1', 'Path1')
+
+        # simulate another process
+        with open(RecentFileManager.cache_file_full_path(), 'w') as f:
+            json.dump({'Env1': ['Path2', 'Path1'], 'Env2': ['Path3']}, f)
+        self.assertTrue(rfm1.is_changed())
+
+        rfm1.add('Env2', 'Path4')
+        self.assertEqual(rfm1['Env1'], ['Path2', 'Path1'])
+        self.assertEqual(rfm1['Env2'], ['Path4', 'Path3'])
+
+    def test_save_is_not_leaving_temp_files(self):
+        """testing if the save method writes the file atomically without
+        leaving any temp files behind
+        """
+        rfm1 = RecentFileManager()
+        rfm1.add('Env1', 'Path1')
+        rfm1.save()
+
+        cache_file_path = RecentFileManager.cache_file_full_path()
+        file_name = os.path.basename(cache_file_path)
+        temp_files = [
+            f for f in os.listdir(os.path.dirname(cache_file_path))
+            if f.startswith('.%s.' % file_name)
+        ]
+        self.assertEqual(temp_files, [])
+        with open(cache_file_path) as f:
+            self.assertEqual(json.load(f), {'Env1': ['Path1']})
@@ -203,6 +203,9 @@ class EDLImporterTestCase(unittest.TestCase):
         # now hit it
         QTest.mouseClick(self.dialog.send_pushButton, Qt.LeftButton)
 
+        # the files are copied in another thread, wait for it
+        self.dialog.copier_thread.wait()
+
         # now check if the files are there
         self.assertTrue(
             os.path.exists(os.path.join(media_files_path, mxf_file_names[0]))
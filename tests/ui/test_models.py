@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012-2015, Anima Istanbul
+#
+# This module is part of anima-tools and is released under the BSD 2
+# License: http://www.opensource.org/licenses/BSD-2-Clause
+
+import unittest
+
+from anima.ui.models import TaskNameIndex
+
+
+class TaskNameIndexTestCase(unittest.TestCase):
+    """tests the anima.ui.models.TaskNameIndex class
+    """
+
+    def setUp(self):
+        """set up the test
+        """
+        self.index = TaskNameIndex()
+        self.index.build([
+            (1, 'Animation'),
+            (2, 'Lighting'),
+            (3, 'Layout'),
+            (4, 'animation'),
+            (5, 'Comp'),
+            (6, 'Animation'),
+        ])
+
+    def test_is_ready_is_False_before_build(self):
+        """testing if the is_ready attribute is False before the index is
+        built
+        """
+        self.assertFalse(TaskNameIndex().is_ready)
+        self.assertTrue(self.index.is_ready)
+
+    def test_search_is_case_insensitive_and_returns_unique_names(self):
+        """testing if the search() method is case insensitive and returns the
+        sorted unique names
+        """
+        self.assertEqual(
+            self.index.search('ANIM'),
+            ['Animation', 'animation']
+        )
+
+    def test_search_with_short_text(self):
+        """testing if the search() method works with texts shorter than three
+        characters
+        """
+        self.assertEqual(self.index.search('la'), ['Layout'])
+        self.assertEqual(
+            self.index.search(''),
+            ['Animation', 'Comp', 'Layout', 'Lighting', 'animation']
+        )
+
+    def test_search_with_no_match(self):
+        """testing if the search() method returns an empty list when there is
+        no match
+        """
+        self.assertEqual(self.index.search('modeling'), [])
+
+    def test_search_limit(self):
+        """testing if the search() method returns at most limit names
+        """
+        self.assertEqual(self.index.search('', limit=2), ['Animation', 'Comp'])
@@ -156,3 +156,91 @@ class ProgressDialogManagerTestCase(unittest.TestCase):
         self.assertIn(caller, pm.callers)
         pm.end_progress(caller)
         self.assertNotIn(caller, pm.callers)
+
+    def test_step_will_not_update_the_dialog_too_frequently(self):
+        """testing if the step method will update the dialog at most
+        max_refresh_rate times per second for the same caller
+        """
+        pm = ProgressDialogManager()
+        pm.max_refresh_rate = 1
+        self.addCleanup(delattr, pm, 'max_refresh_rate')
+
+        caller = pm.register(10, 'test title')
+        pm.step(caller)
+        self.assertEqual(pm.dialog.call_info['setValue'], [(1,), {}])
+
+        pm.step(caller)
+        pm.step(caller)
+        self.assertEqual(caller.current_step, 3)
+        self.assertEqual(pm.dialog.call_info['setValue'], [(1,), {}])
+
+        pm.refresh(caller, force=True)
+        self.assertEqual(pm.dialog.call_info['setValue'], [(3,), {}])
+
+    def test_step_can_be_called_from_other_threads(self):
+        """testing if the steps from other threads are all counted
+        """
+        import threading
+        pm = ProgressDialogManager()
+        caller = pm.register(4001)
+
+        def worker():
+            for i in range(1000):
+                caller.step()
+
+        threads = [threading.Thread(target=worker) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(caller.current_step, 4000)
+        self.assertEqual(pm.current_step, 4000)
+        self.assertIn(caller, pm.callers)
+
+    def test_nested_caller_is_counted_as_one_step_of_its_parent(self):
+        """testing if the steps of a caller registered with a parent caller is
+        counted as a fraction of one step of the parent
+        """
+        pm = ProgressDialogManager()
+        parent = pm.register(2, 'parent')
+        child = pm.register(4, 'child', parent=parent)
+        self.assertEqual(pm.max_steps, 2)
+
+        child.step(2)
+        self.assertEqual(pm.get_progress(), 0.5)
+        self.assertEqual(pm.dialog.call_info['setLabelText'],
+                         [('parent > child : ',), {}])
+
+        child.end_progress()
+        self.assertNotIn(child, pm.callers)
+        self.assertEqual(pm.get_progress(), 0)
+
+        parent.step()
+        self.assertEqual(pm.get_progress(), 1)
+        self.assertTrue(pm.in_progress)
+
+    def test_event_handlers_are_called_with_the_caller_timings(self):
+        """testing if the event handlers are called for the register,
+        progress and end events of the callers
+        """
+        pm = ProgressDialogManager()
+        events = []
+        pm.add_event_handler(events.append)
+        self.addCleanup(pm.remove_event_handler, events.append)
+
+        caller = pm.register(2, 'test title')
+        caller.step()
+        caller.step()
+
+        self.assertEqual(
+            [(e['event'], e['title'], e['current_step']) for e in events],
+            [('register', 'test title', 0),
+             ('progress', 'test title', 1),
+             ('end', 'test title', 2)]
+        )
+        self.assertGreaterEqual(events[-1]['elapsed'], 0)
+
+        # the handlers are kept after the dialog is closed
+        self.assertFalse(pm.in_progress)
+        self.assertEqual(pm.event_handlers, [events.append])
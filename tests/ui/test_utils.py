@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+# Copyright (c) 2012-2015, Anima Istanbul
+#
+# This module is part of anima-tools and is released under the BSD 2
+# License: http://www.opensource.org/licenses/BSD-2-Clause
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import anima
+from anima.ui.lib import QtGui
+from anima.ui.utils import (MainThreadDispatcher, StagedJobThread,
+                            ThumbnailService, clear_thumbnail,
+                            get_thumbnail_cache_path, load_scaled_image)
+
+
+class Thumbnail(object):
+    """a stand in for the stalker.models.link.Link
+    """
+
+    def __init__(self, full_path):
+        self.full_path = full_path
+
+
+class Task(object):
+    """a stand in for the stalker.models.task.Task
+    """
+
+    def __init__(self, id_, parent=None, thumbnail=None):
+        self.id = id_
+        self.parent = parent
+        self.thumbnail = thumbnail
+
+
+class ThumbnailServiceTestCase(unittest.TestCase):
+    """tests the anima.ui.utils.ThumbnailService class and the related
+    functions
+    """
+
+    def setUp(self):
+        """set up the test
+        """
+        if not QtGui.QApplication.instance():
+            self.app = QtGui.QApplication(sys.argv)
+        else:
+            self.app = QtGui.QApplication.instance()
+
+        self.temp_dir = tempfile.mkdtemp()
+        self.original_local_cache_folder = anima.local_cache_folder
+        anima.local_cache_folder = os.path.join(self.temp_dir, 'cache')
+
+        self.image_path = os.path.join(self.temp_dir, 'thumbnail.png')
+        self.write_image(self.image_path, 400, 200)
+
+    def tearDown(self):
+        """clean up the test
+        """
+        anima.local_cache_folder = self.original_local_cache_folder
+        shutil.rmtree(self.temp_dir)
+
+    @classmethod
+    def write_image(cls, path, width, height):
+        """writes an image with the given size to the given path
+        """
+        image = QtGui.QImage(width, height, QtGui.QImage.Format_RGB32)
+        image.fill(0)
+        image.save(path, 'PNG')
+
+    def test_get_thumbnail_cache_path_is_None_for_missing_files(self):
+        """testing if the get_thumbnail_cache_path() function returns None
+        for a file that doesn't exist
+        """
+        self.assertIsNone(
+            get_thumbnail_cache_path(
+                os.path.join(self.temp_dir, 'missing.png'), 100, 100
+            )
+        )
+
+    def test_get_thumbnail_cache_path_changes_with_the_image(self):
+        """testing if the get_thumbnail_cache_path() function returns another
+        path when the image file or the size is changed
+        """
+        path1 = get_thumbnail_cache_path(self.image_path, 100, 100)
+        self.assertTrue(
+            path1.startswith(os.path.join(self.temp_dir, 'cache'))
+        )
+        self.assertEqual(
+            path1, get_thumbnail_cache_path(self.image_path, 100, 100)
+        )
+        self.assertNotEqual(
+            path1, get_thumbnail_cache_path(self.image_path, 50, 50)
+        )
+
+        self.write_image(self.image_path, 800, 600)
+        self.assertNotEqual(
+            path1, get_thumbnail_cache_path(self.image_path, 100, 100)
+        )
+
+    def test_load_scaled_image_scales_and_caches_the_image(self):
+        """testing if the load_scaled_image() function scales the image and
+        caches it on disk
+        """
+        image = load_scaled_image(self.image_path, 100, 100)
+        self.assertEqual(image.width(), 100)
+        self.assertEqual(image.height(), 50)
+
+        cache_path = get_thumbnail_cache_path(self.image_path, 100, 100)
+        self.assertTrue(os.path.exists(cache_path))
+        self.assertEqual(
+            os.listdir(os.path.dirname(cache_path)),
+            [os.path.basename(cache_path)]
+        )
+
+        # now it is loaded from the cache
+        cache_mtime = os.path.getmtime(cache_path)
+        image = load_scaled_image(self.image_path, 100, 100)
+        self.assertEqual(image.width(), 100)
+        self.assertEqual(os.path.getmtime(cache_path), cache_mtime)
+
+    def test_get_task_thumbnail_path_uses_the_parent_thumbnail(self):
+        """testing if the get_task_thumbnail_path() method returns the
+        thumbnail of the closest parent and caches the result
+        """
+        service = ThumbnailService()
+        project_task = Task(1, thumbnail=Thumbnail('/mnt/T/thumb1.png'))
+        asset = Task(2, parent=project_task)
+        model = Task(3, parent=asset)
+        self.assertEqual(
+            service.get_task_thumbnail_path(model), '/mnt/T/thumb1.png'
+        )
+        self.assertEqual(
+            service.task_thumbnail_paths,
+            {1: '/mnt/T/thumb1.png', 2: '/mnt/T/thumb1.png',
+             3: '/mnt/T/thumb1.png'}
+        )
+
+        asset.thumbnail = Thumbnail('/mnt/T/thumb2.png')
+        self.assertEqual(
+            service.get_task_thumbnail_path(model), '/mnt/T/thumb1.png'
+        )
+        service.clear_task_thumbnail_paths()
+        self.assertEqual(
+            service.get_task_thumbnail_path(model), '/mnt/T/thumb2.png'
+        )
+
+    def test_request_shows_the_image_and_caches_the_pixmap(self):
+        """testing if the request() method loads the image in background,
+        shows it in the QGraphicsView and keeps only the last
+        memory_cache_size pixmaps
+        """
+        service = ThumbnailService(memory_cache_size=1)
+        gview = QtGui.QGraphicsView()
+        gview.resize(100, 100)
+        image_path2 = os.path.join(self.temp_dir, 'thumbnail2.png')
+        self.write_image(image_path2, 200, 400)
+
+        service.request(self.image_path, gview)
+        service.wait()
+        service.images_loaded()
+        self.assertEqual(len(gview.scene().items()), 1)
+        self.assertEqual(len(service.pixmaps), 1)
+
+        service.request(image_path2, gview)
+        service.wait()
+        service.images_loaded()
+        self.assertEqual(len(gview.scene().items()), 1)
+        stat = os.stat(image_path2)
+        self.assertEqual(
+            list(service.pixmaps.keys()),
+            [(os.path.normpath(image_path2), stat.st_mtime, stat.st_size,
+              100, 100)]
+        )
+
+    def test_request_loads_the_overwritten_image_again(self):
+        """testing if the request() method doesn't show the pixmap of an
+        image which is overwritten after it is loaded
+        """
+        service = ThumbnailService()
+        gview = QtGui.QGraphicsView()
+        gview.resize(100, 100)
+
+        service.request(self.image_path, gview)
+        service.wait()
+        service.images_loaded()
+        pixmap = gview.scene().items()[0].pixmap()
+        self.assertEqual(pixmap.height(), 50)
+
+        # overwrite the image, as a re-uploaded task thumbnail
+        self.write_image(self.image_path, 200, 400)
+        os.utime(self.image_path, (1000000000, 1000000000))
+        service.request(self.image_path, gview)
+        service.wait()
+        service.images_loaded()
+        pixmap = gview.scene().items()[0].pixmap()
+        self.assertEqual(pixmap.width(), 50)
+
+    def test_cancel_prevents_showing_the_pending_image(self):
+        """testing if the image of a cancelled request is not shown in the
+        QGraphicsView when it is loaded
+        """
+        service = ThumbnailService()
+        gview = QtGui.QGraphicsView()
+        gview.resize(100, 100)
+
+        clear_thumbnail(gview)
+
+        service.request(self.image_path, gview)
+        # the next selected task doesn't have a thumbnail
+        service.cancel(gview)
+        service.wait()
+        service.images_loaded()
+        self.assertEqual(len(gview.scene().items()), 0)
+
+
+class StagedJobThreadTestCase(unittest.TestCase):
+    """tests the anima.ui.utils.StagedJobThread and
+    anima.ui.utils.MainThreadDispatcher classes
+    """
+
+    def test_dispatcher_calls_the_function_in_the_ui_thread(self):
+        """testing if the MainThreadDispatcher.call() method runs the given
+        function in the thread that the dispatcher is created in
+        """
+        dispatcher = MainThreadDispatcher()
+        results = []
+
+        def worker():
+            results.append(
+                dispatcher.call(lambda x: (x, threading.current_thread()), 5)
+            )
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        while thread.is_alive():
+            # the queued signal is not delivered without an event loop
+            dispatcher.dispatch()
+            time.sleep(0.01)
+
+        self.assertEqual(results, [(5, threading.current_thread())])
+
+    def test_dispatcher_raises_the_exception_in_the_calling_thread(self):
+        """testing if the exception raised in the dispatched function is
+        raised in the calling thread
+        """
+        dispatcher = MainThreadDispatcher()
+        errors = []
+
+        def fail():
+            raise ValueError('failed')
+
+        def worker():
+            try:
+                dispatcher.call(fail)
+            except ValueError as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        while thread.is_alive():
+            dispatcher.dispatch()
+            time.sleep(0.01)
+
+        self.assertEqual(len(errors), 1)
+
+    def test_stages_are_run_in_order_with_a_shared_context(self):
+        """testing if the stages are run in the given order and the context is
+        passed to all of them
+        """
+        def stage1(context):
+            context['value'] = 1
+
+        def stage2(context):
+            context['value'] += 1
+
+        job = StagedJobThread(
+            [('Stage 1', stage1, True), ('Stage 2', stage2, False)],
+            context={'value': 0}
+        )
+        job.run()
+        self.assertIsNone(job.error)
+        self.assertEqual(job.context['value'], 2)
+        self.assertEqual(job.completed_stages, ['Stage 1', 'Stage 2'])
+
+    def test_failing_stage_stops_the_job(self):
+        """testing if the remaining stages are skipped when a stage raises an
+        exception or the job is cancelled
+        """
+        def fail(context):
+            raise RuntimeError('failed')
+
+        def stage(context):
+            context['called'] = True
+
+        job = StagedJobThread(
+            [('Fail', fail, False), ('Stage', stage, True)]
+        )
+        job.run()
+        self.assertIsInstance(job.error, RuntimeError)
+        self.assertEqual(job.completed_stages, [])
+        self.assertNotIn('called', job.context)
+
+        job = StagedJobThread([('Stage', stage, False)])
+        job.cancel()
+        job.run()
+        self.assertTrue(job.cancelled)
+        self.assertNotIn('called', job.context)
+
+    def test_not_cancellable_stages_are_run_after_cancel(self):
+        """testing if the stages with cancellable set to False are still run
+        when the job is cancelled after they are reached
+        """
+        def save(context):
+            context['saved'] = True
+            # the user cancels while the file is saved
+            job.cancel()
+
+        def commit(context):
+            context['committed'] = True
+
+        def other(context):
+            context['other'] = True
+
+        job = StagedJobThread(
+            [('Save', save, True), ('Commit', commit, True, False),
+             ('Other', other, False)]
+        )
+        job.run()
+        self.assertTrue(job.context['committed'])
+        self.assertNotIn('other', job.context)
+        self.assertTrue(job.cancelled)
+        self.assertEqual(job.completed_stages, ['Save', 'Commit'])
+
+        job = StagedJobThread(
+            [('Save', save, True), ('Commit', commit, True, False)]
+        )
+        job.run()
+        self.assertTrue(job.context['committed'])
+        self.assertFalse(job.cancelled)
@@ -3,6 +3,7 @@
 #
 # This module is part of anima-tools and is released under the BSD 2
 # License: http://www.opensource.org/licenses/BSD-2-Clause
+import datetime
 import sys
 import shutil
 import tempfile
@@ -406,6 +407,42 @@ class VersionCreatorTester(unittest.TestCase):
         task1_item = p1_item.child(0, 0)
         self.assertEqual(task1_item.task, self.test_task1)
 
+    def test_tasks_treeView_user_task_ids_contain_the_parents(self):
+        """testing if the user task ids of the tasks_treeView model contains
+        the ids of the user tasks and all of their parents
+        """
+        from anima.ui.models import TaskTreeModel
+        task_tree_model = TaskTreeModel()
+        task_tree_model.user = self.admin
+        task_tree_model.user_tasks_only = True
+
+        expected_ids = set()
+        for task in self.admin.tasks:
+            expected_ids.add(task.id)
+            expected_ids.update(parent.id for parent in task.parents)
+
+        self.assertEqual(task_tree_model.get_user_task_ids(), expected_ids)
+
+    def test_tasks_treeView_loads_child_tasks_lazily(self):
+        """testing if the tasks_treeView model loads the child tasks only when
+        they are requested
+        """
+        task_tree_model = self.dialog.tasks_treeView.model()
+        index = task_tree_model.index(0, 0)
+        self.assertTrue(task_tree_model.hasChildren(index))
+        self.assertTrue(task_tree_model.canFetchMore(index))
+        self.assertEqual(task_tree_model.rowCount(index), 0)
+
+        task_tree_model.fetchMore(index)
+        self.assertFalse(task_tree_model.canFetchMore(index))
+        self.assertEqual(
+            task_tree_model.rowCount(index),
+            len(self.test_project1.root_tasks)
+        )
+        task1_item = task_tree_model.itemFromIndex(index).child(0, 0)
+        self.assertEqual(task1_item.task, self.test_task1)
+        self.assertEqual(task1_item.text(), self.test_task1.name)
+
     def test_tasks_treeView_lists_only_my_tasks_if_checked(self):
         """testing if the tasks_treeView lists only my tasks if
         my_tasks_only_checkBox is checked
@@ -570,6 +607,92 @@ class VersionCreatorTester(unittest.TestCase):
                 versions[i].description
             )
 
+    def test_previous_versions_tableWidget_loads_older_versions_in_pages(self):
+        """testing if the previous_versions_tableWidget loads the latest
+        versions first and the older versions on demand
+        """
+        # select the t1
+        item_model = self.dialog.tasks_treeView.model()
+        selection_model = self.dialog.tasks_treeView.selectionModel()
+
+        index = item_model.index(0, 0)
+        project1_item = item_model.itemFromIndex(index)
+        self.dialog.tasks_treeView.expand(index)
+        task1_item = project1_item.child(0, 0)
+
+        # show two versions at once
+        self.dialog.version_count_spinBox.setValue(2)
+        selection_model.select(
+            task1_item.index(),
+            QtGui.QItemSelectionModel.Select
+        )
+        self.dialog.takes_listWidget.setCurrentRow(0)
+
+        table_widget = self.dialog.previous_versions_tableWidget
+        self.assertEqual(table_widget.rowCount(), 2)
+        self.assertEqual(
+            int(table_widget.item(0, 0).text()),
+            self.test_version2.version_number
+        )
+
+        # load the older page
+        self.assertEqual(table_widget.model().fetch_older(), 1)
+        self.assertEqual(table_widget.rowCount(), 3)
+        self.assertEqual(
+            int(table_widget.item(0, 0).text()),
+            self.test_version1.version_number
+        )
+        self.assertFalse(table_widget.model().can_fetch_older())
+
+        # select_version loads the page of the version
+        self.dialog.version_count_spinBox.setValue(1)
+        table_widget.clear_cache()
+        self.dialog.update_previous_versions_tableWidget()
+        self.assertEqual(table_widget.rowCount(), 1)
+        table_widget.select_version(self.test_version1)
+        self.assertEqual(table_widget.rowCount(), 3)
+        self.assertEqual(table_widget.current_version, self.test_version1)
+
+    def test_previous_versions_tableWidget_cache_is_updated_if_a_version_is_updated(self):
+        """testing if the cached rows of the previous_versions_tableWidget are
+        reloaded if a version is updated by another session
+        """
+        # select the t1
+        item_model = self.dialog.tasks_treeView.model()
+        selection_model = self.dialog.tasks_treeView.selectionModel()
+
+        index = item_model.index(0, 0)
+        project1_item = item_model.itemFromIndex(index)
+        self.dialog.tasks_treeView.expand(index)
+        task1_item = project1_item.child(0, 0)
+        selection_model.select(
+            task1_item.index(),
+            QtGui.QItemSelectionModel.Select
+        )
+        self.dialog.takes_listWidget.setCurrentRow(0)
+
+        table_widget = self.dialog.previous_versions_tableWidget
+        self.assertEqual(
+            table_widget.item(0, 6).text(),
+            self.test_version1.description
+        )
+
+        # update the description without clearing the cache
+        description = self.test_version1.description
+        self.test_version1.description = 'updated description'
+        self.test_version1.date_updated = \
+            self.test_version1.date_updated + datetime.timedelta(seconds=1)
+        db.DBSession.commit()
+
+        self.dialog.update_previous_versions_tableWidget()
+        self.assertEqual(
+            table_widget.item(0, 6).text(),
+            'updated description'
+        )
+
+        self.test_version1.description = description
+        db.DBSession.commit()
+
     def test_get_new_version_with_publish_check_box_is_checked_creates_published_version(self):
         """testing if checking publish_checkbox will create a published Version
         instance
@@ -4,6 +4,7 @@
 # This module is part of anima-tools and is released under the BSD 2
 # License: http://www.opensource.org/licenses/BSD-2-Clause
 import os
+import shutil
 import sys
 import tempfile
 import unittest
@@ -12,7 +13,8 @@ from sqlalchemy import distinct
 
 from anima.ui import SET_PYSIDE, IS_PYSIDE, IS_PYQT4
 
-from anima.ui.version_mover import VersionMover
+import anima
+from anima.ui.version_mover import VersionMover, VersionMoveJob
 from anima.ui.testing import PatchedMessageBox
 
 logger = logging.getLogger(__name__)
@@ -106,6 +108,10 @@ class VersionMoverTestCase(unittest.TestCase):
 
         self.test_repo_path = tempfile.mkdtemp()
 
+        # keep the version mover journals out of the user cache
+        self.original_local_cache_folder = anima.local_cache_folder
+        anima.local_cache_folder = tempfile.mkdtemp()
+
         # create test data
         self.test_repo = Repository(
             name='Test Repository',
@@ -362,6 +368,8 @@ class VersionMoverTestCase(unittest.TestCase):
         """clean up every time
         """
         PatchedMessageBox.tear_down()
+        shutil.rmtree(anima.local_cache_folder)
+        anima.local_cache_folder = self.original_local_cache_folder
 
     def test_copy_button_clicked_with_no_selection_on_from_task_tree_view(self):
         """testing if a QMessageDialog will be displayed when the copy button
@@ -524,10 +532,44 @@ class VersionMoverTestCase(unittest.TestCase):
             take_name_count
         )
 
+        # the files are copied in another thread, wait for it
+        self.dialog.copier_thread.wait()
+
         # check if files are copied there
         for version in self.test_task8.versions:
             self.assertTrue(os.path.exists(version.absolute_full_path))
 
+    def test_version_move_job_get_latest_versions(self):
+        """testing if the VersionMoveJob.get_latest_versions() method returns
+        the latest version of each take ordered by the take name
+        """
+        job = VersionMoveJob(self.test_task4, self.test_task8)
+        self.assertEqual(
+            job.get_latest_versions(),
+            [self.test_version3, self.test_version6, self.test_version9]
+        )
+
+    def test_version_move_job_resumes_an_interrupted_move(self):
+        """testing if the VersionMoveJob resumes an interrupted move from its
+        journal without creating the versions again
+        """
+        job = VersionMoveJob(self.test_task4, self.test_task8)
+        file_copier = job.prepare()
+        self.assertEqual(len(self.test_task8.versions), 3)
+        self.assertTrue(os.path.exists(job.journal_path))
+
+        # the copy is interrupted, start again
+        job = VersionMoveJob(self.test_task4, self.test_task8)
+        resumed_file_copier = job.prepare()
+        self.assertEqual(len(self.test_task8.versions), 3)
+        self.assertEqual(resumed_file_copier.files, file_copier.files)
+
+        self.assertEqual(resumed_file_copier.run(), [])
+        self.assertTrue(job.finish(resumed_file_copier))
+        self.assertFalse(os.path.exists(job.journal_path))
+        for version in self.test_task8.versions:
+            self.assertTrue(os.path.exists(version.absolute_full_path))
+
     # def test_destination_task_has_versions_already(self):
     #     """testing if the there will be no problem when the destination task
     #     already has versions
@@ -597,6 +597,24 @@ class VersionUpdaterTester(unittest.TestCase):
         version45_item = version_tree_model.itemFromIndex(index)
         self.assertEqual(version45_item.version, self.version45)
 
+    def test_versions_treeView_row_data_is_prefetched(self):
+        """testing if the row data of all the versions in the hierarchy is
+        prefetched while populating the versions_treeView
+        """
+        version_tree_model = self.dialog.versions_treeView.model()
+        self.assertEqual(
+            sorted(version_tree_model.row_data.keys()),
+            sorted([self.version12.id, self.version5.id, self.version2.id,
+                    self.version45.id, self.version48.id])
+        )
+        row_data = version_tree_model.row_data[self.version12.id]
+        self.assertEqual(row_data.input_ids, (self.version5.id,))
+        self.assertEqual(row_data.take_name, self.version12.take_name)
+        self.assertEqual(
+            row_data.latest_published_version_id,
+            self.version12.latest_published_version.id
+        )
+
     def test_versions_treeView_displays_the_version_hierarchy_correctly(self):
         """testing if versions_treeView is displaying the root versions
         correctly